@@ -0,0 +1,135 @@
+"""
+Benchmark da camada db (pipelines, contagens e carga em DataFrame) sobre dados sintéticos.
+
+Roda contra um mongod local (--uri) ou, sem --uri, contra o mongomock em processo (pip install mongomock).
+O mongomock não implementa todos os estágios (ex.: $setWindowFields, $bucketAuto, $merge); as etapas que
+dependem deles aparecem como "não suportado". Ele também é lento em escala, então use poucos usuários.
+
+Para cada etapa são medidos o tempo, a vazão (documentos produzidos por segundo) e o pico de memória
+alocada no processo Python (tracemalloc). A memória do servidor não é medida.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.benchmark_db --uri mongodb://localhost:27017/ --usuarios 500
+    python -m benchmarks.benchmark_db --usuarios 10
+"""
+import argparse
+import resource
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from db.dados_sinteticos import GeradorDadosSinteticos
+from db.filters import CollectionFilters
+from db.loader import CollectionLoader, ESQUEMA_LIKES, ESQUEMA_POSTS
+
+BASE_BENCHMARK = 'benchmarkAnaliseDados'
+
+
+def criar_cliente(uri: str | None):
+    if uri:
+        from db.connection_db import get_client
+        return get_client(uri)
+
+    try:
+        import mongomock
+    except ImportError as e:
+        raise ImportError('Sem --uri o benchmark usa o mongomock: pip install mongomock') from e
+    return mongomock.MongoClient()
+
+
+def medir(nome: str, funcao, resultados: list) -> None:
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        documentos = funcao()
+        erro = None
+    except (NotImplementedError, TypeError, KeyError, ValueError) as e:
+        documentos, erro = 0, f'não suportado ({type(e).__name__})'
+    except Exception as e:
+        # Erros do servidor/stand-in (OperationFailure etc.) não interrompem as demais etapas
+        documentos, erro = 0, f'falhou ({type(e).__name__}: {str(e)[:60]})'
+    tempo = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    resultados.append({
+        'etapa': nome,
+        'tempo_s': round(tempo, 3),
+        'documentos': documentos,
+        'docs_por_s': round(documentos / tempo) if tempo > 0 and documentos else 0,
+        'pico_python_mb': round(pico / 1e6, 1),
+        'erro': erro or '',
+    })
+    print(f'{nome:<32}{tempo:>9.3f}s{documentos:>10}{pico / 1e6:>10.1f} MB  {erro or ""}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', default=None, help='URI do mongod. Sem ela, usa o mongomock.')
+    parser.add_argument('--usuarios', type=int, default=20, help='Quantidade de usuários sintéticos.')
+    parser.add_argument('--posts', type=int, nargs=2, default=(50, 400), help='Mínimo e máximo de posts.')
+    parser.add_argument('--likes', type=int, nargs=2, default=(0, 300), help='Mínimo e máximo de likes.')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default=None, help='CSV opcional com os resultados.')
+    parser.add_argument('--manter', action='store_true', help='Não apagar a base de benchmark ao final.')
+    args = parser.parse_args()
+
+    cliente = criar_cliente(args.uri)
+    cliente.drop_database(BASE_BENCHMARK)
+    db = cliente[BASE_BENCHMARK]
+    gerador = GeradorDadosSinteticos(args.semente)
+    resultados = []
+
+    def filtros(nome_colecao: str) -> CollectionFilters:
+        return CollectionFilters(db[nome_colecao])
+
+    def contar(nome_colecao: str) -> int:
+        return db[nome_colecao].count_documents({})
+
+    print(f"{'etapa':<32}{'tempo':>10}{'docs':>10}{'pico':>13}")
+    medir('gerar_e_inserir', lambda: gerador.popular(db['dadosSemFiltros'], args.usuarios, posts=tuple(args.posts),
+                                                     likes=tuple(args.likes)), resultados)
+
+    etapas = [
+        ('apply_pipeline1', 'dadosSemFiltros', lambda f: f.apply_pipeline1('dadosComFiltrosIniciais'),
+         'dadosComFiltrosIniciais'),
+        ('apply_pipeline2', 'dadosComFiltrosIniciais', lambda f: f.apply_pipeline2(10, 0, 'dadosPeriodo'),
+         'dadosPeriodo'),
+        ('apply_pipeline3', 'dadosComFiltrosIniciais', lambda f: f.apply_pipeline3('postsComBDIAndInfos'),
+         'postsComBDIAndInfos'),
+        ('apply_pipeline4', 'postsComBDIAndInfos', lambda f: f.apply_pipeline4('posts'), 'posts'),
+        ('apply_pipeline5', 'posts',
+         lambda f: f.apply_pipeline5('posts6meses', datetime(2017, 12, 1), datetime(2017, 5, 1)), 'posts6meses'),
+        ('apply_pipeline6', 'dadosComFiltrosIniciais', lambda f: f.apply_pipeline6('likes'), 'likes'),
+        ('apply_fused_posts', 'dadosSemFiltros', lambda f: f.apply_fused_posts('postsFundido'), 'postsFundido'),
+        ('apply_fused_likes', 'dadosSemFiltros', lambda f: f.apply_fused_likes('likesFundido'), 'likesFundido'),
+        ('apply_posts_analysis', 'posts',
+         lambda f: f.apply_posts_analysis('postsAnalise', datetime(2017, 5, 1), datetime(2017, 12, 1)),
+         'postsAnalise'),
+    ]
+    for nome, origem, funcao, saida in etapas:
+        medir(nome, lambda: (funcao(filtros(origem)), contar(saida))[1], resultados)
+
+    medir('quant_users_cat (x4 níveis)',
+          lambda: sum(filtros('posts').quant_users_cat('suicida', '$eq', nivel) for nivel in range(4)), resultados)
+    medir('count_users_by_gender (x8)',
+          lambda: sum(filtros('posts').count_users_by_gender('suicida', '$eq', nivel, sexo)
+                      for nivel in range(4) for sexo in ('F', 'M')), resultados)
+    medir('user_breakdown', lambda: int(filtros('posts').user_breakdown(['suicida'], cache=False)['usuarios'].sum()),
+          resultados)
+
+    medir('DataFrame(list(find())) posts', lambda: len(pd.DataFrame(list(db['posts'].find()))), resultados)
+    medir('CollectionLoader posts', lambda: len(CollectionLoader(db['posts'], ESQUEMA_POSTS).carregar()), resultados)
+    medir('CollectionLoader likes', lambda: len(CollectionLoader(db['likes'], ESQUEMA_LIKES).carregar()), resultados)
+
+    print(f'RSS máximo do processo: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB')
+    if args.saida:
+        pd.DataFrame(resultados).to_csv(args.saida, index=False)
+    if not args.manter:
+        cliente.drop_database(BASE_BENCHMARK)
+
+
+if __name__ == '__main__':
+    main()
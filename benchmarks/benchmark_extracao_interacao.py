@@ -0,0 +1,54 @@
+"""
+Benchmark da extração de interações: 12 passadas com apply x varredura única com triagem.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.benchmark_extracao_interacao --csv df_cluster0.csv df_cluster1.csv df_cluster2.csv
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.extracao_interacao import ExtracaoInteracao
+
+
+def extracao_original(extracao: ExtracaoInteracao, serie: pd.Series) -> pd.DataFrame:
+    # Implementação original: uma passada com apply por padrão
+    resultado = pd.DataFrame(index=serie.index)
+    for key, pattern in extracao.patterns.items():
+        resultado[key] = serie.apply(lambda x: extracao.count_occurrences(x, pattern))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', nargs='+', default=['df_cluster0.csv', 'df_cluster1.csv', 'df_cluster2.csv'],
+                        help='CSVs com a coluna postStory.')
+    parser.add_argument('--repeticoes', type=int, default=1, help='Quantas vezes replicar os dados lidos.')
+    args = parser.parse_args()
+
+    serie = pd.concat([pd.read_csv(caminho, usecols=['postStory'])['postStory'] for caminho in args.csv],
+                      ignore_index=True)
+    serie = pd.concat([serie] * args.repeticoes, ignore_index=True)
+    extracao = ExtracaoInteracao(pd.DataFrame({'postStory': serie}))
+
+    inicio = time.perf_counter()
+    esperado = extracao_original(extracao, serie)
+    tempo_original = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    matriz = extracao.matriz_interacoes(serie)
+    tempo_novo = time.perf_counter() - inicio
+
+    if not np.array_equal(esperado.to_numpy(), matriz.astype(np.int64)):
+        raise AssertionError('A varredura única produziu contagens diferentes da implementação original.')
+
+    print(f'Posts: {len(serie)} | Stories não nulos: {serie.notna().sum()} | Únicos: {serie.nunique()}')
+    print(f'Original (12 x apply): {tempo_original:.3f}s | {esperado.memory_usage(index=False).sum() / 1e6:.1f} MB')
+    print(f'Varredura única: {tempo_novo:.3f}s | {matriz.nbytes / 1e6:.1f} MB ({matriz.dtype})')
+    print(f'Speedup: {tempo_original / tempo_novo:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
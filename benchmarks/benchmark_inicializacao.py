@@ -0,0 +1,60 @@
+"""
+Benchmark do tempo de inicialização e do pico de memória (RSS) do TextTreatment.
+
+Cada cenário roda em um processo Python novo, para que imports e modelos já carregados não
+contaminem a medição seguinte. O cenário "todos" carrega os três backends, como o construtor
+antigo fazia.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.benchmark_inicializacao --offline
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+CENARIOS = {
+    'remove_caracteres': "tt.remove_caracteres('Olá, mundo! kkkk')",
+    'stopwords': "tt.limpeza_texto('Olá, mundo! Você está bem?')",
+    'spacy': "tt.preprocessamento_texto('Olá, mundo! Você está bem?')",
+    'nltk': "tt.preprocessamento_texto('Olá, mundo! Você está bem?', op_lemmatizer=1)",
+    'stanza': "tt.preprocessamento_texto('Olá, mundo! Você está bem?', op_lemmatizer=2)",
+    'todos': "tt.carregar_lematizador(None); tt.carregar_lematizador(1); tt.carregar_lematizador(2)",
+}
+
+CODIGO_CENARIO = """
+import json, resource, time
+inicio = time.perf_counter()
+from utils.text_treatment import TextTreatment
+tt = TextTreatment(None, offline={offline})
+{acao}
+tempo = time.perf_counter() - inicio
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{'tempo': tempo, 'rss_mb': rss_mb}}))
+"""
+
+
+def medir_cenario(acao: str, offline: bool) -> dict:
+    codigo = CODIGO_CENARIO.format(acao=acao, offline=offline)
+    saida = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--offline', action='store_true', help='Não acessar a rede para baixar recursos.')
+    parser.add_argument('--cenarios', nargs='*', default=list(CENARIOS), choices=list(CENARIOS))
+    args = parser.parse_args()
+
+    print(f"{'cenário':<20}{'tempo (s)':>12}{'RSS (MB)':>12}")
+    for nome in args.cenarios:
+        try:
+            resultado = medir_cenario(CENARIOS[nome], args.offline)
+        except subprocess.CalledProcessError as e:
+            print(f'{nome:<20} falhou: {e.stderr.strip().splitlines()[-1] if e.stderr else e}')
+            continue
+        print(f"{nome:<20}{resultado['tempo']:>12.2f}{resultado['rss_mb']:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Benchmark dos snapshots colunares: tamanho em disco e tempo de leitura de CSV x Parquet x Feather.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.benchmark_snapshot --csv df_cluster0.csv df_likes_cluster0.csv
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from utils.snapshot import Snapshot
+
+
+def medir_leitura(funcao) -> tuple:
+    inicio = time.perf_counter()
+    df = funcao()
+    return time.perf_counter() - inicio, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', nargs='+', default=['df_cluster0.csv', 'df_likes_cluster0.csv'],
+                        help='CSVs exportados pelos notebooks.')
+    args = parser.parse_args()
+
+    print(f"{'tabela':<28}{'formato':<10}{'disco (MB)':>12}{'leitura (s)':>14}")
+    with tempfile.TemporaryDirectory() as diretorio:
+        for caminho_csv in args.csv:
+            nome = os.path.splitext(os.path.basename(caminho_csv))[0]
+            tempo_csv, df = medir_leitura(lambda: Snapshot.tipar_csv(pd.read_csv(caminho_csv)))
+            print(f'{nome:<28}{"csv":<10}{os.path.getsize(caminho_csv) / 1e6:>12.2f}{tempo_csv:>14.3f}')
+
+            for extensao in ('parquet', 'feather'):
+                caminho = Snapshot.salvar(df, os.path.join(diretorio, f'{nome}.{extensao}'))
+                tempo, lido = medir_leitura(lambda: Snapshot.carregar(caminho))
+                if not lido.equals(df):
+                    raise AssertionError(f'O snapshot {extensao} de {nome} não preservou os dados/tipos.')
+                print(f'{nome:<28}{extensao:<10}{os.path.getsize(caminho) / 1e6:>12.2f}{tempo:>14.3f}')
+
+
+if __name__ == '__main__':
+    main()
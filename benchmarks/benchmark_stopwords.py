@@ -0,0 +1,72 @@
+"""
+Benchmark da remoção de stopwords: busca linear na lista ordenada x índice em frozenset.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.benchmark_stopwords --csv df_cluster0.csv --limite 20000
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+import unidecode
+
+from utils.text_treatment import TextTreatment
+
+
+def remocao_stopword_lista(texto, lista_stopwords) -> str:
+    # Implementação original: busca linear na lista para cada token
+    return ' '.join([palavra for palavra in texto.split() if
+                     unidecode.unidecode(palavra.lower().strip()) not in lista_stopwords])
+
+
+def carregar_textos(caminho_csv: str, limite: int) -> list:
+    df = pd.read_csv(caminho_csv, usecols=['postMessage'], nrows=limite)
+    return df['postMessage'].dropna().astype(str).tolist()
+
+
+def medir(funcao, textos, stopwords) -> tuple:
+    inicio = time.perf_counter()
+    resultados = [funcao(texto, stopwords) for texto in textos]
+    return time.perf_counter() - inicio, resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default='df_cluster0.csv', help='CSV com a coluna postMessage.')
+    parser.add_argument('--limite', type=int, default=5000, help='Quantidade máxima de posts lidos.')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    lista_stopwords = TextTreatment.construir_stopwords()
+    tempo_construcao = time.perf_counter() - inicio
+
+    if os.path.exists(TextTreatment.CAMINHO_CACHE_STOPWORDS):
+        os.remove(TextTreatment.CAMINHO_CACHE_STOPWORDS)
+    inicio = time.perf_counter()
+    TextTreatment.get_indice_stopwords()
+    tempo_indice_frio = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    indice = TextTreatment.get_indice_stopwords()
+    tempo_indice_quente = time.perf_counter() - inicio
+
+    textos = carregar_textos(args.csv, args.limite)
+    total_tokens = sum(len(texto.split()) for texto in textos)
+
+    tempo_lista, resultado_lista = medir(remocao_stopword_lista, textos, lista_stopwords)
+    tempo_indice, resultado_indice = medir(TextTreatment.remocao_stopword, textos, indice)
+
+    if resultado_lista != resultado_indice:
+        raise AssertionError('O índice de stopwords produziu resultado diferente da lista original.')
+
+    print(f'Stopwords: {len(indice)} | Posts: {len(textos)} | Tokens: {total_tokens}')
+    print(f'Construção a partir das fontes: {tempo_construcao:.2f}s')
+    print(f'Índice sem cache em disco: {tempo_indice_frio:.2f}s | com cache em disco: {tempo_indice_quente:.3f}s')
+    print(f'Lista (busca linear): {total_tokens / tempo_lista:,.0f} tokens/s')
+    print(f'IndiceStopwords: {total_tokens / tempo_indice:,.0f} tokens/s')
+    print(f'Speedup: {tempo_lista / tempo_indice:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark do teste de Mann-Kendall por usuário: laço do notebook (teste_mk/teste_mk_likes) x TendenciaMannKendall.
+
+Os CSVs de eventos são replicados (--replicas) com novos id_usuario para simular bases com mais usuários.
+O resultado do motor é comparado valor a valor com o do laço original antes de medir o ganho.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.benchmark_tendencia --replicas 20
+    python -m benchmarks.benchmark_tendencia --csv df_likes_cluster0.csv --periodo 7 --processos 1 4 8
+"""
+import argparse
+import time
+
+import pandas as pd
+from pymannkendall import original_test
+from statsmodels.tsa.seasonal import seasonal_decompose
+
+from utils.tendencia import COLUNAS_RESULTADO, TendenciaMannKendall
+
+
+def teste_mk_original(df_cluster: pd.DataFrame, periodo: int) -> pd.DataFrame:
+    # Laço de analise_tendencia.ipynb, sem as impressões e o gráfico
+    resultados = []
+    for usuario in df_cluster['id_usuario'].unique():
+        df_usuario = df_cluster[df_cluster['id_usuario'] == usuario]
+        eventos_por_dia = df_usuario.groupby('data').size()
+        if len(eventos_por_dia) >= 2 * periodo:
+            tendencia = seasonal_decompose(eventos_por_dia, model='additive', period=periodo).trend.dropna()
+            if len(tendencia) > 0:
+                result = original_test(tendencia)
+                resultados.append({'id_usuario': usuario, 'trend': result.trend, 'h': result.h, 'p-valor': result.p,
+                                   'z': result.z, 'Tau': result.Tau, 'slope': result.slope})
+    return pd.DataFrame(resultados, columns=COLUNAS_RESULTADO)
+
+
+def replicar(df: pd.DataFrame, replicas: int) -> pd.DataFrame:
+    copias = []
+    for replica in range(replicas):
+        copia = df.copy()
+        copia['id_usuario'] = copia['id_usuario'].astype(str) + f'_{replica}'
+        copias.append(copia)
+    return pd.concat(copias, ignore_index=True)
+
+
+def medir(funcao) -> tuple:
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', nargs='+', default=['df_cluster0.csv', 'df_cluster1.csv', 'df_cluster2.csv'],
+                        help='CSVs de eventos com id_usuario e data.')
+    parser.add_argument('--periodo', type=int, default=30, help='30 para posts, 7 para likes.')
+    parser.add_argument('--replicas', type=int, default=10, help='Cópias de cada usuário.')
+    parser.add_argument('--processos', type=int, nargs='+', default=[1, 4], help='Tamanhos do pool a medir.')
+    args = parser.parse_args()
+
+    df = pd.concat([pd.read_csv(caminho, usecols=['id_usuario', 'data'], parse_dates=['data'])
+                    for caminho in args.csv], ignore_index=True)
+    df = replicar(df, args.replicas)
+    print(f"{df['id_usuario'].nunique()} usuários, {len(df)} eventos, período {args.periodo}")
+
+    tempo_original, original = medir(lambda: teste_mk_original(df, args.periodo))
+    print(f"{'laço original':<28}{tempo_original:>9.2f}s")
+
+    for processos in args.processos:
+        tempo, resultado = medir(lambda: TendenciaMannKendall.testar_usuarios(df, args.periodo,
+                                                                             n_processos=processos, verbose=False))
+        if not resultado.equals(original):
+            raise AssertionError(f'O resultado com {processos} processo(s) difere do laço original.')
+        print(f"{f'motor ({processos} processos)':<28}{tempo:>9.2f}s{tempo_original / tempo:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
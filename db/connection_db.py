@@ -1,17 +1,96 @@
+import asyncio
+import os
+import threading
+
 import pymongo
 from pymongo.collection import Collection
 
+# Opções padrão dos clientes. Compressão (ex.: compressors='zstd,zlib') e preferência de leitura
+# podem ser passadas em cada conexão.
+DEFAULT_CLIENT_OPTIONS = {
+    'maxPoolSize': 50,
+    'minPoolSize': 0,
+    'serverSelectionTimeoutMS': 30_000,
+    'connectTimeoutMS': 20_000,
+}
+
+# Registro de clientes do processo: um MongoClient (e o seu pool de conexões) por URI e opções
+_clientes = {}
+_clientes_lock = threading.Lock()
+
+# Uma trava por chave do registro: a criação (e o ping) de um cliente não bloqueia as demais URIs
+_travas_clientes = {}
+
+
+def get_client(uri: str, **client_options) -> pymongo.MongoClient:
+    """
+    Retorna o cliente compartilhado para a URI e as opções informadas, criando-o na primeira chamada.
+
+    A chave inclui o PID: o MongoClient não pode ser reaproveitado após um fork, então cada processo
+    filho cria o seu.
+
+    Args:
+        uri (str): URI de conexão ao MongoDB.
+        **client_options: Opções do MongoClient (maxPoolSize, compressors, readPreference, ...),
+            sobrepostas a DEFAULT_CLIENT_OPTIONS.
+
+    Returns:
+        pymongo.MongoClient: Cliente compartilhado.
+    """
+    opcoes = {**DEFAULT_CLIENT_OPTIONS, **client_options}
+    chave = (uri, tuple(sorted((nome, repr(valor)) for nome, valor in opcoes.items())), os.getpid())
+
+    with _clientes_lock:
+        cliente = _clientes.get(chave)
+        if cliente is not None:
+            return cliente
+        trava = _travas_clientes.setdefault(chave, threading.Lock())
+
+    with trava:
+        # Outra thread pode ter criado o cliente enquanto esta esperava pela trava
+        with _clientes_lock:
+            cliente = _clientes.get(chave)
+        if cliente is not None:
+            return cliente
+
+        cliente = pymongo.MongoClient(uri, **opcoes)
+        try:
+            # Valida a conexão apenas na criação do cliente; só clientes válidos entram no registro
+            cliente.admin.command('ping')
+        except Exception:
+            cliente.close()
+            raise
+
+        with _clientes_lock:
+            _clientes[chave] = cliente
+    return cliente
+
+
+def close_all_clients() -> None:
+    """
+    Fecha todos os clientes do processo atual e limpa o registro.
+    """
+    with _clientes_lock:
+        for (_, _, pid), cliente in list(_clientes.items()):
+            if pid == os.getpid():
+                cliente.close()
+        _clientes.clear()
+
+
 class MongoDBConnection:
     """
     Classe para gerenciar a conexão com o MongoDB.
 
+    Conexões com a mesma URI e as mesmas opções compartilham um único cliente (ver get_client).
+
     Atributos:
         uri (str): A URI de conexão com o MongoDB.
         database_name (str): Nome do banco de dados.
         collection_name (str): Nome da coleção.
+        client_options (dict): Opções do MongoClient.
     """
 
-    def __init__(self, uri: str, database_name: str, collection_name: str):
+    def __init__(self, uri: str, database_name: str, collection_name: str, **client_options):
         """
         Inicializa a conexão com o MongoDB.
 
@@ -19,10 +98,12 @@ class MongoDBConnection:
             uri (str): URI de conexão ao MongoDB.
             database_name (str): Nome do banco de dados.
             collection_name (str): Nome da coleção.
+            **client_options: Opções do MongoClient (maxPoolSize, compressors, readPreference, ...).
         """
         self.uri = uri
         self.database_name = database_name
         self.collection_name = collection_name
+        self.client_options = client_options
         self.client = None
         self.db = None
         self.collection = None
@@ -35,9 +116,7 @@ class MongoDBConnection:
             Exception: Caso ocorra erro ao conectar com o banco de dados.
         """
         try:
-            self.client = pymongo.MongoClient(self.uri)
-            # Tenta acessar a lista de coleções para validar a conexão
-            self.client.admin.command('ping')
+            self.client = get_client(self.uri, **self.client_options)
             self.db = self.client[self.database_name]
             self.collection = self.db[self.collection_name]
             print("Conexão estabelecida com sucesso ao banco de dados.")
@@ -45,6 +124,83 @@ class MongoDBConnection:
             print('Erro ao conectar com o banco de dados. Erro: {}'.format(e))
 
     def get_collection(self) -> Collection:
-        if not self.collection:
+        # Collection não suporta teste de verdade (bool), por isso a comparação com None
+        if self.collection is None:
             raise Exception("A conexão com o banco de dados não foi estabelecida ou a coleção não está disponível.")
-        return self.collection
\ No newline at end of file
+        return self.collection
+
+
+class AsyncMongoDBConnection:
+    """
+    Acesso assíncrono ao MongoDB sobre o cliente compartilhado.
+
+    Cada operação roda em uma thread (asyncio.to_thread) usando o pool de conexões do cliente, de modo
+    que várias agregações (ex.: os pipelines de posts e de likes) são executadas em paralelo.
+
+    Atributos:
+        uri (str): A URI de conexão com o MongoDB.
+        database_name (str): Nome do banco de dados.
+        client_options (dict): Opções do MongoClient.
+    """
+
+    def __init__(self, uri: str, database_name: str, **client_options):
+        """
+        Inicializa a conexão assíncrona.
+
+        Args:
+            uri (str): URI de conexão ao MongoDB.
+            database_name (str): Nome do banco de dados.
+            **client_options: Opções do MongoClient (maxPoolSize, compressors, readPreference, ...).
+        """
+        self.uri = uri
+        self.database_name = database_name
+        self.client_options = client_options
+        self.client = None
+        self.db = None
+
+    async def connect(self) -> None:
+        self.client = await asyncio.to_thread(get_client, self.uri, **self.client_options)
+        self.db = self.client[self.database_name]
+
+    def get_collection(self, collection_name: str) -> Collection:
+        if self.db is None:
+            raise Exception("A conexão com o banco de dados não foi estabelecida.")
+        return self.db[collection_name]
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Executa uma função bloqueante (ex.: CollectionFilters.apply_fused_posts) em uma thread.
+        """
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def aggregate(self, collection_name: str, pipeline: list, **kwargs) -> list:
+        """
+        Executa uma agregação e retorna todos os documentos.
+
+        Args:
+            collection_name (str): Nome da coleção.
+            pipeline (list): Pipeline de agregação.
+            **kwargs: Opções do aggregate (allowDiskUse, batchSize, ...).
+
+        Returns:
+            list: Documentos resultantes.
+        """
+        collection = self.get_collection(collection_name)
+        return await asyncio.to_thread(lambda: list(collection.aggregate(pipeline, **kwargs)))
+
+    async def aggregate_many(self, pipelines: dict, **kwargs) -> dict:
+        """
+        Executa várias agregações em paralelo.
+
+        Args:
+            pipelines (dict): Nome de cada consulta -> (nome da coleção, pipeline).
+            **kwargs: Opções repassadas a cada aggregate.
+
+        Returns:
+            dict: Nome de cada consulta -> documentos resultantes.
+        """
+        nomes = list(pipelines)
+        resultados = await asyncio.gather(
+            *(self.aggregate(colecao, pipeline, **kwargs) for colecao, pipeline in pipelines.values())
+        )
+        return dict(zip(nomes, resultados))
@@ -0,0 +1,158 @@
+import random
+from datetime import datetime, timedelta
+
+import pymongo
+from bson import ObjectId
+
+from db.loader import COLUNAS_BDI
+
+# Modelos de story com as mesmas construções reconhecidas por ExtracaoInteracao
+MODELOS_STORY = [
+    '{nome} updated {pronome} profile picture.',
+    '{nome} updated {pronome} cover photo.',
+    '{nome} added a new photo — with {amigo}.',
+    '{nome} is with {amigo}.',
+    '{nome} added 3 new photos.',
+    "{nome} shared {amigo}'s photo.",
+    "{nome} shared {amigo}'s video.",
+    '{nome} shared a link.',
+    "{nome} shared {amigo}'s post.",
+    "{nome} shared {amigo}'s event.",
+    '{nome} shared a memory.',
+    '{nome} updated {pronome} status.',
+]
+
+PALAVRAS_MENSAGEM = [
+    'hoje', 'dia', 'amor', 'vida', 'saudade', 'trabalho', 'casa', 'festa', 'cansado', 'feliz', 'triste', 'amigos',
+    'família', 'deus', 'obrigado', 'noite', 'sono', 'escola', 'faculdade', 'prova', 'música', 'futebol', 'praia',
+    'chuva', 'sol', 'semana', 'ano', 'tempo', 'sempre', 'nunca', 'kkkk', 'rsrs', 'ansiedade', 'sozinho', 'medo',
+]
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Felipe', 'Gabriela', 'Hugo', 'Isabela', 'João', 'Larissa',
+         'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Tiago', 'Vanessa', 'Wagner']
+
+
+class GeradorDadosSinteticos:
+    """
+    Gera documentos de usuário com o mesmo esquema da coleção dadosSemFiltros, para testes e benchmarks
+    da camada db sem acesso à base real.
+
+    Cada usuário tem id_usuario, idade, sexo, respostas (lista com um dicionário de itens do BDI),
+    friends.summary.total_count, posts (do mais recente para o mais antigo, com _id, message, story e
+    created_time) e likes (com _id e created_time). Uma fração dos posts não tem created_time, o caso
+    que o apply_pipeline4 descarta, e outra fração não tem texto.
+
+    Atributos:
+        semente (int): Semente do gerador aleatório; a mesma semente gera os mesmos dados.
+        inicio (datetime): Data mais antiga dos posts e likes.
+        fim (datetime): Data mais recente dos posts e likes.
+    """
+
+    def __init__(self, semente: int = 42, inicio: datetime = datetime(2016, 1, 1),
+                 fim: datetime = datetime(2018, 1, 1)):
+        self.semente = semente
+        self.inicio = inicio
+        self.fim = fim
+        self.random = random.Random(semente)
+
+    def _object_id(self) -> ObjectId:
+        # Sorteado pela semente: ObjectId() usa o relógio e um contador do processo
+        return ObjectId(self.random.randbytes(12))
+
+    def _data(self) -> datetime:
+        segundos = int((self.fim - self.inicio).total_seconds())
+        return self.inicio + timedelta(seconds=self.random.randrange(segundos))
+
+    def _mensagem(self) -> str | None:
+        sorteio = self.random.random()
+        if sorteio < 0.35:
+            return None
+        if sorteio < 0.40:
+            return '   '
+        return ' '.join(self.random.choices(PALAVRAS_MENSAGEM, k=self.random.randint(2, 25)))
+
+    def _story(self, nome: str, pronome: str) -> str | None:
+        if self.random.random() < 0.5:
+            return None
+        modelo = self.random.choice(MODELOS_STORY)
+        return modelo.format(nome=nome, pronome=pronome, amigo=self.random.choice(NOMES))
+
+    def usuario(self, indice: int, posts: tuple = (50, 400), likes: tuple = (0, 300),
+                fracao_sem_data: float = 0.01) -> dict:
+        """
+        Gera um documento de usuário.
+
+        Args:
+            indice (int): Índice do usuário, usado no id_usuario.
+            posts (tuple): Intervalo (mínimo, máximo) da quantidade de posts.
+            likes (tuple): Intervalo (mínimo, máximo) da quantidade de likes.
+            fracao_sem_data (float): Fração dos posts sem created_time.
+
+        Returns:
+            dict: Documento no esquema de dadosSemFiltros.
+        """
+        sexo = self.random.choice(['F', 'M'])
+        nome = self.random.choice(NOMES)
+        pronome = 'her' if sexo == 'F' else 'his'
+
+        lista_posts = []
+        for _ in range(self.random.randint(*posts)):
+            post = {'_id': self._object_id(), 'message': self._mensagem(), 'story': self._story(nome, pronome)}
+            if self.random.random() >= fracao_sem_data:
+                post['created_time'] = self._data()
+            lista_posts.append(post)
+        lista_posts.sort(key=lambda post: post.get('created_time', self.inicio), reverse=True)
+
+        lista_likes = [{'_id': self._object_id(), 'created_time': self._data()}
+                       for _ in range(self.random.randint(*likes))]
+        lista_likes.sort(key=lambda like: like['created_time'], reverse=True)
+
+        return {
+            'id_usuario': f'{10 ** 14 + indice}',
+            'idade': self.random.randint(18, 45),
+            'sexo': sexo,
+            'respostas': [{item: self.random.randint(0, 3) for item in COLUNAS_BDI}],
+            'friends': {'summary': {'total_count': self.random.randint(20, 3000)}},
+            'posts': lista_posts,
+            'likes': lista_likes,
+        }
+
+    def usuarios(self, quantidade: int, **kwargs):
+        """
+        Gera documentos de usuário sob demanda.
+
+        Args:
+            quantidade (int): Quantidade de usuários.
+            **kwargs: Repassados a usuario (posts, likes, fracao_sem_data).
+
+        Yields:
+            dict: Documentos de usuário.
+        """
+        for indice in range(quantidade):
+            yield self.usuario(indice, **kwargs)
+
+    def popular(self, collection: pymongo.collection.Collection, quantidade: int, tamanho_lote: int = 200,
+                **kwargs) -> int:
+        """
+        Insere usuários sintéticos em uma coleção, em lotes.
+
+        Args:
+            collection (pymongo.collection.Collection): Coleção de destino (ex.: dadosSemFiltros de uma base de teste).
+            quantidade (int): Quantidade de usuários.
+            tamanho_lote (int): Usuários por insert_many.
+            **kwargs: Repassados a usuario.
+
+        Returns:
+            int: Quantidade de posts inseridos.
+        """
+        total_posts = 0
+        lote = []
+        for documento in self.usuarios(quantidade, **kwargs):
+            lote.append(documento)
+            total_posts += len(documento['posts'])
+            if len(lote) >= tamanho_lote:
+                collection.insert_many(lote, ordered=False)
+                lote = []
+        if lote:
+            collection.insert_many(lote, ordered=False)
+        return total_posts
@@ -1,36 +1,209 @@
+import copy
+import hashlib
+import os
+import time
 import pymongo
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+import pandas as pd
+from bson import json_util
+
 # Configurando o logger
 logging.basicConfig(level=logging.INFO)
 
+# Nomes retornados pelo $dayOfWeek (1 = domingo, ..., 7 = sábado)
+DIAS_DA_SEMANA = ['Domingo', 'Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado']
+
+# Coleção com a versão (hash do pipeline) e as marcas d'água de cada coleção materializada
+COLECAO_MATERIALIZACOES = '_materializacoes'
+
+# Coleção com resultados de consultas agregadas, válidos enquanto a versão da coleção consultada não muda
+COLECAO_CACHE_CONSULTAS = '_cache_consultas'
+
+# Coleção com o progresso das reconstruções particionadas (apply_partitioned), para retomar após falhas
+COLECAO_PARTICOES = '_particoes'
+
+# Índices declarados para cada tipo de coleção materializada. Os compostos (id_usuario, postCreatedTime) e
+# (id_usuario, likeCreatedTime) também atendem consultas só por id_usuario (prefixo), e
+# (suicida, sexo, id_usuario) cobre quant_users_cat('suicida', ...) e count_users_by_gender sem ler os
+# documentos. Os campos de marca d'água são indexados na coleção de origem (ver create_watermark_indexes).
+USER_INDEXES = [
+    [('id_usuario', pymongo.ASCENDING)],
+    [('posts.created_time', pymongo.ASCENDING)],
+]
+POSTS_INDEXES = [
+    [('id_usuario', pymongo.ASCENDING), ('postCreatedTime', pymongo.ASCENDING)],
+    [('postCreatedTime', pymongo.ASCENDING)],
+    [('suicida', pymongo.ASCENDING), ('sexo', pymongo.ASCENDING), ('id_usuario', pymongo.ASCENDING)],
+]
+LIKES_INDEXES = [
+    [('id_usuario', pymongo.ASCENDING), ('likeCreatedTime', pymongo.ASCENDING)],
+    [('likeCreatedTime', pymongo.ASCENDING)],
+]
+
+# Operadores de igualdade; os demais operadores de um $match são tratados como intervalo em suggest_index
+OPERADORES_IGUALDADE = {'$eq', '$in'}
+
 
 class CollectionFilters:
     def __init__(self, collection: pymongo.collection.Collection):
         self.collection = collection
         self.collection_name_out = None
 
-    def check_or_create_collection(self, pipeline, collection_name_out):
+    def check_or_create_collection(self, pipeline, collection_name_out, watermark_fields: tuple = None,
+                                   merge_key: str = '_id', force: bool = False, indexes: list = None):
+        """
+        Materializa o pipeline em collection_name_out apenas quando necessário (ver materialize).
+
+        Args:
+            pipeline (list): Estágios do pipeline (um $out/$merge final é ignorado).
+            collection_name_out (str): Coleção de saída.
+            watermark_fields (tuple): Campos da coleção de origem usados como marca d'água.
+            merge_key (str): Campo da saída usado pelo $merge nas atualizações incrementais.
+            force (bool): Se True, recria a coleção mesmo que esteja atualizada.
+            indexes (list): Índices (listas de pares campo/direção) criados na saída após a materialização.
+        """
         self.collection_name_out = collection_name_out
         # Acessa o banco de dados diretamente a partir da coleção
         db = self.collection.database
 
-        # Verificando se a coleção de saída já existe
-        if self.collection_name_out in db.list_collection_names():
-            logging.info(f'A coleção já existe: {self.collection_name_out}')
-        else:
-            # Executa o pipeline na coleção atual e cria a nova coleção
-            logging.info(f'Criando a coleção: {self.collection_name_out}')
-            self.collection.aggregate(pipeline)
+        self.materialize(pipeline, collection_name_out, watermark_fields, merge_key, force)
 
         # Atualiza a coleção atual para a nova coleção criada ou existente
         self.collection = db[self.collection_name_out]
+        if indexes:
+            self.create_indexes(indexes)
 
         return self.collection
 
-    def apply_pipeline1(self, collection_name_out: str):
-        pipeline1 = [
+    @staticmethod
+    def pipeline_hash(pipeline: list) -> str:
+        # json_util serializa datas e ObjectIds de forma estável, preservando a ordem das chaves
+        return hashlib.sha256(json_util.dumps(pipeline).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _valores_caminho(documento, partes: list):
+        if isinstance(documento, list):
+            for item in documento:
+                yield from CollectionFilters._valores_caminho(item, partes)
+        elif not partes:
+            yield documento
+        elif isinstance(documento, dict) and partes[0] in documento:
+            yield from CollectionFilters._valores_caminho(documento[partes[0]], partes[1:])
+
+    def watermark(self, field: str):
+        """
+        Maior valor de um campo (também dentro de arrays, ex.: 'posts.created_time') na coleção atual.
+        Com um índice no campo, a consulta lê uma única entrada do índice.
+        """
+        documento = self.collection.find_one({field: {'$exists': True}}, {field: 1},
+                                             sort=[(field, pymongo.DESCENDING)])
+        if documento is None:
+            return None
+
+        valores = [valor for valor in CollectionFilters._valores_caminho(documento, field.split('.'))
+                   if valor is not None]
+        return max(valores) if valores else None
+
+    def create_watermark_indexes(self, watermark_fields: tuple) -> list:
+        """
+        Cria na coleção atual (a origem) um índice em cada campo de marca d'água, para que watermark leia
+        uma única entrada do índice em vez de ordenar a coleção inteira. '_id' já é indexado.
+
+        Returns:
+            list: Nomes dos índices.
+        """
+        return [self.collection.create_index([(field, pymongo.ASCENDING)])
+                for field in watermark_fields or () if field != '_id']
+
+    def _registrar_materializacao(self, collection_name_out: str, hash_pipeline: str, marcas: dict) -> None:
+        self.collection.database[COLECAO_MATERIALIZACOES].update_one(
+            {'_id': collection_name_out},
+            {'$set': {
+                'origem': self.collection.name,
+                'hash_pipeline': hash_pipeline,
+                'marcas_dagua': marcas,
+                'atualizado_em': datetime.utcnow()
+            }},
+            upsert=True
+        )
+
+    def materialize(self, pipeline, collection_name_out: str, watermark_fields: tuple = None,
+                    merge_key: str = '_id', force: bool = False) -> bool:
+        """
+        Cria, atualiza incrementalmente ou mantém a coleção de saída.
+
+        Cada saída é registrada em COLECAO_MATERIALIZACOES com o hash do pipeline e as marcas d'água
+        (maior valor de cada campo em watermark_fields na origem). Na execução seguinte:
+            - se o hash mudou, a coleção é recriada com $out;
+            - se alguma marca avançou, apenas os documentos de origem acima da marca anterior são
+              processados e gravados com $merge em merge_key (substituindo os já existentes);
+            - caso contrário, nada é feito.
+        Como '_id' cresce com a inserção (ObjectId), incluí-lo nas marcas captura usuários novos mesmo com
+        posts antigos. Remoções e edições de documentos antigos não são detectadas; use force=True.
+
+        Coleções criadas antes do versionamento (sem registro) são mantidas e passam a ser versionadas
+        a partir do estado atual.
+
+        Returns:
+            bool: True se a coleção de saída foi criada ou alterada.
+        """
+        db = self.collection.database
+        estagios = [estagio for estagio in pipeline if '$out' not in estagio and '$merge' not in estagio]
+        hash_pipeline = CollectionFilters.pipeline_hash(estagios)
+        watermark_fields = tuple(watermark_fields or ())
+
+        # Marcas lidas antes de processar: o que chegar durante a execução entra na próxima atualização
+        self.create_watermark_indexes(watermark_fields)
+        marcas = {field.replace('.', '_'): self.watermark(field) for field in watermark_fields}
+        registro = db[COLECAO_MATERIALIZACOES].find_one({'_id': collection_name_out})
+
+        if collection_name_out in db.list_collection_names() and not force:
+            if registro is None:
+                logging.info(f'A coleção já existe: {collection_name_out} (sem versão registrada; registrando)')
+                self._registrar_materializacao(collection_name_out, hash_pipeline, marcas)
+                return False
+
+            anteriores = registro.get('marcas_dagua', {})
+            if registro['hash_pipeline'] == hash_pipeline and set(anteriores) == set(marcas):
+                avancadas = [
+                    (field, anteriores[chave]) for field, chave in zip(watermark_fields, marcas)
+                    if marcas[chave] is not None and (anteriores[chave] is None or marcas[chave] > anteriores[chave])
+                ]
+                if not avancadas:
+                    logging.info(f'A coleção já existe e está atualizada: {collection_name_out}')
+                    return False
+
+                if all(anterior is not None for _, anterior in avancadas):
+                    logging.info(f'Atualizando incrementalmente a coleção: {collection_name_out}')
+                    filtro_delta = {'$or': [{field: {'$gt': anterior}} for field, anterior in avancadas]}
+                    self.collection.aggregate(
+                        [{'$match': filtro_delta}] + estagios + [{
+                            '$merge': {
+                                'into': collection_name_out,
+                                'on': merge_key,
+                                'whenMatched': 'replace',
+                                'whenNotMatched': 'insert'
+                            }
+                        }],
+                        allowDiskUse=True
+                    )
+                    self._registrar_materializacao(collection_name_out, hash_pipeline, marcas)
+                    return True
+            else:
+                logging.info(f'O pipeline de {collection_name_out} mudou; recriando a coleção')
+
+        # Executa o pipeline na coleção atual e cria a nova coleção
+        logging.info(f'Criando a coleção: {collection_name_out}')
+        self.collection.aggregate(estagios + [{'$out': collection_name_out}], allowDiskUse=True)
+        self._registrar_materializacao(collection_name_out, hash_pipeline, marcas)
+        return True
+
+    @staticmethod
+    def pipeline1_stages() -> list:
+        return [
             {
                 '$match': {
                     'posts': {
@@ -38,13 +211,13 @@ class CollectionFilters:
                         '$ne': []
                     }
                 }
-            },
-            {
-                '$out': collection_name_out
             }
         ]
 
-        self.check_or_create_collection(pipeline1, collection_name_out)
+    def apply_pipeline1(self, collection_name_out: str):
+        pipeline1 = CollectionFilters.pipeline1_stages() + [{'$out': collection_name_out}]
+
+        self.check_or_create_collection(pipeline1, collection_name_out, indexes=USER_INDEXES)
 
     def apply_pipeline2(self, time1: int, time2: int, collection_name_out: str):
         time1_millis = time1 * 365.25 * 24 * 60 * 60 * 1000
@@ -91,10 +264,11 @@ class CollectionFilters:
             }
         ]
 
-        self.check_or_create_collection(pipeline2, collection_name_out)
+        self.check_or_create_collection(pipeline2, collection_name_out, indexes=USER_INDEXES)
 
-    def apply_pipeline3(self, collection_name_out: str):
-        pipeline3 = [
+    @staticmethod
+    def pipeline3_stages() -> list:
+        return [
             {
                 '$unwind': '$posts'
             }, {
@@ -284,26 +458,28 @@ class CollectionFilters:
                         }
                     }
                 }
-            },
-            {
-                '$out': collection_name_out
             }
         ]
 
-        self.check_or_create_collection(pipeline3, collection_name_out)
+    def apply_pipeline3(self, collection_name_out: str):
+        pipeline3 = CollectionFilters.pipeline3_stages() + [{'$out': collection_name_out}]
+
+        self.check_or_create_collection(pipeline3, collection_name_out, indexes=POSTS_INDEXES)
 
-    def apply_pipeline4(self, collection_name_out: str):
-        pipeline4 = [
+    @staticmethod
+    def pipeline4_stages() -> list:
+        return [
             {
                 '$match': {
                     'diaDaSemana': {'$ne': 'Desconhecido'}
                 }
-            },
-            {
-                '$out': collection_name_out
             }
         ]
-        self.check_or_create_collection(pipeline4, collection_name_out)
+
+    def apply_pipeline4(self, collection_name_out: str):
+        pipeline4 = CollectionFilters.pipeline4_stages() + [{'$out': collection_name_out}]
+
+        self.check_or_create_collection(pipeline4, collection_name_out, indexes=POSTS_INDEXES)
 
     def apply_pipeline5(self, collection_name_out: str, data_inicio: datetime, data_fim: datetime):
         pipeline5 = [
@@ -321,10 +497,11 @@ class CollectionFilters:
         ]
 
         # Verifica se a nova coleção será criada ou já existe
-        self.check_or_create_collection(pipeline5, collection_name_out)
+        self.check_or_create_collection(pipeline5, collection_name_out, indexes=POSTS_INDEXES)
 
-    def apply_pipeline6(self, collection_name_out: str):
-        pipeline6 = [
+    @staticmethod
+    def pipeline6_stages() -> list:
+        return [
             {
                 '$unwind': '$likes'
             }, {
@@ -333,12 +510,608 @@ class CollectionFilters:
                     'id_usuario': 1,
                     'likeCreatedTime': '$likes.created_time'
                 },
+            }
+        ]
+
+    def apply_pipeline6(self, collection_name_out: str):
+        pipeline6 = CollectionFilters.pipeline6_stages() + [{'$out': collection_name_out}]
+
+        self.check_or_create_collection(pipeline6, collection_name_out, indexes=LIKES_INDEXES)
+
+    @staticmethod
+    def date_window_stage(field: str, data_inicio: datetime, data_fim: datetime) -> dict:
+        """
+        Estágio que mantém os documentos com field no intervalo [data_inicio, data_fim).
+
+        Args:
+            field (str): Campo de data ('postCreatedTime', 'likeCreatedTime').
+            data_inicio (datetime): Início do intervalo (inclusivo).
+            data_fim (datetime): Fim do intervalo (exclusivo).
+        """
+        return {'$match': {field: {'$gte': data_inicio, '$lt': data_fim}}}
+
+    @staticmethod
+    def bdi_predicates_stage(predicates: dict) -> dict:
+        """
+        Estágio com predicados sobre os itens do BDI.
+
+        Args:
+            predicates (dict): Item -> valor ou operador, ex.: {'suicida': 3} ou {'tristeza': {'$gte': 2}}.
+        """
+        return {'$match': dict(predicates)}
+
+    @staticmethod
+    def non_empty_text_stage(fields: tuple = ('postMessage', 'postStory')) -> dict:
+        """
+        Estágio que remove os posts sem texto, com o mesmo critério do notebook: o post é descartado se
+        todos os campos são nulos, ou se todos são textos que ficam vazios após o strip.
+
+        Args:
+            fields (tuple): Campos de texto avaliados.
+        """
+        nulos = [{'$in': [{'$type': f'${field}'}, ['missing', 'null']]} for field in fields]
+        vazios = [
+            {
+                '$cond': [
+                    {'$eq': [{'$type': f'${field}'}, 'string']},
+                    {'$eq': [{'$trim': {'input': f'${field}'}}, '']},
+                    False
+                ]
+            }
+            for field in fields
+        ]
+        return {'$match': {'$expr': {'$not': [{'$or': [{'$and': nulos}, {'$and': vazios}]}]}}}
+
+    @staticmethod
+    def min_posts_per_user_stages(min_posts: int, user_field: str = 'id_usuario') -> list:
+        """
+        Estágios que mantêm apenas os usuários com pelo menos min_posts documentos no ponto do pipeline
+        em que são inseridos. Usa $setWindowFields (MongoDB 5.0+), sem agrupar os documentos em memória.
+
+        Args:
+            min_posts (int): Quantidade mínima de documentos por usuário.
+            user_field (str): Campo que identifica o usuário.
+        """
+        return [
+            {
+                '$setWindowFields': {
+                    'partitionBy': f'${user_field}',
+                    'output': {'_quantDocumentosUsuario': {'$count': {}}}
+                }
             },
             {
-                '$out': collection_name_out
+                '$match': {'_quantDocumentosUsuario': {'$gte': min_posts}}
+            },
+            {
+                '$unset': '_quantDocumentosUsuario'
+            }
+        ]
+
+    @staticmethod
+    def users_in_collection_stages(collection_name: str, user_field: str = 'id_usuario') -> list:
+        """
+        Estágios que mantêm apenas os documentos cujo usuário aparece em outra coleção (ex.: os likes dos
+        usuários que restaram nos posts). Com um índice em user_field na outra coleção, cada busca é pontual.
+
+        Args:
+            collection_name (str): Coleção com os usuários de referência.
+            user_field (str): Campo que identifica o usuário nas duas coleções.
+        """
+        return [
+            {
+                '$lookup': {
+                    'from': collection_name,
+                    'localField': user_field,
+                    'foreignField': user_field,
+                    'pipeline': [{'$limit': 1}, {'$project': {'_id': 1}}],
+                    'as': '_usuarioReferencia'
+                }
+            },
+            {
+                '$match': {'_usuarioReferencia': {'$ne': []}}
+            },
+            {
+                '$unset': '_usuarioReferencia'
+            }
+        ]
+
+    @staticmethod
+    def posts_analysis_pipeline(data_inicio: datetime, data_fim: datetime, bdi_predicates: dict = None,
+                                min_posts: int = 100) -> list:
+        """
+        Filtros aplicados nos notebooks após a leitura da coleção 'posts', executados no servidor.
+
+        O filtro de mínimo de posts antes do recorte de datas é omitido: quem tem min_posts posts no
+        recorte também os tem na coleção inteira, então apenas o segundo filtro muda o resultado.
+
+        Args:
+            data_inicio (datetime): Início da janela (inclusivo), ex.: datetime(2017, 5, 1).
+            data_fim (datetime): Fim da janela (exclusivo), ex.: datetime(2017, 12, 1).
+            bdi_predicates (dict): Predicados do BDI. Padrão: {'suicida': 3}.
+            min_posts (int): Quantidade mínima de posts por usuário após os filtros.
+        """
+        bdi_predicates = {'suicida': 3} if bdi_predicates is None else bdi_predicates
+
+        # Data e BDI em um único $match, que pode usar índice
+        filtro = CollectionFilters.date_window_stage('postCreatedTime', data_inicio, data_fim)['$match']
+        filtro.update(CollectionFilters.bdi_predicates_stage(bdi_predicates)['$match'])
+
+        return [
+            {'$match': filtro},
+            CollectionFilters.non_empty_text_stage(),
+            *CollectionFilters.min_posts_per_user_stages(min_posts)
+        ]
+
+    @staticmethod
+    def likes_analysis_pipeline(data_inicio: datetime, data_fim: datetime, posts_collection_name: str = None) -> list:
+        """
+        Filtros aplicados nos notebooks à coleção 'likes', executados no servidor.
+
+        Args:
+            data_inicio (datetime): Início da janela (inclusivo).
+            data_fim (datetime): Fim da janela (exclusivo).
+            posts_collection_name (str): Coleção de posts já filtrada; se informada, mantém apenas os likes
+                dos usuários presentes nela.
+        """
+        pipeline = [CollectionFilters.date_window_stage('likeCreatedTime', data_inicio, data_fim)]
+        if posts_collection_name:
+            pipeline.extend(CollectionFilters.users_in_collection_stages(posts_collection_name))
+        return pipeline
+
+    def apply_posts_analysis(self, collection_name_out: str, data_inicio: datetime, data_fim: datetime,
+                             bdi_predicates: dict = None, min_posts: int = 100):
+        pipeline = CollectionFilters.posts_analysis_pipeline(data_inicio, data_fim, bdi_predicates, min_posts)
+        pipeline.append({'$out': collection_name_out})
+
+        self.check_or_create_collection(pipeline, collection_name_out, indexes=POSTS_INDEXES)
+
+    def apply_likes_analysis(self, collection_name_out: str, data_inicio: datetime, data_fim: datetime,
+                             posts_collection_name: str = None):
+        pipeline = CollectionFilters.likes_analysis_pipeline(data_inicio, data_fim, posts_collection_name)
+        pipeline.append({'$out': collection_name_out})
+
+        self.check_or_create_collection(pipeline, collection_name_out, indexes=LIKES_INDEXES)
+
+    def apply_fused_posts(self, collection_name_out: str = 'posts', materialize: dict = None,
+                          dia_da_semana: bool = True, watermark_fields: tuple = ('_id', 'posts.created_time'),
+                          force: bool = False, partitions: int = None):
+        """
+        Executa os pipelines 1, 3 e 4 como uma única agregação, sem gravar as coleções intermediárias.
+
+        Args:
+            collection_name_out (str): Coleção final (equivalente à saída do apply_pipeline4).
+            materialize (dict): Etapas intermediárias a gravar, ex.: {'pipeline1': 'dadosComFiltrosIniciais',
+                'pipeline3': 'postsComBDIAndInfos'}. Por padrão, nenhuma.
+            dia_da_semana (bool): Se False, não calcula o campo diaDaSemana (descartado pelos notebooks).
+            watermark_fields (tuple): Marcas d'água da coleção sem filtros para a atualização incremental.
+            force (bool): Se True, recria as coleções de saída.
+            partitions (int): Se informado, uma reconstrução completa é feita em partições paralelas
+                (ver apply_partitioned). Não pode ser combinado com materialize.
+        """
+        materialize = materialize or {}
+        builder = PipelineBuilder(self.collection)
+        builder.add(CollectionFilters.pipeline1_stages(), materialize.get('pipeline1'))
+        builder.add(CollectionFilters.pipeline3_stages(), materialize.get('pipeline3'))
+        builder.add(CollectionFilters.pipeline4_stages())
+        if not dia_da_semana:
+            builder.exclude_fields('diaDaSemana')
+
+        if partitions:
+            return self.apply_partitioned(builder.build(), collection_name_out, partitions,
+                                          watermark_fields=watermark_fields, force=force, indexes=POSTS_INDEXES)
+
+        self.collection_name_out = collection_name_out
+        self.collection = builder.run(collection_name_out, watermark_fields, force=force, indexes=POSTS_INDEXES)
+        return self.collection
+
+    def apply_fused_likes(self, collection_name_out: str = 'likes', materialize: dict = None,
+                          watermark_fields: tuple = ('_id', 'posts.created_time', 'likes.created_time'),
+                          force: bool = False, partitions: int = None):
+        """
+        Executa os pipelines 1 e 6 como uma única agregação a partir da coleção sem filtros.
+
+        Args:
+            collection_name_out (str): Coleção final (equivalente à saída do apply_pipeline6).
+            materialize (dict): Etapas intermediárias a gravar, ex.: {'pipeline1': 'dadosComFiltrosIniciais'}.
+            watermark_fields (tuple): Marcas d'água da coleção sem filtros para a atualização incremental.
+                'posts.created_time' entra porque o primeiro post de um usuário passa a incluir os seus likes.
+            force (bool): Se True, recria as coleções de saída.
+            partitions (int): Se informado, uma reconstrução completa é feita em partições paralelas.
+        """
+        materialize = materialize or {}
+        builder = PipelineBuilder(self.collection)
+        builder.add(CollectionFilters.pipeline1_stages(), materialize.get('pipeline1'))
+        builder.add(CollectionFilters.pipeline6_stages())
+
+        if partitions:
+            return self.apply_partitioned(builder.build(), collection_name_out, partitions,
+                                          watermark_fields=watermark_fields, force=force, indexes=LIKES_INDEXES)
+
+        self.collection_name_out = collection_name_out
+        self.collection = builder.run(collection_name_out, watermark_fields, force=force, indexes=LIKES_INDEXES)
+        return self.collection
+
+    def partition_bounds(self, partition_field: str = '_id', partitions: int = 8) -> list:
+        """
+        Divide a coleção atual em intervalos de partition_field com quantidades parecidas de documentos.
+
+        Returns:
+            list: Pares (mínimo, máximo); o máximo é exclusivo, exceto no último intervalo.
+        """
+        buckets = self.collection.aggregate(
+            [{'$bucketAuto': {'groupBy': f'${partition_field}', 'buckets': partitions}}], allowDiskUse=True
+        )
+        return [(bucket['_id']['min'], bucket['_id']['max']) for bucket in buckets]
+
+    @staticmethod
+    def _filtro_particao(particao: dict) -> dict:
+        limite_superior = '$lte' if particao['ultima'] else '$lt'
+        return {particao['campo']: {'$gte': particao['minimo'], limite_superior: particao['maximo']}}
+
+    def _executar_particao(self, estagios: list, particao: dict, collection_name_out: str, merge_key: str,
+                           retries: int) -> float:
+        pipeline = [{'$match': CollectionFilters._filtro_particao(particao)}] + estagios + [{
+            '$merge': {
+                'into': collection_name_out,
+                'on': merge_key,
+                'whenMatched': 'replace',
+                'whenNotMatched': 'insert'
             }
+        }]
+
+        inicio = time.perf_counter()
+        for tentativa in range(retries + 1):
+            try:
+                self.collection.aggregate(pipeline, allowDiskUse=True)
+                break
+            except pymongo.errors.PyMongoError as e:
+                if tentativa == retries:
+                    raise
+                # O $merge com 'replace' torna a nova tentativa idempotente
+                logging.warning(f'Partição {particao["indice"]} de {collection_name_out} falhou '
+                                f'(tentativa {tentativa + 1}): {e}')
+                time.sleep(2 ** tentativa)
+
+        self.collection.database[COLECAO_PARTICOES].update_one({'_id': particao['_id']},
+                                                               {'$set': {'concluida': True}})
+        return time.perf_counter() - inicio
+
+    def apply_partitioned(self, pipeline: list, collection_name_out: str, partitions: int = 8,
+                          max_workers: int = None, partition_field: str = '_id', retries: int = 3,
+                          watermark_fields: tuple = None, merge_key: str = '_id', force: bool = False,
+                          indexes: list = None):
+        """
+        Reconstrói a coleção de saída executando o pipeline em partições da origem, em paralelo.
+
+        A origem é dividida com $bucketAuto em intervalos de partition_field e cada partição roda em uma
+        thread (sobre o pool do cliente), gravando com $merge em merge_key. Assim o servidor usa vários
+        núcleos e cada agregação faz o $unwind de uma fração dos usuários. O progresso fica em
+        COLECAO_PARTICOES: se alguma partição falhar após as novas tentativas, executar de novo retoma
+        apenas as partições pendentes. Documentos sem partition_field não entram em nenhuma partição.
+
+        Se a saída já existe com o mesmo pipeline e não há reconstrução pendente, segue o caminho de
+        check_or_create_collection (atualização incremental ou nada).
+
+        Args:
+            pipeline (list): Estágios do pipeline (um $out/$merge final é ignorado).
+            collection_name_out (str): Coleção de saída.
+            partitions (int): Quantidade de partições.
+            max_workers (int): Threads simultâneas. Padrão: min(partitions, núcleos).
+            partition_field (str): Campo da origem usado para particionar.
+            retries (int): Novas tentativas por partição.
+            watermark_fields (tuple): Marcas d'água registradas ao final (ver materialize).
+            merge_key (str): Campo da saída usado pelo $merge.
+            force (bool): Se True, reconstrói mesmo que a saída esteja atualizada.
+            indexes (list): Índices criados na saída ao final.
+
+        Raises:
+            RuntimeError: Se alguma partição falhar em todas as tentativas.
+        """
+        db = self.collection.database
+        estagios = [estagio for estagio in pipeline if '$out' not in estagio and '$merge' not in estagio]
+        hash_pipeline = CollectionFilters.pipeline_hash(estagios)
+        progresso = db[COLECAO_PARTICOES]
+
+        pendente = progresso.find_one({'saida': collection_name_out, 'hash_pipeline': hash_pipeline})
+        registro = db[COLECAO_MATERIALIZACOES].find_one({'_id': collection_name_out})
+        if (not force and pendente is None and registro is not None and registro['hash_pipeline'] == hash_pipeline
+                and collection_name_out in db.list_collection_names()):
+            return self.check_or_create_collection(estagios, collection_name_out, watermark_fields, merge_key,
+                                                   indexes=indexes)
+
+        if pendente is None:
+            self.create_watermark_indexes(watermark_fields)
+            marcas = {field.replace('.', '_'): self.watermark(field) for field in watermark_fields or ()}
+            progresso.delete_many({'saida': collection_name_out})
+            db.drop_collection(collection_name_out)
+
+            limites = self.partition_bounds(partition_field, partitions)
+            if limites:
+                progresso.insert_many([
+                    {
+                        '_id': f'{collection_name_out}:{indice}',
+                        'saida': collection_name_out,
+                        'hash_pipeline': hash_pipeline,
+                        'marcas_dagua': marcas,
+                        'indice': indice,
+                        'campo': partition_field,
+                        'minimo': minimo,
+                        'maximo': maximo,
+                        'ultima': indice == len(limites) - 1,
+                        'concluida': False
+                    }
+                    for indice, (minimo, maximo) in enumerate(limites)
+                ])
+                logging.info(f'Criando a coleção {collection_name_out} em {len(limites)} partições')
+            else:
+                # Origem vazia: não há partições a executar, mas a saída é criada (vazia) e registrada
+                db.create_collection(collection_name_out)
+                logging.info(f'Coleção {self.collection.name} vazia; {collection_name_out} criada sem documentos')
+        else:
+            marcas = pendente['marcas_dagua']
+            logging.info(f'Retomando a criação da coleção {collection_name_out}')
+
+        total = progresso.count_documents({'saida': collection_name_out})
+        pendentes = list(progresso.find({'saida': collection_name_out, 'concluida': False}).sort('indice'))
+        concluidas = total - len(pendentes)
+        falhas = []
+
+        with ThreadPoolExecutor(max_workers=max_workers or min(total, os.cpu_count() or 1) or 1) as executor:
+            futuros = {
+                executor.submit(self._executar_particao, estagios, particao, collection_name_out, merge_key,
+                                retries): particao
+                for particao in pendentes
+            }
+            for futuro in as_completed(futuros):
+                particao = futuros[futuro]
+                try:
+                    duracao = futuro.result()
+                except pymongo.errors.PyMongoError as e:
+                    falhas.append(particao['indice'])
+                    logging.error(f'Partição {particao["indice"]} de {collection_name_out} falhou: {e}')
+                    continue
+                concluidas += 1
+                logging.info(f'Partição {particao["indice"]} de {collection_name_out} concluída em {duracao:.1f}s '
+                             f'({concluidas}/{total})')
+
+        if falhas:
+            raise RuntimeError(f'Partições {sorted(falhas)} de {collection_name_out} falharam; '
+                               f'execute novamente para retomar.')
+
+        self._registrar_materializacao(collection_name_out, hash_pipeline, marcas)
+        progresso.delete_many({'saida': collection_name_out})
+
+        self.collection_name_out = collection_name_out
+        self.collection = db[collection_name_out]
+        if indexes:
+            self.create_indexes(indexes)
+        return self.collection
+
+    def create_indexes(self, indexes: list) -> list:
+        """
+        Cria os índices na coleção atual. Índices já existentes com a mesma especificação são mantidos.
+
+        Args:
+            indexes (list): Índices, cada um como lista de pares (campo, direção).
+
+        Returns:
+            list: Nomes dos índices.
+        """
+        modelos = [pymongo.IndexModel(chaves) for chaves in indexes]
+        nomes = self.collection.create_indexes(modelos)
+        logging.info(f'Índices em {self.collection.name}: {", ".join(nomes)}')
+        return nomes
+
+    @staticmethod
+    def suggest_index(pipeline: list) -> list:
+        """
+        Sugere um índice para um pipeline a partir do $match inicial, na ordem igualdade, ordenação,
+        intervalo. Se o estágio seguinte for um $group por um campo, ele é acrescentado ao final para
+        que a consulta seja coberta pelo índice.
+
+        Args:
+            pipeline (list): Pipeline de agregação.
+
+        Returns:
+            list: Pares (campo, direção), vazia se o pipeline não começa com $match.
+        """
+        if not pipeline or '$match' not in pipeline[0]:
+            return []
+
+        igualdade, intervalo, ordenacao = [], [], []
+        for campo, condicao in pipeline[0]['$match'].items():
+            if campo.startswith('$'):
+                continue
+            if isinstance(condicao, dict) and not set(condicao) <= OPERADORES_IGUALDADE:
+                intervalo.append(campo)
+            else:
+                igualdade.append(campo)
+
+        seguintes = pipeline[1:]
+        if seguintes and '$sort' in seguintes[0]:
+            ordenacao = [campo for campo in seguintes[0]['$sort'] if campo not in igualdade]
+            seguintes = seguintes[1:]
+
+        campos = igualdade + ordenacao + [campo for campo in intervalo if campo not in ordenacao]
+        if seguintes and '$group' in seguintes[0]:
+            chave_grupo = seguintes[0]['$group'].get('_id')
+            if isinstance(chave_grupo, str) and chave_grupo.startswith('$') and chave_grupo[1:] not in campos:
+                campos.append(chave_grupo[1:])
+
+        return [(campo, pymongo.ASCENDING) for campo in campos]
+
+    def ensure_index(self, pipeline: list) -> str | None:
+        """
+        Cria, se ainda não existir, o índice sugerido por suggest_index para o pipeline.
+
+        Returns:
+            str | None: Nome do índice, ou None se não há sugestão.
+        """
+        chaves = CollectionFilters.suggest_index(pipeline)
+        if not chaves:
+            return None
+        return self.collection.create_index(chaves)
+
+    @staticmethod
+    def _percorrer_plano(plano, estagios: list, indices: list) -> None:
+        if isinstance(plano, dict):
+            if isinstance(plano.get('stage'), str):
+                estagios.append(plano['stage'])
+            if isinstance(plano.get('indexName'), str):
+                indices.append(plano['indexName'])
+            for chave, valor in plano.items():
+                if chave not in ('rejectedPlans', 'allPlansExecution'):
+                    CollectionFilters._percorrer_plano(valor, estagios, indices)
+        elif isinstance(plano, list):
+            for item in plano:
+                CollectionFilters._percorrer_plano(item, estagios, indices)
+
+    @staticmethod
+    def _somar_estatisticas(plano, chave: str) -> int:
+        # Soma 'chave' nos executionStats de todos os shards/estágios (sem descer nos planos rejeitados)
+        if isinstance(plano, list):
+            return sum(CollectionFilters._somar_estatisticas(item, chave) for item in plano)
+        if not isinstance(plano, dict):
+            return 0
+        if 'executionStats' in plano and chave in plano['executionStats']:
+            return plano['executionStats'][chave]
+        return sum(CollectionFilters._somar_estatisticas(valor, chave)
+                   for nome, valor in plano.items() if nome not in ('rejectedPlans', 'allPlansExecution'))
+
+    def explain(self, pipeline: list) -> dict:
+        """
+        Executa o explain (executionStats) de um pipeline e resume o plano vencedor.
+
+        Args:
+            pipeline (list): Pipeline de agregação.
+
+        Returns:
+            dict: 'estagios' do plano, 'indices' usados, 'collscan' (bool), 'documentos_examinados',
+            'chaves_examinadas' e 'indice_sugerido' (suggest_index).
+        """
+        resultado = self.collection.database.command({
+            'explain': {'aggregate': self.collection.name, 'pipeline': pipeline, 'cursor': {}},
+            'verbosity': 'executionStats'
+        })
+
+        estagios, indices = [], []
+        CollectionFilters._percorrer_plano(resultado, estagios, indices)
+        resumo = {
+            'estagios': estagios,
+            'indices': sorted(set(indices)),
+            'collscan': 'COLLSCAN' in estagios,
+            'documentos_examinados': CollectionFilters._somar_estatisticas(resultado, 'totalDocsExamined'),
+            'chaves_examinadas': CollectionFilters._somar_estatisticas(resultado, 'totalKeysExamined'),
+            'indice_sugerido': CollectionFilters.suggest_index(pipeline),
+        }
+
+        if resumo['collscan']:
+            logging.warning(f'Varredura completa em {self.collection.name}; índice sugerido: '
+                            f'{resumo["indice_sugerido"]}')
+        else:
+            logging.info(f'{self.collection.name}: índices usados {resumo["indices"]}, '
+                         f'{resumo["chaves_examinadas"]} chaves e {resumo["documentos_examinados"]} documentos examinados')
+        return resumo
+
+    def index_usage(self) -> list:
+        """
+        Uso de cada índice da coleção atual desde o último reinício do servidor ($indexStats).
+
+        Returns:
+            list: Dicionários com 'nome', 'chaves', 'operacoes' e 'desde'.
+        """
+        return [
+            {
+                'nome': estatistica['name'],
+                'chaves': estatistica['key'],
+                'operacoes': estatistica['accesses']['ops'],
+                'desde': estatistica['accesses']['since']
+            }
+            for estatistica in self.collection.aggregate([{'$indexStats': {}}])
         ]
-        self.check_or_create_collection(pipeline6, collection_name_out)
+
+    def collection_version(self) -> str | None:
+        """
+        Versão da coleção atual segundo o registro de materialização (hash do pipeline, marcas d'água e
+        instante da última atualização). None se a coleção não foi materializada por materialize.
+        """
+        registro = self.collection.database[COLECAO_MATERIALIZACOES].find_one({'_id': self.collection.name})
+        if registro is None:
+            return None
+        registro.pop('_id', None)
+        return CollectionFilters.pipeline_hash([registro])
+
+    def user_breakdown(self, fields: list, by: list = ('sexo',), cache: bool = True) -> pd.DataFrame:
+        """
+        Quantidade de usuários distintos por nível de cada campo e por cada combinação dos campos de 'by',
+        em uma única agregação.
+
+        Os posts são agrupados por usuário uma única vez (os itens do BDI, idade e sexo são constantes por
+        usuário) e um $facet conta os usuários de cada campo. Substitui as chamadas repetidas a
+        quant_users_cat e count_users_by_gender, um $match+$group+$count por (campo, nível, gênero).
+
+        Args:
+            fields (list): Campos cujos níveis serão contados, ex.: ['suicida', 'tristeza'].
+            by (list): Campos de quebra, ex.: ['sexo']. Vazio para contar apenas por nível.
+            cache (bool): Se True, reaproveita o resultado enquanto a versão da coleção (collection_version)
+                não mudar.
+
+        Returns:
+            pd.DataFrame: Colunas 'campo', 'nivel', os campos de 'by' e 'usuarios'.
+        """
+        fields, by = list(fields), list(by)
+        colunas = ['campo', 'nivel', *by, 'usuarios']
+
+        versao = self.collection_version() if cache else None
+        chave_cache = None
+        if versao is not None:
+            chave_cache = CollectionFilters.pipeline_hash([self.collection.name, versao, fields, by])
+            em_cache = self.collection.database[COLECAO_CACHE_CONSULTAS].find_one({'_id': chave_cache})
+            if em_cache is not None:
+                logging.info(f'Contagem de usuários de {self.collection.name} lida do cache')
+                return pd.DataFrame(em_cache['resultado'], columns=colunas)
+
+        pipeline = [
+            {
+                '$group': {
+                    '_id': '$id_usuario',
+                    **{campo: {'$first': f'${campo}'} for campo in dict.fromkeys(fields + by)}
+                }
+            },
+            {
+                '$facet': {
+                    f'f{posicao}': [
+                        {
+                            '$group': {
+                                '_id': {'nivel': f'${campo}', **{quebra: f'${quebra}' for quebra in by}},
+                                'usuarios': {'$sum': 1}
+                            }
+                        }
+                    ]
+                    for posicao, campo in enumerate(fields)
+                }
+            }
+        ]
+
+        # Executando a agregação
+        facetas = next(self.collection.aggregate(pipeline, allowDiskUse=True), {})
+        linhas = [
+            {'campo': campo, 'nivel': grupo['_id'].get('nivel'),
+             **{quebra: grupo['_id'].get(quebra) for quebra in by}, 'usuarios': grupo['usuarios']}
+            for posicao, campo in enumerate(fields)
+            for grupo in facetas.get(f'f{posicao}', [])
+        ]
+        resultado = pd.DataFrame(linhas, columns=colunas)
+        resultado = resultado.sort_values(colunas[:-1], ignore_index=True, na_position='last')
+
+        if chave_cache is not None:
+            self.collection.database[COLECAO_CACHE_CONSULTAS].replace_one(
+                {'_id': chave_cache},
+                {'_id': chave_cache, 'colecao': self.collection.name, 'resultado': resultado.to_dict('records'),
+                 'criado_em': datetime.utcnow()},
+                upsert=True
+            )
+        return resultado
 
     def quant_users_cat(self, field: str, operator: str, level: int | str):
         pipeline = [
@@ -389,3 +1162,219 @@ class CollectionFilters:
         resultado = list(self.collection.aggregate(pipeline))
 
         return resultado[0][f'numero_de_usuarios_{gender.lower()}'] if resultado else 0
+
+
+class PipelineBuilder:
+    """
+    Compõe estágios de agregação de forma preguiçosa e os executa como uma única agregação.
+
+    Nada é executado ao adicionar estágios. Em build/run, os estágios de todas as etapas são
+    concatenados e otimizados:
+        - o $switch de sete ramos sobre $dayOfWeek com padrão 'Desconhecido', seguido de um $match que
+          descarta 'Desconhecido', vira um $match de data não nula antes do $project e um $arrayElemAt
+          sobre DIAS_DA_SEMANA ($dayOfWeek só retorna nulo quando a data é nula ou ausente);
+        - um $match que apenas exige o array não vazio, logo antes do $unwind desse mesmo array, é
+          removido, pois o $unwind já descarta arrays ausentes, nulos ou vazios;
+        - $match adjacentes são fundidos em um só.
+    Coleções intermediárias só são gravadas nas etapas adicionadas com materialize.
+
+    Atributos:
+        collection (pymongo.collection.Collection): Coleção de origem.
+    """
+
+    def __init__(self, collection: pymongo.collection.Collection):
+        self.collection = collection
+        self._etapas = []
+        self._campos_excluidos = []
+
+    def add(self, stages: list, materialize: str = None):
+        """
+        Adiciona uma etapa (lista de estágios) ao pipeline.
+
+        Args:
+            stages (list): Estágios da etapa, sem $out.
+            materialize (str): Se informado, o resultado acumulado até esta etapa é gravado nesta coleção.
+
+        Returns:
+            PipelineBuilder: O próprio builder, para encadeamento.
+        """
+        self._etapas.append((copy.deepcopy(list(stages)), materialize))
+        return self
+
+    def exclude_fields(self, *fields: str):
+        """
+        Remove campos das projeções do pipeline, evitando calcular o que não será usado.
+
+        Returns:
+            PipelineBuilder: O próprio builder, para encadeamento.
+        """
+        self._campos_excluidos.extend(fields)
+        return self
+
+    def segments(self) -> list:
+        """
+        Divide as etapas nos pontos de materialização e otimiza cada trecho.
+
+        Returns:
+            list: Pares (pipeline otimizado, coleção de saída ou None).
+        """
+        segmentos = []
+        atual = []
+        for estagios, materializar in self._etapas:
+            atual.extend(estagios)
+            if materializar:
+                segmentos.append((self.optimize(atual), materializar))
+                atual = []
+
+        if atual or not segmentos:
+            segmentos.append((self.optimize(atual), None))
+        return segmentos
+
+    def build(self) -> list:
+        """
+        Retorna o pipeline único otimizado (ex.: para CollectionLoader.carregar(pipeline=...)).
+
+        Raises:
+            ValueError: Se alguma etapa intermediária pede materialização.
+        """
+        segmentos = self.segments()
+        if len(segmentos) > 1 or segmentos[0][1] is not None:
+            raise ValueError('O pipeline tem materializações intermediárias; use run().')
+        return segmentos[0][0]
+
+    def run(self, collection_name_out: str = None, watermark_fields: tuple = None, merge_key: str = '_id',
+            force: bool = False, indexes: list = None):
+        """
+        Executa o pipeline, gravando as materializações pedidas e, opcionalmente, a coleção final.
+
+        Cada saída passa por CollectionFilters.materialize: é recriada se o pipeline mudou, atualizada
+        incrementalmente se as marcas d'água da origem avançaram, ou mantida. As marcas d'água valem
+        para o primeiro trecho, que lê a coleção de origem; um trecho seguinte é recriado sempre que o
+        anterior muda.
+
+        Args:
+            collection_name_out (str): Coleção final. Se None, retorna o cursor da agregação final.
+            watermark_fields (tuple): Campos da coleção de origem usados como marca d'água.
+            merge_key (str): Campo da saída usado pelo $merge nas atualizações incrementais.
+            force (bool): Se True, recria todas as coleções de saída.
+            indexes (list): Índices criados na coleção final.
+
+        Returns:
+            pymongo.collection.Collection | pymongo.command_cursor.CommandCursor: Coleção final ou cursor.
+        """
+        origem = self.collection
+        alterado = force
+        for posicao, (pipeline, saida) in enumerate(self.segments()):
+            if saida is None:
+                if not collection_name_out:
+                    return origem.aggregate(pipeline, allowDiskUse=True)
+                saida = collection_name_out
+
+            filtros = CollectionFilters(origem)
+            if posicao == 0:
+                alterado = filtros.materialize(pipeline, saida, watermark_fields, merge_key, force)
+            else:
+                alterado = filtros.materialize(pipeline, saida, force=alterado)
+            origem = origem.database[saida]
+
+        if indexes and collection_name_out:
+            CollectionFilters(origem).create_indexes(indexes)
+        return origem
+
+    def optimize(self, stages: list) -> list:
+        estagios = copy.deepcopy(list(stages))
+        estagios = PipelineBuilder._reescrever_dia_da_semana(estagios)
+        estagios = PipelineBuilder._remover_match_antes_unwind(estagios)
+        estagios = PipelineBuilder._fundir_matches(estagios)
+
+        for estagio in estagios:
+            if '$project' in estagio:
+                for campo in self._campos_excluidos:
+                    estagio['$project'].pop(campo, None)
+        return estagios
+
+    @staticmethod
+    def _caminho_dia_da_semana(expressao):
+        # Retorna a expressão de data se 'expressao' for o $switch de dia da semana do apply_pipeline3
+        if not isinstance(expressao, dict) or set(expressao) != {'$switch'}:
+            return None
+        switch = expressao['$switch']
+        ramos = switch.get('branches', [])
+        if switch.get('default') != 'Desconhecido' or len(ramos) != len(DIAS_DA_SEMANA):
+            return None
+
+        caminho = None
+        for numero, ramo in enumerate(ramos, start=1):
+            try:
+                dia, valor = ramo['case']['$eq']
+                data = dia['$dayOfWeek']
+            except (KeyError, TypeError, ValueError):
+                return None
+            if valor != numero or ramo.get('then') != DIAS_DA_SEMANA[numero - 1] or caminho not in (None, data):
+                return None
+            caminho = data
+
+        return caminho if isinstance(caminho, str) and caminho.startswith('$') else None
+
+    @staticmethod
+    def _reescrever_dia_da_semana(estagios: list) -> list:
+        resultado = []
+        indice = 0
+        while indice < len(estagios):
+            estagio = estagios[indice]
+            seguinte = estagios[indice + 1] if indice + 1 < len(estagios) else None
+
+            if '$project' in estagio and seguinte is not None and '$match' in seguinte:
+                for campo, expressao in estagio['$project'].items():
+                    caminho = PipelineBuilder._caminho_dia_da_semana(expressao)
+                    if caminho is not None and seguinte['$match'] == {campo: {'$ne': 'Desconhecido'}}:
+                        estagio['$project'][campo] = {
+                            '$arrayElemAt': [DIAS_DA_SEMANA, {'$subtract': [{'$dayOfWeek': caminho}, 1]}]
+                        }
+                        resultado.append({'$match': {caminho[1:]: {'$ne': None}}})
+                        resultado.append(estagio)
+                        indice += 2
+                        break
+                else:
+                    resultado.append(estagio)
+                    indice += 1
+                continue
+
+            resultado.append(estagio)
+            indice += 1
+
+        return resultado
+
+    @staticmethod
+    def _remover_match_antes_unwind(estagios: list) -> list:
+        resultado = []
+        for indice, estagio in enumerate(estagios):
+            seguinte = estagios[indice + 1] if indice + 1 < len(estagios) else None
+            if '$match' in estagio and seguinte is not None and '$unwind' in seguinte:
+                unwind = seguinte['$unwind']
+                if isinstance(unwind, str):
+                    unwind = {'path': unwind}
+
+                filtro = estagio['$match']
+                if (not unwind.get('preserveNullAndEmptyArrays') and len(filtro) == 1
+                        and unwind['path'][1:] in filtro):
+                    condicao = filtro[unwind['path'][1:]]
+                    if (isinstance(condicao, dict) and set(condicao) <= {'$exists', '$ne'}
+                            and condicao.get('$exists', True) is True and condicao.get('$ne', []) in ([], None)):
+                        continue
+            resultado.append(estagio)
+        return resultado
+
+    @staticmethod
+    def _fundir_matches(estagios: list) -> list:
+        resultado = []
+        for estagio in estagios:
+            if resultado and '$match' in estagio and '$match' in resultado[-1]:
+                anterior = resultado[-1]['$match']
+                if set(anterior).isdisjoint(estagio['$match']):
+                    anterior.update(estagio['$match'])
+                else:
+                    resultado[-1] = {'$match': {'$and': [anterior, estagio['$match']]}}
+                continue
+            resultado.append(estagio)
+        return resultado
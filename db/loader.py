@@ -0,0 +1,191 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pymongo
+from pandas.api.types import union_categoricals
+
+# Configurando o logger
+logging.basicConfig(level=logging.INFO)
+
+# Respostas do BDI projetadas pelo apply_pipeline3 (valores de 0 a 3)
+COLUNAS_BDI = [
+    'pessimismo', 'tristeza', 'fracasso', 'prazer', 'culpa', 'punicao', 'estima', 'critica', 'suicida', 'choro',
+    'agitacao', 'interesse', 'indecisao', 'desvalorizacao', 'energia', 'sono', 'irritabilidade', 'apetite',
+    'concentracao', 'fadiga', 'int_sexo'
+]
+
+# Esquema da coleção 'posts'. '_id' e 'diaDaSemana' ficam de fora, pois eram descartados logo após a leitura.
+ESQUEMA_POSTS = {
+    'id_usuario': 'object',
+    'idade': 'Int16',
+    'sexo': 'category',
+    **{coluna: 'int8' for coluna in COLUNAS_BDI},
+    'quantAmigos': 'int32',
+    'postMessage': 'object',
+    'postStory': 'object',
+    'postCreatedTime': 'datetime64[ns]',
+}
+
+# Esquema da coleção 'likes'
+ESQUEMA_LIKES = {
+    'id_usuario': 'object',
+    'likeCreatedTime': 'datetime64[ns]',
+}
+
+
+class CollectionLoader:
+    """
+    Carrega uma coleção do MongoDB em um DataFrame tipado, lendo o cursor em lotes.
+
+    Substitui pd.DataFrame(list(collection.find())): apenas os campos do esquema são trazidos do
+    servidor (projeção), cada lote é convertido direto para arrays do tipo final e a lista de
+    dicionários do lote é descartada em seguida. Ao final, as colunas são concatenadas uma a uma,
+    liberando os lotes de cada coluna logo depois, de modo que o pico de memória fica próximo do
+    tamanho do DataFrame final.
+
+    Atributos:
+        collection (pymongo.collection.Collection): Coleção de origem.
+        esquema (dict): Mapeamento coluna -> dtype do pandas.
+        batch_size (int): Quantidade de documentos por lote do cursor.
+        valor_preenchimento (int): Valor usado nos nulos das colunas inteiras sem suporte a nulos
+            (mesmo papel do preencher_e_converter dos notebooks).
+    """
+
+    def __init__(self, collection: pymongo.collection.Collection, esquema: dict = None, batch_size: int = 10_000,
+                 valor_preenchimento: int = 0):
+        """
+        Inicializa o carregador.
+
+        Args:
+            collection (pymongo.collection.Collection): Coleção de origem.
+            esquema (dict): Mapeamento coluna -> dtype. Por padrão, ESQUEMA_POSTS.
+            batch_size (int): Quantidade de documentos por lote do cursor.
+            valor_preenchimento (int): Valor usado nos nulos das colunas inteiras.
+        """
+        self.collection = collection
+        self.esquema = dict(esquema if esquema is not None else ESQUEMA_POSTS)
+        self.batch_size = batch_size
+        self.valor_preenchimento = valor_preenchimento
+
+    def projecao(self) -> dict:
+        projecao = {coluna: 1 for coluna in self.esquema}
+        if '_id' not in self.esquema:
+            projecao['_id'] = 0
+        return projecao
+
+    def _cursor(self, filtro: dict = None, pipeline: list = None):
+        if pipeline is None:
+            return self.collection.find(filtro or {}, self.projecao(), batch_size=self.batch_size)
+
+        # A projeção é aplicada como último estágio do pipeline informado
+        pipeline = list(pipeline) + [{'$project': self.projecao()}]
+        return self.collection.aggregate(pipeline, batchSize=self.batch_size, allowDiskUse=True)
+
+    @staticmethod
+    def _objetos(valores: list) -> np.ndarray:
+        array = np.empty(len(valores), dtype=object)
+        array[:] = valores
+        return array
+
+    def _converter_coluna(self, valores: list, dtype):
+        """
+        Converte os valores de uma coluna de um lote para o tipo do esquema.
+
+        Returns:
+            np.ndarray | pd.Categorical | pd.api.extensions.ExtensionArray: Valores convertidos.
+        """
+        dtype_pandas = pd.api.types.pandas_dtype(dtype)
+
+        if isinstance(dtype_pandas, pd.CategoricalDtype):
+            if dtype_pandas.categories is not None:
+                return pd.Categorical(valores, dtype=dtype_pandas)
+            # Categorias sempre como object: um lote todo nulo não pode gerar categorias float64,
+            # que o union_categoricals recusa ao juntar com os demais lotes
+            array = CollectionLoader._objetos(valores)
+            categorias = pd.Index(pd.unique(array[pd.notna(array)]), dtype=object)
+            return pd.Categorical(array, categories=categorias)
+
+        if dtype_pandas.kind == 'M':
+            return pd.to_datetime(pd.Series(valores, dtype=object)).to_numpy(dtype=dtype_pandas)
+
+        if isinstance(dtype_pandas, np.dtype) and dtype_pandas.kind in 'iu':
+            numeros = pd.to_numeric(pd.Series(valores, dtype=object))
+            return numeros.fillna(self.valor_preenchimento).to_numpy(dtype=dtype_pandas)
+
+        if isinstance(dtype_pandas, np.dtype) and dtype_pandas.kind == 'O':
+            return CollectionLoader._objetos(valores)
+
+        return pd.array(valores, dtype=dtype_pandas)
+
+    @staticmethod
+    def _concatenar(partes: list, dtype):
+        if not partes:
+            return pd.Series([], dtype=dtype).array
+        if isinstance(partes[0], pd.Categorical):
+            return union_categoricals(partes, sort_categories=True)
+        if isinstance(partes[0], np.ndarray):
+            return np.concatenate(partes)
+        return pd.concat([pd.Series(parte, copy=False) for parte in partes], ignore_index=True).array
+
+    def _lotes(self, cursor):
+        lote = []
+        for documento in cursor:
+            lote.append(documento)
+            if len(lote) >= self.batch_size:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    def _converter_lote(self, lote: list) -> dict:
+        return {
+            coluna: self._converter_coluna([documento.get(coluna) for documento in lote], dtype)
+            for coluna, dtype in self.esquema.items()
+        }
+
+    def iter_chunks(self, filtro: dict = None, pipeline: list = None):
+        """
+        Lê a coleção em chunks tipados, sem materializar a coleção inteira.
+
+        Útil para alimentar os modos streaming (ExtracaoInteracao.extrair_chunks,
+        TextVectorization.*_streaming).
+
+        Args:
+            filtro (dict): Filtro do find. Ignorado se pipeline for informado.
+            pipeline (list): Pipeline de agregação opcional, executado antes da projeção.
+
+        Yields:
+            pd.DataFrame: Chunks com no máximo batch_size linhas e as colunas do esquema.
+        """
+        for lote in self._lotes(self._cursor(filtro, pipeline)):
+            yield pd.DataFrame(self._converter_lote(lote), copy=False)
+
+    def carregar(self, filtro: dict = None, pipeline: list = None) -> pd.DataFrame:
+        """
+        Carrega a coleção (ou o resultado de um pipeline) em um único DataFrame tipado.
+
+        Args:
+            filtro (dict): Filtro do find. Ignorado se pipeline for informado.
+            pipeline (list): Pipeline de agregação opcional, executado antes da projeção.
+
+        Returns:
+            pd.DataFrame: DataFrame com as colunas do esquema, na ordem do esquema.
+        """
+        partes = {coluna: [] for coluna in self.esquema}
+        total = 0
+        for lote in self._lotes(self._cursor(filtro, pipeline)):
+            for coluna, valores in self._converter_lote(lote).items():
+                partes[coluna].append(valores)
+            total += len(lote)
+
+        # Concatena coluna por coluna, liberando os lotes da coluna assim que ela fica pronta
+        colunas = {}
+        for coluna, dtype in self.esquema.items():
+            colunas[coluna] = CollectionLoader._concatenar(partes[coluna], dtype)
+            partes[coluna] = None
+
+        df = pd.DataFrame(colunas, copy=False)
+        logging.info(f'{total} documentos carregados de {self.collection.name} '
+                     f'({df.memory_usage(deep=False).sum() / 1e6:.1f} MB)')
+        return df
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.artefato_vetorizacao import ArtefatoVetorizacao
+
+
+def test_salvar_carregar_com_ids_texto(tmp_path):
+    # Ids como texto, como os do CollectionLoader e do GeradorDadosSinteticos
+    df = pd.DataFrame({
+        'id_usuario': np.array(['100000000000001', '100000000000002', '100000000000001'], dtype=object),
+        'postMessageLimpo': ['dia feliz praia', 'noite triste', 'praia sol'],
+    }, index=pd.Index(['a', 'b', 'c'], dtype=object))
+
+    artefato = ArtefatoVetorizacao.ajustar(df, stop_words=None, diretorio=str(tmp_path))
+    carregado = ArtefatoVetorizacao.carregar(str(tmp_path))
+
+    assert list(carregado.usuarios) == list(df['id_usuario'])
+    assert list(carregado.indice) == list(df.index)
+    assert (carregado.matriz != artefato.matriz).nnz == 0
+
+    matriz, usuarios = carregado.fatiar(['100000000000001'])
+    assert matriz.shape[0] == 2
+    assert np.all(usuarios == '100000000000001')
+
+
+def test_ids_inteiros_continuam_inteiros(tmp_path):
+    # Ids inteiros em uma coluna object, como depois de um concat com valores ausentes
+    df = pd.DataFrame({
+        'id_usuario': np.array([1466776020086339, 1466776020086340, 1466776020086339], dtype=object),
+        'postMessageLimpo': ['dia feliz praia', 'noite triste', 'praia sol'],
+    })
+    ArtefatoVetorizacao.ajustar(df, stop_words=['dia'], diretorio=str(tmp_path))
+    carregado = ArtefatoVetorizacao.carregar(str(tmp_path), stop_words=['dia'])
+
+    assert carregado.usuarios.dtype == np.int64
+    assert carregado.fatiar([1466776020086339])[0].shape[0] == 2
+    assert carregado.fatiar(['1466776020086340'])[0].shape[0] == 1
+
+
+def test_carregar_confere_stopwords(tmp_path):
+    df = pd.DataFrame({'id_usuario': ['a', 'b'], 'postMessageLimpo': ['dia feliz', 'noite triste']})
+    ArtefatoVetorizacao.ajustar(df, stop_words=['dia'], diretorio=str(tmp_path))
+
+    with pytest.raises(ValueError):
+        ArtefatoVetorizacao.carregar(str(tmp_path), stop_words=['noite'])
@@ -0,0 +1,60 @@
+import sqlite3
+import subprocess
+import sys
+
+from utils.cache_lematizacao import CacheLematizacao
+
+
+def _linhas(caminho):
+    conexao = sqlite3.connect(caminho)
+    try:
+        return dict(conexao.execute('SELECT chave, valor FROM lematizacao').fetchall())
+    finally:
+        conexao.close()
+
+
+def test_pendencias_gravadas_na_saida_sem_gravar(tmp_path):
+    # Caminho do preprocessamento_texto: apenas guardar, sem gravar()/fechar() antes de o processo terminar
+    caminho = str(tmp_path / 'lematizacao.sqlite')
+    codigo = (
+        'from utils.cache_lematizacao import CacheLematizacao\n'
+        f'cache = CacheLematizacao({caminho!r})\n'
+        "cache.guardar('a', 'casa')\n"
+        "cache.guardar('b', 'correr')\n"
+    )
+    subprocess.run([sys.executable, '-c', codigo], check=True)
+
+    assert _linhas(caminho) == {'a': 'casa', 'b': 'correr'}
+
+
+def test_limite_lru_com_total_em_memoria(tmp_path):
+    caminho = str(tmp_path / 'lematizacao.sqlite')
+    cache = CacheLematizacao(caminho, max_entradas=3)
+    cache.guardar_varios({'a': '1', 'b': '2'})
+    cache.gravar()
+    cache.obter('a')
+    cache.guardar_varios({'a': '1', 'c': '3', 'd': '4'})
+    cache.fechar()
+
+    # 'b' é a entrada usada há mais tempo; regravar 'a' não conta como entrada nova
+    assert _linhas(caminho) == {'a': '1', 'c': '3', 'd': '4'}
+
+    cache = CacheLematizacao(caminho, max_entradas=3)
+    assert cache._pendentes.total == 3
+    cache.fechar()
+
+
+def test_acertos_em_memoria_atualizam_o_lru_em_disco(tmp_path):
+    caminho = str(tmp_path / 'lematizacao.sqlite')
+    cache = CacheLematizacao(caminho, max_entradas=2)
+    cache.guardar('a', '1')
+    cache.gravar()
+    cache.guardar('b', '2')
+    cache.gravar()
+
+    # 'a' é servida da memória; em disco, 'b' passa a ser a menos usada
+    assert cache.obter('a') == '1'
+    cache.guardar('c', '3')
+    cache.fechar()
+
+    assert _linhas(caminho) == {'a': '1', 'c': '3'}
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pymongo.errors
+import pytest
+
+from db import connection_db
+
+
+class ClienteFalso:
+    """MongoClient em que o ping da URI 'lenta' demora e falha, como um servidor inacessível."""
+
+    criados = []
+
+    def __init__(self, uri, **opcoes):
+        self.uri = uri
+        self.fechado = False
+        self.admin = self
+        ClienteFalso.criados.append(self)
+
+    def command(self, nome):
+        if self.uri == 'lenta':
+            time.sleep(0.5)
+            raise pymongo.errors.ServerSelectionTimeoutError('inacessível')
+        return {'ok': 1}
+
+    def close(self):
+        self.fechado = True
+
+
+@pytest.fixture(autouse=True)
+def cliente_falso(monkeypatch):
+    ClienteFalso.criados = []
+    monkeypatch.setattr(connection_db.pymongo, 'MongoClient', ClienteFalso)
+    yield
+    connection_db.close_all_clients()
+
+
+def test_uri_inacessivel_nao_bloqueia_outras_nem_fica_no_registro():
+    erros = []
+
+    def conectar_lenta():
+        try:
+            connection_db.get_client('lenta')
+        except pymongo.errors.ServerSelectionTimeoutError as e:
+            erros.append(e)
+
+    thread = threading.Thread(target=conectar_lenta)
+    thread.start()
+    time.sleep(0.1)
+
+    inicio = time.perf_counter()
+    cliente = connection_db.get_client('rapida')
+    assert time.perf_counter() - inicio < 0.3
+    thread.join()
+
+    assert erros
+    lentos = [criado for criado in ClienteFalso.criados if criado.uri == 'lenta']
+    assert lentos and all(criado.fechado for criado in lentos)
+    assert connection_db.get_client('rapida') is cliente
+    assert all(registrado.uri == 'rapida' for registrado in connection_db._clientes.values())
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from utils.cubo_atividade import EVENTOS, CuboAtividade
+
+
+def test_construir_ignora_datas_ausentes():
+    df_likes = pd.DataFrame({
+        'id_usuario': ['u1', 'u1', 'u2', 'u2'],
+        'data': pd.to_datetime(['2020-01-01', None, '2020-01-03', '2020-01-03']),
+    })
+    df_posts = df_likes.iloc[:0].assign(**{evento: pd.Series(dtype=np.int64) for evento in EVENTOS[:-1]})
+
+    cubo = CuboAtividade.construir(df_posts, df_likes)
+
+    assert cubo.cubo.shape == (2, 3, len(EVENTOS))
+    totais = cubo.totais().set_index('id_usuario')
+    assert totais['quantLikes'].to_dict() == {'u1': 1, 'u2': 2}
+
+
+def test_janelas_fora_do_cubo_sao_vazias():
+    df_likes = pd.DataFrame({
+        'id_usuario': ['u1', 'u1', 'u2'],
+        'data': pd.to_datetime(['2020-01-01', '2020-01-05', '2020-01-10']),
+    })
+    df_posts = df_likes.iloc[:0].assign(**{evento: pd.Series(dtype=np.int64) for evento in EVENTOS[:-1]})
+    cubo = CuboAtividade.construir(df_posts, df_likes)
+
+    janelas = [('2019-12-01', '2019-12-28'), ('2020-02-01', '2020-02-10'), ('2020-01-06', '2020-01-02')]
+    for inicio, fim in janelas:
+        assert cubo.fatiar(inicio=inicio, fim=fim).shape == (2, 0, len(EVENTOS))
+        assert cubo.totais(inicio=inicio, fim=fim)['quantLikes'].sum() == 0
+        assert cubo.agregar('W', inicio=inicio, fim=fim)[0].shape[1] == 0
+        assert cubo.eventos_por_dia('u1', 'quantLikes', inicio=inicio, fim=fim).empty
+        assert all(len(serie) == 0 for serie in cubo.series_diarias('quantLikes', inicio=inicio, fim=fim)[1])
+
+    # Janelas que cortam as bordas do cubo
+    assert cubo.fatiar(inicio='2019-12-25', fim='2020-01-01').shape[1] == 1
+    assert cubo.fatiar(inicio='2020-01-10', fim='2020-03-01').shape[1] == 1
@@ -0,0 +1,10 @@
+from db.dados_sinteticos import GeradorDadosSinteticos
+
+
+def test_mesma_semente_mesmos_documentos():
+    primeiro = list(GeradorDadosSinteticos(semente=7).usuarios(3))
+    segundo = list(GeradorDadosSinteticos(semente=7).usuarios(3))
+
+    # Inclui os _id dos posts e likes
+    assert primeiro == segundo
+    assert primeiro != list(GeradorDadosSinteticos(semente=8).usuarios(3))
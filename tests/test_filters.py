@@ -0,0 +1,17 @@
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+from db.filters import CollectionFilters  # noqa: E402
+
+
+def test_materialize_indexa_marcas_dagua_na_origem():
+    db = mongomock.MongoClient().db
+    db.dadosSemFiltros.insert_many([{'posts': [{'created_time': 1}]}, {'posts': [{'created_time': 5}]}])
+
+    filtros = CollectionFilters(db.dadosSemFiltros)
+    filtros.materialize([{'$match': {}}], 'saida', ('_id', 'posts.created_time'))
+
+    chaves = [indice['key'] for indice in db.dadosSemFiltros.index_information().values()]
+    assert [('posts.created_time', 1)] in chaves
+    assert filtros.watermark('posts.created_time') == 5
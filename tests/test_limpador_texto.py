@@ -0,0 +1,47 @@
+import re
+import string
+
+import pytest
+
+from utils.limpador_texto import LimpadorTexto
+
+
+def remove_caracteres_original(texto) -> str:
+    # Etapas do antigo TextTreatment.remove_caracteres; emoji.replace_emoji é omitido porque,
+    # depois de [^a-zà-ù ], não sobram emojis no texto
+    texto = texto.lower().strip()
+    texto = re.sub(r'<.*?>', '', texto)
+    texto = re.sub(r'[%s]' % re.escape(string.punctuation), ' ', texto)
+    texto = re.sub(r'\s+', ' ', texto)
+    texto = re.sub(r'\[[0-9]*]', ' ', texto)
+    texto = re.sub(r'[^\w\s]', '', texto)
+    texto = re.sub(r'\d', ' ', texto)
+    texto = re.sub(r"\$", "", texto)
+    texto = re.sub(r"https?://\S+", '', texto)
+    texto = re.sub(r"#", "", texto)
+    texto = re.sub(r'<a href.*?>', ' ', texto)
+    texto = re.sub(r'&amp;', '', texto)
+    texto = re.sub(r'[_"\-;%()|+&=*.,!?:#$@\[\]/]', ' ', texto)
+    texto = re.sub(r'<br />', ' ', texto)
+    texto = re.sub(r'[^a-zà-ù ]', ' ', texto)
+    texto = re.sub(r'k{2,}', '', texto, flags=re.IGNORECASE)
+    texto = re.sub(r'j{2,}', '', texto, flags=re.IGNORECASE)
+    texto = re.sub(r'(ks){2,}', '', texto, flags=re.IGNORECASE)
+    texto = re.sub(r'(ha){2,}', '', texto, flags=re.IGNORECASE)
+    texto = re.sub(r'a{2,}', '', texto, flags=re.IGNORECASE)
+    return texto
+
+
+@pytest.mark.parametrize('codigo', range(0x20, 0x180))
+def test_caracteres_latin1_iguais_ao_original(codigo):
+    texto = f'casa{chr(codigo)}rua 1{chr(codigo)} ção'
+    assert LimpadorTexto.limpar(texto) == remove_caracteres_original(texto)
+
+
+def test_textos_iguais_ao_original():
+    textos = [
+        'Olá, <b>MUNDO</b>!!! kkkk 10÷2 = 5 × 3 ¿qué? «citação» ±1 °C §2 ¶ ¬x',
+        'Ação [123] #tag https://exemplo.com &amp; jkkj hahaha aaah ksks 😀',
+    ]
+    for texto in textos:
+        assert LimpadorTexto.limpar(texto) == remove_caracteres_original(texto)
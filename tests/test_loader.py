@@ -0,0 +1,13 @@
+from db.loader import CollectionLoader
+
+
+def test_concatenar_categorias_com_lote_todo_nulo():
+    # Um lote em que 'sexo' está sempre ausente, entre lotes com valores
+    loader = CollectionLoader(collection=None, esquema={'sexo': 'category'}, batch_size=1)
+    partes = [loader._converter_coluna(valores, 'category') for valores in (['F'], [None], ['M', None])]
+
+    coluna = CollectionLoader._concatenar(partes, 'category')
+
+    assert list(coluna.categories) == ['F', 'M']
+    assert list(coluna.astype(object)[[0, 2]]) == ['F', 'M']
+    assert coluna.isna().tolist() == [False, True, False, True]
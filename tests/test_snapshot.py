@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow', exc_type=ImportError)
+
+from utils.snapshot import Snapshot  # noqa: E402
+
+
+@pytest.mark.parametrize('formato', ['parquet', 'feather'])
+def test_particionado_preserva_tipos_e_ordem(tmp_path, formato):
+    df = pd.DataFrame({
+        'cluster': [0, 1, 0, 2],
+        'sexo': pd.Categorical(['F', 'M', 'F', 'M'], categories=['F', 'M', 'X']),
+        'quantPosts': [1.0, 2.0, 3.0, 4.0],
+        'mes': pd.PeriodIndex(['2020-01', '2020-02', '2020-01', '2020-03'], freq='M'),
+    })
+    caminho = str(tmp_path / 'snapshot')
+
+    Snapshot.salvar(df, caminho, formato=formato, particionar_por=['cluster', 'sexo'])
+    carregado = Snapshot.carregar(caminho, formato=formato)
+
+    # A ordem das linhas segue os diretórios das partições
+    pd.testing.assert_frame_equal(carregado.sort_values('quantPosts', ignore_index=True), df)
+
+    filtrado = Snapshot.carregar(caminho, colunas=['quantPosts', 'cluster'], filtros=[('cluster', '==', 0)],
+                                 formato=formato)
+    assert list(filtrado.columns) == ['quantPosts', 'cluster']
+    assert filtrado['cluster'].dtype == df['cluster'].dtype
+    assert sorted(filtrado['quantPosts']) == [1.0, 3.0]
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.tendencia import EstadoTendencia
+
+
+def _eventos(usuario, dias, inicio='2020-01-01'):
+    return pd.DataFrame({'id_usuario': usuario, 'data': pd.Timestamp(inicio) + pd.to_timedelta(dias, unit='D')})
+
+
+def test_atualizar_sem_historico_nao_altera_estado():
+    gerador = np.random.default_rng(0)
+    df = pd.concat([_eventos(usuario, np.sort(gerador.integers(0, 60, 80))) for usuario in ('u1', 'u2')],
+                   ignore_index=True)
+    estado = EstadoTendencia.construir(df, periodo=3)
+
+    # u1 recebe um evento no último dia (incremental); u2, um evento anterior à janela guardada
+    ultimo_dia = (df.loc[df['id_usuario'] == 'u1', 'data'].max() - pd.Timestamp('2020-01-01')).days
+    df_novos = pd.concat([_eventos('u1', [ultimo_dia]),
+                          _eventos('u2', [1])], ignore_index=True)
+    with pytest.raises(ValueError):
+        estado.atualizar(df_novos)
+
+    df_completo = pd.concat([df, df_novos], ignore_index=True)
+    estado.atualizar(df_novos, df_completo)
+
+    esperado = EstadoTendencia.construir(df_completo, periodo=3).resultados()
+    pd.testing.assert_frame_equal(estado.resultados().reset_index(drop=True), esperado.reset_index(drop=True))
@@ -0,0 +1,47 @@
+import json
+
+import nltk
+import nltk.tag.perceptron
+import pytest
+
+from utils.text_treatment import TextTreatment, _recursos_nltk_lematizacao
+
+
+@pytest.mark.parametrize('versao, tokenizador, etiquetador', [
+    ('3.8.1', 'punkt', 'averaged_perceptron_tagger'),
+    ('3.8.2', 'punkt_tab', 'averaged_perceptron_tagger'),
+    ('3.9.1', 'punkt_tab', 'averaged_perceptron_tagger_eng'),
+])
+def test_recursos_por_versao(versao, tokenizador, etiquetador):
+    recursos = _recursos_nltk_lematizacao(versao)
+    assert tokenizador in recursos and etiquetador in recursos
+
+
+def test_recursos_sao_os_carregados_pelo_nltk_instalado(monkeypatch):
+    # Registra o caminho que word_tokenize e pos_tag pedem ao nltk.data, sem depender dos recursos baixados
+    pedidos = []
+
+    def find(caminho, *args, **kwargs):
+        pedidos.append(caminho)
+        raise LookupError(caminho)
+
+    monkeypatch.setattr(nltk.data, 'find', find)
+    monkeypatch.setattr(nltk.tag.perceptron, 'find', find)
+    for chamada in (lambda: nltk.word_tokenize('Bom dia.'), lambda: nltk.tag.perceptron.PerceptronTagger()):
+        with pytest.raises(LookupError):
+            chamada()
+
+    assert pedidos
+    assert set(pedidos) <= set(TextTreatment.RECURSOS_NLTK_LEMATIZACAO.values())
+
+
+def test_versao_stanza_muda_com_os_modelos(tmp_path, monkeypatch):
+    monkeypatch.setattr(TextTreatment, 'DIRETORIO_STANZA', str(tmp_path))
+    tratamento = TextTreatment(caminho_cache_lematizacao=None)
+
+    versoes = []
+    for md5 in ('abc', 'def'):
+        (tmp_path / 'resources.json').write_text(json.dumps({'pt': {'lemma': {'gsd': {'md5': md5}}}}))
+        versoes.append(tratamento._versao_modelos_stanza())
+
+    assert versoes[0] != versoes[1]
@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+from utils.text_vectorization import TextVectorization
+
+TEXTOS = [
+    'dia feliz na praia com sol', 'noite triste sem sono', 'praia sol e mar', 'sono triste de novo',
+    'feliz com a familia no dia do sol', 'mar calmo e noite longa', 'dia longo triste', 'praia de novo feliz',
+]
+
+
+def _chunks(df, tamanho=3):
+    return lambda: (df.iloc[inicio:inicio + tamanho] for inicio in range(0, len(df), tamanho))
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({'id_usuario': ['u1', 'u2', 'u1', 'u3', 'u2', 'u3', 'u1', 'u2'], 'postMessageLimpo': TEXTOS})
+
+
+@pytest.mark.parametrize('tfidf', [False, True])
+def test_streaming_com_poda_em_disco_igual_ao_ajuste_completo(df, tmp_path, tfidf):
+    vetorizacao = TextVectorization(df, stop_words=['e', 'de'])
+    parametros = dict(max_df_custom=0.9, min_df_custom=2, ngram_range_custom=(1, 2))
+    esperado = (vetorizacao.tfidf_vectorization if tfidf else vetorizacao.bag_of_words_vectorization)(
+        str(tmp_path / 'esperado.csv'), **parametros)
+
+    # Poucos termos em memória: as contagens passam várias vezes pelo SQLite
+    frequencias = vetorizacao.contar_frequencia_documentos(_chunks(df), (1, 2), max_termos_memoria=4)
+    streaming = vetorizacao.tfidf_streaming if tfidf else vetorizacao.bag_of_words_streaming
+    obtido = streaming(_chunks(df), str(tmp_path / 'obtido.csv'), frequencias=frequencias, **parametros)
+
+    pd.testing.assert_frame_equal(obtido, esperado)
+
+
+def test_estado_incremental_igual_a_contagem_completa(df, tmp_path):
+    vetorizacao = TextVectorization(None, stop_words=None)
+    caminho = str(tmp_path / 'frequencias.sqlite')
+
+    vetorizacao.contar_frequencia_documentos(_chunks(df.iloc[:5]), (1, 1), caminho).fechar()
+    incremental = vetorizacao.contar_frequencia_documentos(_chunks(df.iloc[5:]), (1, 1), caminho)
+    completo = vetorizacao.contar_frequencia_documentos(_chunks(df), (1, 1))
+
+    assert incremental.total_documentos == completo.total_documentos == len(df)
+    for obtido, esperado in zip(incremental.vocabulario_podado(1.0, 1), completo.vocabulario_podado(1.0, 1)):
+        assert list(obtido) == list(esperado)
+
+    with pytest.raises(ValueError):
+        TextVectorization(None, stop_words=['sol']).contar_frequencia_documentos(_chunks(df), (1, 1), caminho)
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer
+
+from utils.text_vectorization import TextVectorization
+
+
+class ArtefatoVetorizacao:
+    """
+    Vocabulário e matriz de contagens ajustados uma única vez sobre o corpus inteiro e salvos em disco.
+
+    A matriz é guardada sem poda por max_df/min_df. Assim, os relatórios por cluster ou por nível
+    (dados/filtro_nivel/nivel*/) são fatias de linhas do mesmo artefato: a poda é refeita sobre a
+    frequência de documento da fatia, o que dá o mesmo vocabulário e as mesmas contagens de um
+    CountVectorizer ajustado apenas sobre os posts da fatia, sem tokenizar tudo de novo.
+
+    Os componentes da matriz CSR ficam em arquivos .npy separados (data, indices, indptr), que podem ser
+    abertos com memory-map; um .npz não permite memory-map.
+
+    Atributos:
+        palavras (np.ndarray): Vocabulário ordenado (coluna -> palavra).
+        matriz (scipy.sparse.csr_matrix): Contagens posts x palavras.
+        usuarios (np.ndarray): Usuário de cada linha da matriz.
+        indice (np.ndarray): Índice original (no DataFrame de entrada) de cada linha.
+        metadados (dict): Parâmetros usados no ajuste.
+    """
+
+    ARQUIVOS_MATRIZ = ('data', 'indices', 'indptr')
+
+    def __init__(self, palavras, matriz, usuarios, indice, metadados: dict):
+        self.palavras = palavras
+        self.matriz = matriz
+        self.usuarios = usuarios
+        self.indice = indice
+        self.metadados = metadados
+
+    @staticmethod
+    def hash_stopwords(stop_words) -> str:
+        conteudo = '\n'.join(sorted(stop_words)) if stop_words is not None else ''
+        return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def ajustar(df: pd.DataFrame, stop_words, diretorio: str, ngram_range: tuple = (1, 1),
+                coluna_texto: str = 'postMessageLimpo'):
+        """
+        Ajusta o vocabulário sobre o corpus inteiro e salva o artefato.
+
+        Args:
+            df (pd.DataFrame): DataFrame com 'id_usuario' e a coluna de texto.
+            stop_words (list): Stopwords usadas na tokenização.
+            diretorio (str): Diretório onde o artefato será salvo.
+            ngram_range (tuple): Intervalo de n-gramas.
+            coluna_texto (str): Coluna com o texto pré-processado.
+
+        Returns:
+            ArtefatoVetorizacao: Artefato ajustado.
+        """
+        vectorizer = CountVectorizer(stop_words=stop_words, ngram_range=ngram_range)
+        matriz = vectorizer.fit_transform(df[coluna_texto].fillna('').tolist()).tocsr()
+        matriz.sort_indices()
+
+        palavras = vectorizer.get_feature_names_out().astype(str)
+        metadados = {
+            'ngram_range': list(ngram_range),
+            'coluna_texto': coluna_texto,
+            'formato': list(matriz.shape),
+            'hash_stopwords': ArtefatoVetorizacao.hash_stopwords(stop_words),
+        }
+
+        artefato = ArtefatoVetorizacao(palavras, matriz, df['id_usuario'].to_numpy(), df.index.to_numpy(),
+                                       metadados)
+        artefato.salvar(diretorio)
+        return artefato
+
+    @staticmethod
+    def _sem_objetos(valores) -> np.ndarray:
+        # Ids em objetos Python são gravados como inteiros, se todos forem inteiros, ou como texto de tamanho
+        # fixo (strings vindas do Mongo)
+        valores = np.asarray(valores)
+        if valores.dtype != object:
+            return valores
+        if pd.api.types.infer_dtype(valores, skipna=False) == 'integer':
+            return valores.astype(np.int64)
+        return valores.astype(str)
+
+    def _chaves_usuarios(self, ids_usuarios) -> np.ndarray:
+        # Ids procurados no mesmo tipo dos gravados: 1466776020086339 e '1466776020086339' são o mesmo usuário
+        chaves = np.asarray(list(ids_usuarios))
+        tipo = np.asarray(self.usuarios).dtype
+        if tipo.kind == 'U':
+            return chaves.astype(str)
+        if tipo.kind in 'iu' and chaves.dtype.kind not in 'iu':
+            numeros = pd.to_numeric(pd.Series(chaves, dtype=object), errors='coerce')
+            return numeros[numeros.notna()].to_numpy(dtype=np.int64)
+        return chaves
+
+    def salvar(self, diretorio: str) -> None:
+        os.makedirs(diretorio, exist_ok=True)
+        for nome in ArtefatoVetorizacao.ARQUIVOS_MATRIZ:
+            np.save(os.path.join(diretorio, f'{nome}.npy'), getattr(self.matriz, nome))
+        np.save(os.path.join(diretorio, 'palavras.npy'), self.palavras)
+        np.save(os.path.join(diretorio, 'usuarios.npy'), ArtefatoVetorizacao._sem_objetos(self.usuarios),
+                allow_pickle=False)
+        np.save(os.path.join(diretorio, 'indice.npy'), ArtefatoVetorizacao._sem_objetos(self.indice),
+                allow_pickle=False)
+        with open(os.path.join(diretorio, 'metadados.json'), 'w', encoding='utf-8') as arquivo:
+            json.dump(self.metadados, arquivo, indent=2)
+
+    @staticmethod
+    def carregar(diretorio: str, mmap: bool = True, stop_words=None):
+        """
+        Carrega um artefato salvo, por padrão com memory-map (nada é lido até ser usado).
+
+        Args:
+            diretorio (str): Diretório do artefato.
+            mmap (bool): Se True, abre os arrays com memory-map somente leitura.
+            stop_words (list): Se informadas, confere que são as mesmas usadas no ajuste.
+
+        Raises:
+            ValueError: Se stop_words difere das stopwords do ajuste.
+
+        Returns:
+            ArtefatoVetorizacao: Artefato carregado.
+        """
+        modo = 'r' if mmap else None
+        with open(os.path.join(diretorio, 'metadados.json'), encoding='utf-8') as arquivo:
+            metadados = json.load(arquivo)
+
+        componentes = [np.load(os.path.join(diretorio, f'{nome}.npy'), mmap_mode=modo)
+                       for nome in ArtefatoVetorizacao.ARQUIVOS_MATRIZ]
+        matriz = sp.csr_matrix(tuple(componentes), shape=tuple(metadados['formato']), copy=False)
+
+        artefato = ArtefatoVetorizacao(
+            np.load(os.path.join(diretorio, 'palavras.npy'), mmap_mode=modo),
+            matriz,
+            np.load(os.path.join(diretorio, 'usuarios.npy'), mmap_mode=modo),
+            np.load(os.path.join(diretorio, 'indice.npy'), mmap_mode=modo),
+            metadados
+        )
+        if stop_words is not None:
+            artefato.verificar_stopwords(stop_words)
+        return artefato
+
+    def verificar_stopwords(self, stop_words) -> None:
+        if ArtefatoVetorizacao.hash_stopwords(stop_words) != self.metadados['hash_stopwords']:
+            raise ValueError('As stopwords informadas diferem das usadas no ajuste do artefato.')
+
+    def fatiar(self, ids_usuarios=None) -> tuple:
+        """
+        Seleciona as linhas dos posts de um conjunto de usuários.
+
+        Args:
+            ids_usuarios (Iterable | None): Usuários da fatia. None seleciona todas as linhas.
+
+        Returns:
+            tuple: (matriz de contagens da fatia, usuário de cada linha da fatia)
+        """
+        if ids_usuarios is None:
+            return self.matriz, np.asarray(self.usuarios)
+
+        linhas = np.flatnonzero(np.isin(self.usuarios, self._chaves_usuarios(ids_usuarios)))
+        return self.matriz[linhas], np.asarray(self.usuarios[linhas])
+
+    def _podar_fatia(self, matriz, max_df_custom, min_df_custom) -> tuple:
+        # Refaz a poda de max_df/min_df sobre a frequência de documento da fatia
+        frequencias = np.diff(sp.csc_matrix(matriz).indptr)
+        frequencia_documentos = dict(zip(np.flatnonzero(frequencias), frequencias[frequencias > 0]))
+        colunas, frequencias_colunas = TextVectorization.vocabulario_podado(frequencia_documentos, matriz.shape[0],
+                                                                           max_df_custom, min_df_custom)
+        colunas = colunas.astype(np.int64)
+        return matriz[:, colunas], np.asarray(self.palavras[colunas]), frequencias_colunas
+
+    def bag_of_words(self, ids_usuarios, output_path, max_df_custom: float | int, min_df_custom: int,
+                     k: int = 10) -> pd.DataFrame:
+        """
+        Top-k de Bag of Words por usuário para uma fatia, igual ao de bag_of_words_vectorization
+        ajustado somente sobre os posts da fatia.
+
+        Args:
+            ids_usuarios (Iterable | None): Usuários da fatia (ex.: um cluster ou um nível do BDI).
+            output_path (str | None): Caminho para salvar o CSV dos resultados.
+            max_df_custom (float|int): Valor máximo de frequência de documento personalizado.
+            min_df_custom (int): Valor mínimo de frequência de documento personalizado.
+            k (int): Quantidade de palavras por usuário.
+        """
+        matriz, usuarios = self.fatiar(ids_usuarios)
+        matriz, palavras, _ = self._podar_fatia(matriz, max_df_custom, min_df_custom)
+
+        resultados_df = TextVectorization.top_k_por_usuario(matriz, usuarios, palavras, 'contagem', k)
+        if output_path:
+            resultados_df.to_csv(output_path, index=False)
+        print(resultados_df)
+        return resultados_df
+
+    def tfidf(self, ids_usuarios, output_path, max_df_custom: float | int, min_df_custom: float | int,
+              k: int = 10) -> pd.DataFrame:
+        """
+        Top-k de TF-IDF médio por usuário para uma fatia, igual ao de tfidf_vectorization ajustado
+        somente sobre os posts da fatia.
+
+        Args:
+            ids_usuarios (Iterable | None): Usuários da fatia.
+            output_path (str | None): Caminho para salvar o CSV dos resultados.
+            max_df_custom (float|int): Valor máximo de frequência de documento personalizado.
+            min_df_custom (float|int): Valor mínimo de frequência de documento personalizado.
+            k (int): Quantidade de palavras por usuário.
+        """
+        matriz, usuarios = self.fatiar(ids_usuarios)
+        matriz, palavras, frequencias = self._podar_fatia(matriz, max_df_custom, min_df_custom)
+        matriz = TextVectorization.transformar_tfidf(matriz, frequencias, matriz.shape[0])
+
+        resultados_df = TextVectorization.top_k_por_usuario(matriz, usuarios, palavras, 'score', k, media=True)
+        if output_path:
+            resultados_df.to_csv(output_path, index=False)
+        print(resultados_df)
+        return resultados_df
@@ -0,0 +1,210 @@
+import hashlib
+import os
+import sqlite3
+import time
+import weakref
+from collections import OrderedDict
+
+
+class _Pendentes:
+    """
+    Entradas ainda não gravadas em disco e total de entradas da tabela.
+
+    Fica fora do CacheLematizacao para que o finalizador grave as pendências sem manter o cache vivo.
+    """
+
+    def __init__(self, total: int):
+        self.novas = {}
+        self.acessos = {}
+        self.total = total
+
+
+def _gravar_pendentes(conexao: sqlite3.Connection, pendentes: _Pendentes, max_entradas: int) -> None:
+    if not pendentes.novas and not pendentes.acessos:
+        return
+
+    agora = time.time_ns()
+    with conexao:
+        # A chave inclui o texto e a versão do modelo, então uma chave já gravada tem o mesmo valor:
+        # basta inserir as ausentes (contadas no total) e atualizar o acesso das demais
+        inseridas = conexao.executemany(
+            'INSERT OR IGNORE INTO lematizacao (chave, valor, acesso) VALUES (?, ?, ?)',
+            [(chave, valor, agora) for chave, valor in pendentes.novas.items()]
+        ).rowcount
+        if inseridas < len(pendentes.novas):
+            for chave in pendentes.novas:
+                pendentes.acessos.setdefault(chave, agora)
+        conexao.executemany(
+            'UPDATE lematizacao SET acesso = ? WHERE chave = ?',
+            [(acesso, chave) for chave, acesso in pendentes.acessos.items()]
+        )
+        pendentes.total += max(inseridas, 0)
+
+        excedente = pendentes.total - max_entradas
+        if excedente > 0:
+            pendentes.total -= conexao.execute(
+                'DELETE FROM lematizacao WHERE chave IN '
+                '(SELECT chave FROM lematizacao ORDER BY acesso ASC LIMIT ?)', (excedente,)
+            ).rowcount
+
+    pendentes.novas.clear()
+    pendentes.acessos.clear()
+
+
+def _finalizar_conexao(conexao: sqlite3.Connection, pendentes: _Pendentes, max_entradas: int) -> None:
+    # Também roda na saída do interpretador: quem usa apenas guardar/obter não perde as pendências
+    try:
+        _gravar_pendentes(conexao, pendentes, max_entradas)
+        conexao.commit()
+        conexao.close()
+    except sqlite3.Error:
+        pass
+
+
+class CacheLematizacao:
+    """
+    Cache persistente de textos lematizados, endereçado pelo conteúdo.
+
+    A chave é o hash de (texto normalizado, opção de lematização, versão do modelo), de modo que textos
+    repetidos (reposts, correntes) e execuções seguintes sobre o mesmo corpus não passam de novo pelo
+    lematizador. Há duas camadas: um LRU em memória na frente de uma tabela SQLite em disco, que também
+    é limitada por LRU (a coluna 'acesso' guarda o instante do último uso de cada entrada).
+
+    Atributos:
+        caminho (str): Caminho do arquivo SQLite.
+        max_entradas (int): Quantidade máxima de entradas mantidas em disco.
+        tamanho_memoria (int): Quantidade máxima de entradas mantidas em memória.
+    """
+
+    INTERVALO_GRAVACAO = 1000
+
+    def __init__(self, caminho: str, max_entradas: int = 2_000_000, tamanho_memoria: int = 100_000):
+        """
+        Abre (ou cria) o cache em disco.
+
+        Args:
+            caminho (str): Caminho do arquivo SQLite.
+            max_entradas (int): Quantidade máxima de entradas mantidas em disco.
+            tamanho_memoria (int): Quantidade máxima de entradas mantidas em memória.
+        """
+        self.caminho = caminho
+        self.max_entradas = max_entradas
+        self.tamanho_memoria = tamanho_memoria
+
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+        # WAL permite que vários processos de pré-processamento leiam e gravem no mesmo arquivo
+        self.conexao = sqlite3.connect(caminho, timeout=60)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.execute('PRAGMA synchronous=NORMAL')
+        self.conexao.execute(
+            'CREATE TABLE IF NOT EXISTS lematizacao (chave TEXT PRIMARY KEY, valor TEXT NOT NULL, '
+            'acesso INTEGER NOT NULL)'
+        )
+        self.conexao.execute('CREATE INDEX IF NOT EXISTS idx_lematizacao_acesso ON lematizacao (acesso)')
+        self.conexao.commit()
+
+        # Total mantido em memória a partir da contagem inicial; as gravações seguintes não varrem a tabela
+        total = self.conexao.execute('SELECT COUNT(*) FROM lematizacao').fetchone()[0]
+        self._pendentes = _Pendentes(total)
+        self._novas = self._pendentes.novas
+        self._acessos = self._pendentes.acessos
+        self._finalizador = weakref.finalize(self, _finalizar_conexao, self.conexao, self._pendentes,
+                                             self.max_entradas)
+
+        self._memoria = OrderedDict()
+
+    def __getstate__(self):
+        raise TypeError('CacheLematizacao não pode ser serializado; cada processo deve abrir o seu.')
+
+    @staticmethod
+    def chave(texto: str, op_lemmatizer, versao_modelo: str) -> str:
+        conteudo = f'{op_lemmatizer}\x00{versao_modelo}\x00{texto}'
+        return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
+
+    def _lembrar(self, chave: str, valor: str) -> None:
+        self._memoria[chave] = valor
+        self._memoria.move_to_end(chave)
+        if len(self._memoria) > self.tamanho_memoria:
+            self._memoria.popitem(last=False)
+
+    def obter_varios(self, chaves) -> dict:
+        """
+        Busca várias chaves, primeiro em memória e depois em disco.
+
+        Args:
+            chaves (Iterable[str]): Chaves procuradas.
+
+        Returns:
+            dict: Mapeamento chave -> texto lematizado, apenas para as chaves encontradas.
+        """
+        encontrados = {}
+        faltantes = []
+        agora = time.time_ns()
+        for chave in chaves:
+            valor = self._memoria.get(chave)
+            if valor is not None:
+                self._memoria.move_to_end(chave)
+                # Acertos em memória também contam para o LRU em disco; as novas são gravadas com o instante atual
+                if chave not in self._novas:
+                    self._acessos[chave] = agora
+            else:
+                valor = self._novas.get(chave)
+
+            if valor is None:
+                faltantes.append(chave)
+            else:
+                encontrados[chave] = valor
+
+        # Consulta em blocos para respeitar o limite de parâmetros do SQLite
+        for inicio in range(0, len(faltantes), 500):
+            bloco = faltantes[inicio:inicio + 500]
+            marcadores = ','.join('?' * len(bloco))
+            linhas = self.conexao.execute(
+                f'SELECT chave, valor FROM lematizacao WHERE chave IN ({marcadores})', bloco
+            ).fetchall()
+            for chave, valor in linhas:
+                encontrados[chave] = valor
+                self._acessos[chave] = agora
+                self._lembrar(chave, valor)
+
+        self._gravar_se_necessario()
+        return encontrados
+
+    def obter(self, chave: str):
+        return self.obter_varios([chave]).get(chave)
+
+    def guardar_varios(self, pares: dict) -> None:
+        """
+        Guarda textos lematizados. A gravação em disco é feita em lotes.
+
+        Args:
+            pares (dict): Mapeamento chave -> texto lematizado.
+        """
+        for chave, valor in pares.items():
+            self._novas[chave] = valor
+            self._lembrar(chave, valor)
+
+        self._gravar_se_necessario()
+
+    def _gravar_se_necessario(self) -> None:
+        if len(self._novas) + len(self._acessos) >= CacheLematizacao.INTERVALO_GRAVACAO:
+            self.gravar()
+
+    def guardar(self, chave: str, valor: str) -> None:
+        self.guardar_varios({chave: valor})
+
+    def gravar(self) -> None:
+        """
+        Grava em disco as entradas pendentes e aplica a remoção LRU se o limite foi ultrapassado.
+
+        O limite usa o total contado na abertura mais o que este processo inseriu; com vários processos
+        gravando no mesmo arquivo, cada um só enxerga as próprias inserções até reabrir o cache.
+        """
+        _gravar_pendentes(self.conexao, self._pendentes, self.max_entradas)
+
+    def fechar(self) -> None:
+        self.gravar()
+        self._finalizador()
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from joblib import Parallel, delayed
+from sklearn import config_context
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import davies_bouldin_score, pairwise_distances_argmin_min, silhouette_score
+
+# Colunas da tabela retornada pela varredura
+COLUNAS_VARREDURA = ['k', 'inercia', 'silhueta', 'davies_bouldin']
+
+
+class Clusterizacao:
+    """
+    Varredura do número de clusters do K-Means (célula de escolha do k em analise_tendencia.ipynb).
+
+    Com os parâmetros padrão, os valores são os mesmos do laço do notebook (KMeans(n_clusters=k,
+    random_state=42), silhueta e Davies-Bouldin sobre todos os pontos). Para bases maiores:
+
+    - os valores de k são avaliados em paralelo (joblib);
+    - a silhueta pode ser calculada sobre uma amostra estratificada pelos rótulos e, em qualquer caso,
+      usa distâncias em blocos limitados por memoria_mb, em vez da matriz n x n inteira;
+    - o ajuste pode usar MiniBatchKMeans;
+    - cada k pode partir dos centróides do k anterior mais um novo centróide (aquecimento). Nesse modo
+      os ajustes são sequenciais e apenas as métricas rodam em paralelo.
+    """
+
+    @staticmethod
+    def _modelo(k: int, random_state: int, mini_batch: bool, tamanho_lote: int, init=None):
+        opcoes = {'n_clusters': k, 'random_state': random_state}
+        if init is not None:
+            # Centróides iniciais explícitos dispensam múltiplas inicializações
+            opcoes.update(init=init, n_init=1)
+        if mini_batch:
+            return MiniBatchKMeans(batch_size=tamanho_lote, **opcoes)
+        return KMeans(**opcoes)
+
+    @staticmethod
+    def amostra_estratificada(rotulos: np.ndarray, tamanho: int, random_state: int = 42) -> np.ndarray:
+        """
+        Sorteia posições mantendo a proporção de cada cluster (ao menos 2 pontos por cluster, quando houver).
+
+        Args:
+            rotulos (np.ndarray): Cluster de cada ponto.
+            tamanho (int): Tamanho aproximado da amostra.
+            random_state (int): Semente do sorteio.
+
+        Returns:
+            np.ndarray: Posições sorteadas, em ordem crescente.
+        """
+        if tamanho >= len(rotulos):
+            return np.arange(len(rotulos))
+
+        gerador = np.random.default_rng(random_state)
+        posicoes = []
+        for rotulo in np.unique(rotulos):
+            membros = np.flatnonzero(rotulos == rotulo)
+            quantidade = min(len(membros), max(2, int(round(tamanho * len(membros) / len(rotulos)))))
+            posicoes.append(gerador.choice(membros, quantidade, replace=False))
+        return np.sort(np.concatenate(posicoes))
+
+    @staticmethod
+    def silhueta(x: np.ndarray, rotulos: np.ndarray, tamanho_amostra: int = None, random_state: int = 42,
+                 memoria_mb: int = 256) -> float:
+        """
+        Coeficiente de silhueta com memória limitada.
+
+        Args:
+            x (np.ndarray): Pontos (n x atributos).
+            rotulos (np.ndarray): Cluster de cada ponto.
+            tamanho_amostra (int): Se informado, calcula sobre uma amostra estratificada desse tamanho.
+            random_state (int): Semente da amostra.
+            memoria_mb (int): Memória máxima de cada bloco de distâncias (working_memory do scikit-learn).
+
+        Returns:
+            float: Silhueta média.
+        """
+        if tamanho_amostra is not None:
+            posicoes = Clusterizacao.amostra_estratificada(rotulos, tamanho_amostra, random_state)
+            x, rotulos = x[posicoes], rotulos[posicoes]
+        with config_context(working_memory=memoria_mb):
+            return silhouette_score(x, rotulos)
+
+    @staticmethod
+    def _avaliar(x: np.ndarray, k: int, modelo, random_state: int, tamanho_amostra: int, memoria_mb: int) -> dict:
+        if not hasattr(modelo, 'labels_'):
+            modelo.fit(x)
+        rotulos = modelo.labels_
+        return {
+            'k': k,
+            'inercia': modelo.inertia_,
+            'silhueta': Clusterizacao.silhueta(x, rotulos, tamanho_amostra, random_state, memoria_mb),
+            'davies_bouldin': davies_bouldin_score(x, rotulos),
+            'modelo': modelo,
+        }
+
+    @staticmethod
+    def _novo_centroide(x: np.ndarray, centroides: np.ndarray, random_state: int) -> np.ndarray:
+        # Sorteio proporcional ao quadrado da distância ao centróide mais próximo, como no k-means++
+        _, distancias = pairwise_distances_argmin_min(x, centroides)
+        distancias = distancias ** 2
+        gerador = np.random.default_rng(random_state)
+        if distancias.sum() == 0:
+            return x[gerador.integers(len(x))]
+        return x[gerador.choice(len(x), p=distancias / distancias.sum())]
+
+    @staticmethod
+    def varrer_k(variaveis, k_values=range(2, 11), random_state: int = 42, n_jobs: int = None,
+                 tamanho_amostra: int = None, memoria_mb: int = 256, mini_batch: bool = False,
+                 tamanho_lote: int = 1024, aquecer: bool = False, retornar_modelos: bool = False):
+        """
+        Ajusta o K-Means para cada k e calcula inércia, silhueta e Davies-Bouldin.
+
+        Args:
+            variaveis (pd.DataFrame | np.ndarray): Atributos dos usuários (ex.: df_agrupado_soma[['quantPosts']]).
+            k_values (Iterable[int]): Valores de k, em ordem crescente.
+            random_state (int): Semente do K-Means e das amostras.
+            n_jobs (int): Processos do joblib (-1 usa todos os núcleos). None roda no processo atual.
+            tamanho_amostra (int): Tamanho da amostra estratificada da silhueta. None usa todos os pontos.
+            memoria_mb (int): Memória máxima de cada bloco de distâncias da silhueta.
+            mini_batch (bool): Se True, usa MiniBatchKMeans.
+            tamanho_lote (int): Tamanho do lote do MiniBatchKMeans.
+            aquecer (bool): Se True, cada k parte dos centróides do k anterior mais um novo centróide.
+            retornar_modelos (bool): Se True, retorna também os modelos ajustados (k -> modelo).
+
+        Returns:
+            pd.DataFrame | tuple[pd.DataFrame, dict]: Tabela com COLUNAS_VARREDURA, uma linha por k, e,
+                opcionalmente, os modelos.
+        """
+        x = np.ascontiguousarray(variaveis.to_numpy() if isinstance(variaveis, pd.DataFrame) else variaveis,
+                                 dtype=float)
+        if x.ndim == 1:
+            x = x.reshape(-1, 1)
+        k_values = list(k_values)
+
+        if aquecer:
+            modelos = []
+            centroides = None
+            for k in k_values:
+                init = None
+                if centroides is not None and len(centroides) < k:
+                    while len(centroides) < k:
+                        centroides = np.vstack([centroides, Clusterizacao._novo_centroide(x, centroides,
+                                                                                          random_state + k)])
+                    init = centroides
+                modelo = Clusterizacao._modelo(k, random_state, mini_batch, tamanho_lote, init).fit(x)
+                centroides = modelo.cluster_centers_
+                modelos.append(modelo)
+        else:
+            modelos = [Clusterizacao._modelo(k, random_state, mini_batch, tamanho_lote) for k in k_values]
+
+        linhas = Parallel(n_jobs=n_jobs)(
+            delayed(Clusterizacao._avaliar)(x, k, modelo, random_state, tamanho_amostra, memoria_mb)
+            for k, modelo in zip(k_values, modelos)
+        )
+
+        tabela = pd.DataFrame(linhas, columns=COLUNAS_VARREDURA)
+        if retornar_modelos:
+            return tabela, {linha['k']: linha['modelo'] for linha in linhas}
+        return tabela
+
+    @staticmethod
+    def plotar_varredura(tabela: pd.DataFrame) -> None:
+        """
+        Plota inércia, silhueta e Davies-Bouldin por k, no mesmo gráfico de eixos duplos do notebook.
+
+        Args:
+            tabela (pd.DataFrame): Resultado de varrer_k.
+        """
+        fig, ax1 = plt.subplots(figsize=(10, 6))
+
+        color_inertia = 'tab:blue'
+        ax1.set_xlabel('Número de Clusters (k)')
+        ax1.set_ylabel('Inércia', color=color_inertia)
+        ax1.plot(tabela['k'], tabela['inercia'], marker='o', color=color_inertia, label='Inércia')
+        ax1.tick_params(axis='y', labelcolor=color_inertia)
+        ax1.set_xticks(tabela['k'])
+
+        ax2 = ax1.twinx()
+        ax2.set_ylabel('Métricas', color='black')
+        ax2.plot(tabela['k'], tabela['silhueta'], marker='s', color='tab:green', label='Coeficiente de Silhueta')
+        ax2.plot(tabela['k'], tabela['davies_bouldin'], marker='^', color='tab:red',
+                 label='Índice de Davies-Bouldin')
+        ax2.tick_params(axis='y', labelcolor='black')
+
+        lines_labels = [ax1.get_legend_handles_labels(), ax2.get_legend_handles_labels()]
+        lines, labels = [sum(lol, []) for lol in zip(*lines_labels)]
+        ax2.legend(lines, labels, loc='upper right')
+
+        plt.show()
@@ -0,0 +1,303 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.extracao_interacao import ExtracaoInteracao
+
+# Eventos do cubo, na ordem do último eixo: contagens por post, categorias de story e likes
+EVENTOS_POSTS = ['quantPosts', 'quantPostMsg', 'quantPostStory', *ExtracaoInteracao.PALAVRAS_CHAVE]
+EVENTOS = [*EVENTOS_POSTS, 'quantLikes']
+
+
+class CuboAtividade:
+    """
+    Contagens diárias de atividade por usuário, em um array denso usuários x dias x eventos.
+
+    Os eventos são os posts, os posts com mensagem e com story, cada categoria de interação do
+    ExtracaoInteracao e os likes (ver EVENTOS). Os dias são contínuos a partir de 'inicio', então a
+    posição de uma data é a diferença em dias e uma janela de datas é uma fatia (view) do array. A posição
+    de cada usuário vem de um índice hash. O array fica em um .npy que pode ser aberto com memory-map.
+
+    As análises que hoje refazem groupby sobre as linhas de posts/likes (eventos por dia nos testes de
+    tendência, somas por usuário dos histogramas e do df_agrupado_soma, colunas 'mes'/'semana') leem
+    fatias e somas deste array.
+
+    Atributos:
+        cubo (np.ndarray): Contagens (usuários x dias x eventos), com o menor tipo inteiro sem sinal que
+            comporta os valores.
+        usuarios (np.ndarray): Usuário de cada linha do cubo.
+        inicio (pd.Timestamp): Data do primeiro dia.
+        eventos (list): Nome de cada evento do último eixo.
+    """
+
+    def __init__(self, cubo: np.ndarray, usuarios: np.ndarray, inicio, eventos: list = None):
+        self.cubo = cubo
+        self.usuarios = usuarios
+        self.inicio = pd.Timestamp(inicio)
+        self.eventos = list(eventos or EVENTOS)
+        self.indice_usuarios = pd.Index(usuarios)
+
+    @property
+    def dias(self) -> pd.DatetimeIndex:
+        return pd.date_range(self.inicio, periods=self.cubo.shape[1], freq='D')
+
+    @staticmethod
+    def _contagens_posts(df_posts: pd.DataFrame) -> pd.DataFrame:
+        # Usa as colunas já extraídas (df_posts_interacoes) e calcula apenas as que faltarem
+        contagens = pd.DataFrame(index=df_posts.index)
+        contagens['quantPosts'] = 1
+        for coluna, origem in (('quantPostMsg', 'postMessage'), ('quantPostStory', 'postStory')):
+            if coluna in df_posts.columns:
+                contagens[coluna] = df_posts[coluna]
+            elif origem in df_posts.columns:
+                contagens[coluna] = ExtracaoInteracao._texto_preenchido(df_posts[origem])
+            else:
+                contagens[coluna] = 0
+
+        faltantes = [key for key in ExtracaoInteracao.PALAVRAS_CHAVE if key not in df_posts.columns]
+        if faltantes and 'postStory' in df_posts.columns:
+            extracao = ExtracaoInteracao()
+            matriz = extracao.matriz_interacoes(df_posts['postStory'])
+            for indice, key in enumerate(extracao.patterns):
+                contagens[key] = df_posts[key] if key in df_posts.columns else matriz[:, indice]
+        else:
+            for key in ExtracaoInteracao.PALAVRAS_CHAVE:
+                contagens[key] = df_posts[key] if key in df_posts.columns else 0
+
+        return contagens[EVENTOS_POSTS]
+
+    @staticmethod
+    def construir(df_posts: pd.DataFrame, df_likes: pd.DataFrame = None, diretorio: str = None,
+                  coluna_data: str = 'data', inicio=None, fim=None):
+        """
+        Monta o cubo a partir das linhas de posts (uma por post) e de likes (uma por like).
+
+        Args:
+            df_posts (pd.DataFrame): Posts com 'id_usuario' e a coluna de data. As colunas de EVENTOS_POSTS
+                já calculadas (df_posts_interacoes) são reaproveitadas; as que faltarem são extraídas de
+                postMessage/postStory.
+            df_likes (pd.DataFrame): Likes com 'id_usuario' e a coluna de data.
+            diretorio (str): Se informado, o cubo é gravado direto em disco (memory-map) e salvo ali.
+            coluna_data (str): Coluna com o dia do evento (sem hora).
+            inicio: Primeiro dia do cubo. Padrão: o dia mais antigo dos dados.
+            fim: Último dia do cubo. Padrão: o dia mais recente dos dados.
+
+        Returns:
+            CuboAtividade: Cubo montado.
+        """
+        partes = [(df_posts, CuboAtividade._contagens_posts(df_posts))]
+        if df_likes is not None:
+            partes.append((df_likes, pd.DataFrame({'quantLikes': np.ones(len(df_likes), dtype=np.uint8)},
+                                                  index=df_likes.index)))
+
+        usuarios = pd.unique(pd.concat([df['id_usuario'] for df, _ in partes], ignore_index=True))
+        indice_usuarios = pd.Index(usuarios)
+        datas = pd.concat([pd.to_datetime(df[coluna_data]) for df, _ in partes], ignore_index=True)
+        inicio = pd.Timestamp(inicio if inicio is not None else datas.min()).normalize()
+        fim = pd.Timestamp(fim if fim is not None else datas.max()).normalize()
+        n_dias = (fim - inicio).days + 1
+
+        # Soma por (usuário, dia) antes de preencher o array, uma vez por origem
+        somas = []
+        for df, contagens in partes:
+            dias = (pd.to_datetime(df[coluna_data]).dt.normalize() - inicio).dt.days
+            # Datas ausentes (NaT) ficam de fora, como em TendenciaMannKendall.series_diarias
+            validos = dias.notna().to_numpy()
+            dias = dias.fillna(-1).to_numpy(dtype=np.int64)
+            dentro = validos & (dias >= 0) & (dias < n_dias)
+            chave = pd.DataFrame({'usuario': indice_usuarios.get_indexer(df['id_usuario'])[dentro],
+                                  'dia': dias[dentro]})
+            somas.append(pd.concat([chave, contagens[dentro].reset_index(drop=True).astype(np.int64)], axis=1)
+                         .groupby(['usuario', 'dia']).sum())
+
+        maximo = max((int(soma.to_numpy().max()) for soma in somas if soma.size), default=0)
+        formato = (len(usuarios), n_dias, len(EVENTOS))
+        tipo = np.min_scalar_type(maximo)
+        if diretorio is not None:
+            os.makedirs(diretorio, exist_ok=True)
+            cubo = np.lib.format.open_memmap(os.path.join(diretorio, 'cubo.npy'), mode='w+', dtype=tipo,
+                                             shape=formato)
+        else:
+            cubo = np.zeros(formato, dtype=tipo)
+
+        for soma in somas:
+            linhas = soma.index.get_level_values('usuario').to_numpy()
+            dias = soma.index.get_level_values('dia').to_numpy()
+            colunas = [EVENTOS.index(coluna) for coluna in soma.columns]
+            cubo[linhas[:, None], dias[:, None], colunas] += soma.to_numpy().astype(tipo)
+
+        cubo_atividade = CuboAtividade(cubo, np.asarray(usuarios), inicio)
+        if diretorio is not None:
+            cubo.flush()
+            cubo_atividade.salvar(diretorio, salvar_cubo=False)
+        return cubo_atividade
+
+    def salvar(self, diretorio: str, salvar_cubo: bool = True) -> None:
+        os.makedirs(diretorio, exist_ok=True)
+        if salvar_cubo:
+            np.save(os.path.join(diretorio, 'cubo.npy'), self.cubo)
+        # Ids em objetos Python (strings vindas do Mongo) são gravados como texto de tamanho fixo
+        usuarios = self.usuarios.astype(str) if self.usuarios.dtype == object else self.usuarios
+        np.save(os.path.join(diretorio, 'usuarios.npy'), usuarios, allow_pickle=False)
+        metadados = {'inicio': self.inicio.strftime('%Y-%m-%d'), 'eventos': self.eventos,
+                     'formato': list(self.cubo.shape)}
+        with open(os.path.join(diretorio, 'metadados.json'), 'w', encoding='utf-8') as arquivo:
+            json.dump(metadados, arquivo, indent=2)
+
+    @staticmethod
+    def carregar(diretorio: str, mmap: bool = True):
+        """
+        Carrega um cubo salvo, por padrão com memory-map (apenas as fatias usadas são lidas do disco).
+
+        Args:
+            diretorio (str): Diretório do cubo.
+            mmap (bool): Se True, abre o array com memory-map somente leitura.
+
+        Returns:
+            CuboAtividade: Cubo carregado.
+        """
+        with open(os.path.join(diretorio, 'metadados.json'), encoding='utf-8') as arquivo:
+            metadados = json.load(arquivo)
+
+        return CuboAtividade(
+            np.load(os.path.join(diretorio, 'cubo.npy'), mmap_mode='r' if mmap else None),
+            np.load(os.path.join(diretorio, 'usuarios.npy')),
+            metadados['inicio'],
+            metadados['eventos'],
+        )
+
+    def posicao_data(self, data) -> int:
+        return (pd.Timestamp(data).normalize() - self.inicio).days
+
+    def intervalo_dias(self, inicio=None, fim=None) -> tuple[int, int]:
+        """
+        Posições [primeiro, ultimo) do eixo de dias de uma janela de datas, limitadas ao cubo.
+
+        Janelas inteiramente antes ou depois do cubo resultam em um intervalo vazio.
+        """
+        n_dias = self.cubo.shape[1]
+        primeiro = 0 if inicio is None else min(max(self.posicao_data(inicio), 0), n_dias)
+        ultimo = n_dias if fim is None else min(max(self.posicao_data(fim) + 1, 0), n_dias)
+        return primeiro, max(primeiro, ultimo)
+
+    def posicoes_usuarios(self, ids_usuarios) -> np.ndarray:
+        posicoes = self.indice_usuarios.get_indexer(pd.Index(list(ids_usuarios)))
+        if (posicoes < 0).any():
+            raise ValueError(f'{int((posicoes < 0).sum())} usuário(s) fora do cubo.')
+        return posicoes
+
+    def posicoes_eventos(self, eventos) -> list:
+        return [self.eventos.index(evento) for evento in eventos]
+
+    def fatiar(self, ids_usuarios=None, inicio=None, fim=None, eventos: list = None) -> np.ndarray:
+        """
+        Seleciona usuários, uma janela de datas e eventos.
+
+        A janela de datas é uma fatia do eixo de dias (sem cópia); a seleção de usuários e de eventos
+        copia apenas as linhas e colunas pedidas.
+
+        Args:
+            ids_usuarios (Iterable | None): Usuários, na ordem desejada. None seleciona todos.
+            inicio: Primeiro dia da janela (inclusivo). None: início do cubo.
+            fim: Último dia da janela (inclusivo). None: fim do cubo.
+            eventos (list | None): Eventos (nomes de EVENTOS). None seleciona todos.
+
+        Returns:
+            np.ndarray: Contagens (usuários x dias x eventos).
+        """
+        primeiro, ultimo = self.intervalo_dias(inicio, fim)
+        fatia = self.cubo[:, primeiro:ultimo]
+
+        if ids_usuarios is not None:
+            fatia = fatia[self.posicoes_usuarios(ids_usuarios)]
+        if eventos is not None:
+            fatia = fatia[..., self.posicoes_eventos(eventos)]
+        return fatia
+
+    def fatiar_cluster(self, df_agrupado: pd.DataFrame, cluster: int, coluna_cluster: str = 'cluster',
+                       **kwargs) -> np.ndarray:
+        """
+        Fatia os usuários de um cluster de df_agrupado_soma (ver fatiar para os demais filtros).
+        """
+        ids_usuarios = df_agrupado.loc[df_agrupado[coluna_cluster] == cluster, 'id_usuario']
+        return self.fatiar(ids_usuarios[ids_usuarios.isin(self.indice_usuarios)], **kwargs)
+
+    def agregar(self, frequencia: str = 'W', ids_usuarios=None, inicio=None, fim=None,
+                eventos: list = None) -> tuple[np.ndarray, pd.PeriodIndex]:
+        """
+        Soma os dias em semanas ou meses (mesmos períodos das colunas 'semana' e 'mes' dos notebooks).
+
+        Args:
+            frequencia (str): 'W' (semana) ou 'M' (mês).
+            ids_usuarios, inicio, fim, eventos: Filtros, como em fatiar.
+
+        Returns:
+            tuple[np.ndarray, pd.PeriodIndex]: Contagens (usuários x períodos x eventos) e os períodos.
+        """
+        fatia = self.fatiar(ids_usuarios, inicio, fim, eventos)
+        primeiro, _ = self.intervalo_dias(inicio, fim)
+        periodos = self.dias[primeiro:primeiro + fatia.shape[1]].to_period(frequencia)
+
+        # Dias são contínuos, então cada período é um trecho e a soma é um reduceat no eixo de dias
+        novo = np.ones(len(periodos), dtype=bool)
+        novo[1:] = periodos[1:] != periodos[:-1]
+        inicios = np.flatnonzero(novo)
+        if len(inicios) == 0:
+            return np.zeros((fatia.shape[0], 0, fatia.shape[2]), dtype=np.int64), periodos[:0]
+        somas = np.add.reduceat(fatia.astype(np.int64, copy=False), inicios, axis=1)
+        return somas, periodos[inicios]
+
+    def totais(self, ids_usuarios=None, inicio=None, fim=None, eventos: list = None) -> pd.DataFrame:
+        """
+        Soma de cada evento por usuário (como os groupby('id_usuario').sum() dos histogramas e do
+        df_agrupado_soma).
+
+        Returns:
+            pd.DataFrame: Uma linha por usuário, com 'id_usuario' e uma coluna por evento.
+        """
+        fatia = self.fatiar(ids_usuarios, inicio, fim, eventos)
+        somas = fatia.sum(axis=1, dtype=np.int64)
+        usuarios = self.usuarios if ids_usuarios is None else self.usuarios[self.posicoes_usuarios(ids_usuarios)]
+        df = pd.DataFrame(somas, columns=eventos or self.eventos)
+        df.insert(0, 'id_usuario', usuarios)
+        return df
+
+    def eventos_por_dia(self, usuario, evento: str = 'quantPosts', inicio=None, fim=None) -> pd.Series:
+        """
+        Contagem diária de um evento de um usuário, apenas nos dias com eventos.
+
+        Com 'quantPosts' ou 'quantLikes' equivale ao df_usuario.groupby('data').size() dos testes de
+        tendência (teste_mk/teste_mk_likes).
+
+        Args:
+            usuario: id_usuario.
+            evento (str): Evento.
+            inicio, fim: Janela de datas, como em fatiar.
+
+        Returns:
+            pd.Series: Contagens indexadas pela data.
+        """
+        serie = self.fatiar([usuario], inicio, fim, [evento])[0, :, 0]
+        primeiro, _ = self.intervalo_dias(inicio, fim)
+        ativos = np.flatnonzero(serie)
+        return pd.Series(serie[ativos].astype(np.int64), index=self.dias[primeiro + ativos], name=evento)
+
+    def series_diarias(self, evento: str = 'quantPosts', ids_usuarios=None, inicio=None,
+                       fim=None) -> tuple[np.ndarray, list]:
+        """
+        Séries de eventos por dia de vários usuários, apenas nos dias com eventos, no formato de
+        TendenciaMannKendall.series_diarias (entrada de TendenciaMannKendall.testar_series_usuarios).
+
+        Args:
+            evento (str): Evento ('quantPosts' para teste_mk, 'quantLikes' para teste_mk_likes).
+            ids_usuarios, inicio, fim: Filtros, como em fatiar.
+
+        Returns:
+            tuple[np.ndarray, list]: Usuários e a série (float) de cada um.
+        """
+        fatia = self.fatiar(ids_usuarios, inicio, fim, [evento])[..., 0]
+        usuarios = self.usuarios if ids_usuarios is None else self.usuarios[self.posicoes_usuarios(ids_usuarios)]
+        series = [linha[linha > 0].astype(float) for linha in fatia]
+        return usuarios, series
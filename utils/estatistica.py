@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from statsmodels.stats.multitest import multipletests
+
+# Colunas da tabela de pares retornada por Estatistica.spearman
+COLUNAS_PARES = ['variavel_1', 'variavel_2', 'rho', 'p_valor', 'n']
+
+
+class Estatistica:
+    """
+    Correlações de Spearman de todas as colunas de uma tabela, com p-valores, em uma única passada.
+
+    Substitui o .corr(method='spearman') seguido do laço de scipy.stats.spearmanr por par de colunas
+    (colunas_interacoes e colunas_respostas em analise_tendencia.ipynb): cada coluna é ranqueada uma
+    única vez, a matriz de rho sai de um produto de matrizes dos postos padronizados e todos os p-valores
+    vêm do mesmo teste t do spearmanr, calculado de forma vetorizada.
+    """
+
+    @staticmethod
+    def postos(df: pd.DataFrame) -> np.ndarray:
+        """
+        Postos de cada coluna (empates recebem a média, como o rankdata do scipy).
+
+        Args:
+            df (pd.DataFrame): Tabela numérica.
+
+        Returns:
+            np.ndarray: Postos (linhas x colunas). Colunas com NaN ficam inteiras como NaN.
+        """
+        postos = np.array(df.rank(method='average'), dtype=float)
+        postos[:, df.isna().any().to_numpy()] = np.nan
+        return postos
+
+    @staticmethod
+    def matriz_spearman(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Matrizes de rho e de p-valor (bicaudal) de Spearman entre todas as colunas.
+
+        Colunas constantes ou com NaN têm rho e p-valor NaN, como no spearmanr (nan_policy='propagate').
+
+        Args:
+            df (pd.DataFrame): Tabela numérica (ex.: colunas_interacoes).
+
+        Returns:
+            tuple[pd.DataFrame, pd.DataFrame]: rho e p-valor, indexados pelas colunas de df.
+        """
+        n = len(df)
+        postos = Estatistica.postos(df)
+
+        # Postos centrados e de norma 1: o produto das matrizes é a correlação de Pearson dos postos
+        centrados = postos - postos.mean(axis=0)
+        normas = np.sqrt(np.sum(centrados ** 2, axis=0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            padronizados = centrados / normas
+            rho = np.clip(padronizados.T @ padronizados, -1.0, 1.0)
+        np.fill_diagonal(rho, np.where(normas > 0, 1.0, np.nan))
+
+        graus_liberdade = n - 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = rho * np.sqrt((graus_liberdade / ((rho + 1.0) * (1.0 - rho))).clip(0))
+        p = 2 * stats.t.sf(np.abs(t), graus_liberdade)
+
+        colunas = df.columns
+        return pd.DataFrame(rho, index=colunas, columns=colunas), pd.DataFrame(p, index=colunas, columns=colunas)
+
+    @staticmethod
+    def spearman(df: pd.DataFrame, correcao: str = None, alpha: float = 0.05) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Correlação de Spearman de todos os pares de colunas, com correção opcional para testes múltiplos.
+
+        Args:
+            df (pd.DataFrame): Tabela numérica (ex.: colunas_interacoes, colunas_respostas).
+            correcao (str): Método do statsmodels multipletests ('bonferroni', 'holm', 'fdr_bh', ...).
+                None não corrige.
+            alpha (float): Nível de significância da correção.
+
+        Returns:
+            tuple[pd.DataFrame, pd.DataFrame]: Matriz de rho (para o heatmap) e uma linha por par (i < j)
+                com COLUNAS_PARES e, com correção, 'p_corrigido' e 'rejeita'.
+        """
+        rho, p = Estatistica.matriz_spearman(df)
+        linhas, colunas = np.triu_indices(len(df.columns), k=1)
+
+        pares = pd.DataFrame({
+            'variavel_1': df.columns[linhas],
+            'variavel_2': df.columns[colunas],
+            'rho': rho.to_numpy()[linhas, colunas],
+            'p_valor': p.to_numpy()[linhas, colunas],
+            'n': len(df),
+        })
+
+        if correcao is not None:
+            validos = pares['p_valor'].notna().to_numpy()
+            pares['p_corrigido'] = np.nan
+            pares['rejeita'] = False
+            if validos.any():
+                rejeita, p_corrigido, _, _ = multipletests(pares.loc[validos, 'p_valor'], alpha=alpha,
+                                                           method=correcao)
+                pares.loc[validos, 'p_corrigido'] = p_corrigido
+                pares.loc[validos, 'rejeita'] = rejeita
+
+        return rho, pares
+
+    @staticmethod
+    def imprimir_pares(pares: pd.DataFrame) -> None:
+        """
+        Imprime os pares no mesmo formato do laço de spearmanr do notebook.
+        """
+        for linha in pares.itertuples(index=False):
+            print(f'Correlação de Spearman entre {linha.variavel_1} e {linha.variavel_2}: {linha.rho}')
+            print(f'P-valor de Spearman: {linha.p_valor}')
@@ -1,8 +1,43 @@
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+_extracao_worker = None
+
+
+def _contar_chunk_worker(chunk: pd.DataFrame) -> pd.DataFrame:
+    # Cada processo compila os padrões uma única vez
+    global _extracao_worker
+    if _extracao_worker is None:
+        _extracao_worker = ExtracaoInteracao()
+    return _extracao_worker.contar_chunk(chunk)
 
 
 class ExtracaoInteracao:
-    def __init__(self, df):
+    # Palavra obrigatória em qualquer trecho encontrado por cada padrão. As palavras não se sobrepõem
+    # entre si, então uma única varredura por texto identifica quais padrões precisam ser testados.
+    PALAVRAS_CHAVE = {
+        'quantProfile': 'updated',
+        'quantCover': 'updated',
+        'quantAddPhotoWithOthers': 'photo',
+        'quantIsWithOthers': 'with',
+        'quantAddPhoto': 'added',
+        'quantSharedPhoto': 'shared',
+        'quantSharedVideo': 'shared',
+        'quantSharedLink': 'shared',
+        'quantSharedPost': 'shared',
+        'quantSharedEvent': 'shared',
+        'quantSharedMemory': 'shared',
+        'quantStatus': 'updated',
+    }
+
+    # Colunas lidas de cada chunk no modo streaming
+    COLUNAS_CHUNK = ['id_usuario', 'postStory', 'postMessage']
+
+    def __init__(self, df=None):
         self.df = df
         self.patterns = {
             'quantProfile': re.compile(r'updated (?:his|her) profile picture', re.IGNORECASE),
@@ -28,13 +63,157 @@ class ExtracaoInteracao:
             'quantStatus': re.compile(r'updated (?:his|her) status', re.IGNORECASE)
         }
 
+        # Padrão de triagem: uma alternância com um grupo nomeado por palavra-chave
+        palavras = sorted(set(ExtracaoInteracao.PALAVRAS_CHAVE.values()))
+        self.padrao_triagem = re.compile('|'.join(f'(?P<{palavra}>{palavra})' for palavra in palavras),
+                                         re.IGNORECASE)
+        self.padroes_por_palavra = {palavra: [] for palavra in palavras}
+        for indice, key in enumerate(self.patterns):
+            self.padroes_por_palavra[ExtracaoInteracao.PALAVRAS_CHAVE[key]].append((indice, self.patterns[key]))
+
     @staticmethod
     def count_occurrences(text, pattern):
         if isinstance(text, str):
             return len(pattern.findall(text))
         return 0
 
+    def contar_texto(self, text, linha: np.ndarray) -> None:
+        """
+        Conta as ocorrências de todos os padrões em um texto, testando apenas os padrões cuja
+        palavra-chave aparece nele.
+
+        Args:
+            text (str): Texto do story.
+            linha (np.ndarray): Linha da matriz de contagens a ser preenchida.
+        """
+        if not isinstance(text, str):
+            return
+
+        palavras_encontradas = {match.lastgroup for match in self.padrao_triagem.finditer(text)}
+        for palavra in palavras_encontradas:
+            for indice, pattern in self.padroes_por_palavra[palavra]:
+                linha[indice] = len(pattern.findall(text))
+
+    def matriz_interacoes(self, serie: pd.Series = None) -> np.ndarray:
+        """
+        Classifica todos os stories em uma única passada e retorna a matriz de contagens.
+
+        Stories repetidos são processados uma única vez. As colunas seguem a ordem de self.patterns.
+
+        Args:
+            serie (pd.Series): Série de stories. Por padrão, a coluna 'postStory' de self.df.
+
+        Returns:
+            np.ndarray: Matriz (posts x padrões) com o menor tipo inteiro sem sinal que comporta as contagens.
+        """
+        if serie is None:
+            serie = self.df['postStory']
+
+        codigos, unicos = pd.factorize(serie)
+
+        # A última linha fica zerada e atende os nulos, cujo código é -1
+        contagens = np.zeros((len(unicos) + 1, len(self.patterns)), dtype=np.int64)
+        for indice, text in enumerate(unicos):
+            self.contar_texto(text, contagens[indice])
+
+        maximo = int(contagens.max()) if contagens.size else 0
+        contagens = contagens.astype(np.min_scalar_type(maximo))
+
+        return contagens[codigos]
+
     def extract_interactions(self):
-        for key, pattern in self.patterns.items():
-            self.df[key] = self.df['postStory'].apply(lambda x: self.count_occurrences(x, pattern))
+        matriz = self.matriz_interacoes()
+        for indice, key in enumerate(self.patterns):
+            self.df[key] = matriz[:, indice]
         return self.df
+
+    @staticmethod
+    def _texto_preenchido(serie: pd.Series) -> np.ndarray:
+        # Mesmo critério do notebook: valor não nulo e não vazio após strip
+        return (serie.notna() & (serie.astype(str).str.strip() != '')).to_numpy(dtype=np.uint8)
+
+    def contar_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Conta as interações de um chunk de posts sem alterar o DataFrame recebido.
+
+        Args:
+            chunk (pd.DataFrame): Chunk com 'id_usuario', 'postStory' e, opcionalmente, 'postMessage'.
+
+        Returns:
+            pd.DataFrame: 'id_usuario', quantPosts, quantPostMsg/quantPostStory (quando disponíveis)
+            e uma coluna por padrão de interação, com o mesmo índice do chunk.
+        """
+        contagens = pd.DataFrame({'id_usuario': chunk['id_usuario'].to_numpy()}, index=chunk.index)
+        contagens['quantPosts'] = np.ones(len(chunk), dtype=np.uint8)
+        if 'postMessage' in chunk.columns:
+            contagens['quantPostMsg'] = ExtracaoInteracao._texto_preenchido(chunk['postMessage'])
+        contagens['quantPostStory'] = ExtracaoInteracao._texto_preenchido(chunk['postStory'])
+
+        matriz = self.matriz_interacoes(chunk['postStory'])
+        for indice, key in enumerate(self.patterns):
+            contagens[key] = matriz[:, indice]
+
+        return contagens
+
+    def extrair_chunks(self, chunks, n_process: int = 1, max_pendentes: int = None):
+        """
+        Extrai as interações de um iterador de chunks (cursor do Mongo em lotes, leitor de CSV/Parquet etc.),
+        sem materializar a tabela inteira de posts.
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): Chunks de posts.
+            n_process (int): Número de processos. Com 1, tudo roda no processo atual.
+            max_pendentes (int): Máximo de chunks em processamento simultâneo. Padrão: 2 * n_process.
+
+        Yields:
+            pd.DataFrame: Contagens de cada chunk (ver contar_chunk), na ordem de entrada.
+        """
+        if n_process <= 1:
+            for chunk in chunks:
+                yield self.contar_chunk(chunk)
+            return
+
+        max_pendentes = max_pendentes or 2 * n_process
+        pendentes = deque()
+        with ProcessPoolExecutor(max_workers=n_process) as executor:
+            for chunk in chunks:
+                # Apenas as colunas necessárias são enviadas aos processos filhos
+                colunas = [coluna for coluna in ExtracaoInteracao.COLUNAS_CHUNK if coluna in chunk.columns]
+                pendentes.append(executor.submit(_contar_chunk_worker, chunk[colunas]))
+
+                # Limita a quantidade de chunks em memória aguardando processamento
+                if len(pendentes) >= max_pendentes:
+                    yield pendentes.popleft().result()
+
+            while pendentes:
+                yield pendentes.popleft().result()
+
+    def agregar_por_usuario(self, chunks, n_process: int = 1, max_pendentes: int = None) -> pd.DataFrame:
+        """
+        Soma as interações por usuário de forma incremental, chunk a chunk.
+
+        As colunas seguem os nomes usados na clusterização (somaProfile, somaCover, ...), além de
+        quantPosts, quantPostMsg e quantPostStory.
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): Chunks de posts.
+            n_process (int): Número de processos.
+            max_pendentes (int): Máximo de chunks em processamento simultâneo.
+
+        Returns:
+            pd.DataFrame: Uma linha por usuário com as somas, com 'id_usuario' como coluna.
+        """
+        renomear = {key: 'soma' + key.removeprefix('quant') for key in self.patterns}
+        acumulado = None
+
+        for contagens in self.extrair_chunks(chunks, n_process, max_pendentes):
+            parcial = contagens.groupby('id_usuario', sort=False).sum()
+            if acumulado is None:
+                acumulado = parcial
+            else:
+                acumulado = pd.concat([acumulado, parcial]).groupby(level=0, sort=False).sum()
+
+        if acumulado is None:
+            return pd.DataFrame(columns=['id_usuario'])
+
+        return acumulado.rename(columns=renomear).reset_index()
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import weakref
+from collections import Counter
+from numbers import Integral
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+
+def limites_frequencia(total_documentos: int, max_df_custom: float | int, min_df_custom: float | int) -> tuple:
+    """
+    Converte max_df/min_df em quantidades de documentos, como o scikit-learn (inteiro: absoluto; float: fração).
+
+    Returns:
+        tuple: (mínimo, máximo) de documentos, inclusivos.
+    """
+    maximo = max_df_custom if isinstance(max_df_custom, Integral) else max_df_custom * total_documentos
+    minimo = min_df_custom if isinstance(min_df_custom, Integral) else min_df_custom * total_documentos
+    if maximo < minimo:
+        raise ValueError('max_df corresponds to < documents than min_df')
+    return minimo, maximo
+
+
+def _fechar(conexao: sqlite3.Connection, diretorio_temporario: str | None) -> None:
+    try:
+        conexao.close()
+    except sqlite3.Error:
+        pass
+    if diretorio_temporario is not None:
+        shutil.rmtree(diretorio_temporario, ignore_errors=True)
+
+
+class FrequenciaDocumentos:
+    """
+    Frequência de documento de cada termo (n-grama), contada com memória limitada e guardada em SQLite.
+
+    As contagens de um lote ficam em um Counter até max_termos_memoria termos distintos; então são somadas
+    à tabela em disco e o Counter é esvaziado. Assim a memória não cresce com o vocabulário do corpus, e a
+    poda por max_df/min_df lê do disco apenas os termos que ficam.
+
+    Com um caminho, o estado persiste entre execuções: posts novos são somados com adicionar, sem reler os
+    antigos. O estado guarda os parâmetros do analisador (stopwords e ngram_range) e recusa outros.
+
+    Atributos:
+        caminho (str): Arquivo SQLite do estado.
+        max_termos_memoria (int): Termos distintos mantidos em memória antes de gravar em disco.
+    """
+
+    def __init__(self, caminho: str = None, stop_words=None, ngram_range: tuple = (1, 1),
+                 max_termos_memoria: int = 1_000_000):
+        """
+        Abre (ou cria) o estado.
+
+        Args:
+            caminho (str): Arquivo SQLite do estado. None usa um arquivo temporário, apagado ao fechar.
+            stop_words (list): Stopwords do analisador (as mesmas da vetorização).
+            ngram_range (tuple): Intervalo de n-gramas do analisador.
+            max_termos_memoria (int): Termos distintos mantidos em memória antes de gravar em disco.
+
+        Raises:
+            ValueError: Se o estado salvo foi contado com outras stopwords ou outro ngram_range.
+        """
+        diretorio_temporario = None
+        if caminho is None:
+            diretorio_temporario = tempfile.mkdtemp(prefix='frequencia_documentos_')
+            caminho = os.path.join(diretorio_temporario, 'frequencias.sqlite')
+        elif os.path.dirname(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+
+        self.caminho = caminho
+        self.max_termos_memoria = max_termos_memoria
+        self.analisador = CountVectorizer(stop_words=stop_words, ngram_range=ngram_range).build_analyzer()
+
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.execute('CREATE TABLE IF NOT EXISTS frequencias (termo TEXT PRIMARY KEY, '
+                             'documentos INTEGER NOT NULL) WITHOUT ROWID')
+        self.conexao.execute('CREATE TABLE IF NOT EXISTS metadados (chave TEXT PRIMARY KEY, valor TEXT NOT NULL)')
+        self.conexao.execute("INSERT OR IGNORE INTO metadados VALUES ('total_documentos', '0')")
+        self.conexao.execute("INSERT OR IGNORE INTO metadados VALUES ('configuracao', ?)",
+                             (FrequenciaDocumentos.configuracao(stop_words, ngram_range),))
+        self.conexao.commit()
+        self._finalizador = weakref.finalize(self, _fechar, self.conexao, diretorio_temporario)
+        self.verificar_configuracao(stop_words, ngram_range)
+
+        self._pendentes = Counter()
+        self._documentos_pendentes = 0
+
+    @staticmethod
+    def configuracao(stop_words, ngram_range: tuple) -> str:
+        stopwords = '\n'.join(sorted(stop_words)) if stop_words is not None else ''
+        conteudo = f'{tuple(ngram_range)}\x00{stopwords}'
+        return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+    def _metadado(self, chave: str) -> str:
+        return self.conexao.execute('SELECT valor FROM metadados WHERE chave = ?', (chave,)).fetchone()[0]
+
+    def verificar_configuracao(self, stop_words, ngram_range: tuple) -> None:
+        if self._metadado('configuracao') != FrequenciaDocumentos.configuracao(stop_words, ngram_range):
+            raise ValueError(f'O estado em {self.caminho} foi contado com outras stopwords ou outro ngram_range.')
+
+    @property
+    def total_documentos(self) -> int:
+        return int(self._metadado('total_documentos')) + self._documentos_pendentes
+
+    def adicionar(self, textos) -> None:
+        """
+        Conta os termos de novos documentos (cada termo uma vez por documento).
+
+        Args:
+            textos (Iterable[str]): Documentos ainda não contados neste estado.
+        """
+        for texto in textos:
+            self._pendentes.update(set(self.analisador(texto)))
+            self._documentos_pendentes += 1
+            if len(self._pendentes) >= self.max_termos_memoria:
+                self.gravar()
+
+    def gravar(self) -> None:
+        """
+        Soma as contagens pendentes à tabela em disco, junto com o total de documentos.
+        """
+        if not self._pendentes and not self._documentos_pendentes:
+            return
+
+        with self.conexao:
+            self.conexao.executemany(
+                'INSERT INTO frequencias (termo, documentos) VALUES (?, ?) '
+                'ON CONFLICT (termo) DO UPDATE SET documentos = documentos + excluded.documentos',
+                self._pendentes.items()
+            )
+            self.conexao.execute("UPDATE metadados SET valor = CAST(valor AS INTEGER) + ? "
+                                 "WHERE chave = 'total_documentos'", (self._documentos_pendentes,))
+
+        self._pendentes.clear()
+        self._documentos_pendentes = 0
+
+    def vocabulario_podado(self, max_df_custom: float | int, min_df_custom: float | int) -> tuple:
+        """
+        Aplica max_df/min_df como o scikit-learn e retorna o vocabulário ordenado.
+
+        Returns:
+            tuple: (array de palavras ordenadas, array com a frequência de documento de cada uma)
+        """
+        self.gravar()
+        if self.conexao.execute('SELECT 1 FROM frequencias LIMIT 1').fetchone() is None:
+            raise ValueError('empty vocabulary; perhaps the documents only contain stop words')
+
+        minimo, maximo = limites_frequencia(self.total_documentos, max_df_custom, min_df_custom)
+        # A ordem binária do SQLite (bytes UTF-8) é a mesma ordem de código do sorted do Python
+        linhas = self.conexao.execute(
+            'SELECT termo, documentos FROM frequencias WHERE documentos >= ? AND documentos <= ? ORDER BY termo',
+            (minimo, maximo)
+        ).fetchall()
+        if not linhas:
+            raise ValueError('After pruning, no terms remain. Try a lower min_df or a higher max_df.')
+
+        palavras = np.array([termo for termo, _ in linhas], dtype=object)
+        frequencias = np.array([documentos for _, documentos in linhas], dtype=np.int64)
+        return palavras, frequencias
+
+    def fechar(self) -> None:
+        self.gravar()
+        self._finalizador()
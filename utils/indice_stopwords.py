@@ -0,0 +1,183 @@
+import hashlib
+import os
+import pickle
+from importlib import metadata
+
+import unidecode
+
+
+class IndiceStopwords:
+    """
+    Índice imutável de stopwords, normalizado uma única vez e consultado em O(1).
+
+    As palavras são armazenadas em um frozenset já normalizado (minúsculas, sem espaços nas bordas
+    e sem acentos). A normalização dos tokens consultados é memorizada em um cache por instância,
+    já que o mesmo token se repete muitas vezes ao longo do corpus.
+
+    Atributos:
+        palavras (frozenset): Conjunto de stopwords normalizadas.
+        impressao_digital (str): Hash das fontes usadas na construção do índice.
+    """
+
+    VERSAO_FORMATO = 1
+    PACOTES_FONTE = ('nltk', 'spacy', 'wordcloud', 'unidecode')
+
+    def __init__(self, palavras, impressao_digital: str = None, tamanho_cache: int = 500_000):
+        """
+        Inicializa o índice.
+
+        Args:
+            palavras (Iterable[str]): Stopwords já normalizadas.
+            impressao_digital (str): Hash das fontes usadas na construção do índice.
+            tamanho_cache (int): Número máximo de tokens mantidos no cache de normalização.
+        """
+        self.palavras = frozenset(palavras)
+        self.impressao_digital = impressao_digital
+        self.tamanho_cache = tamanho_cache
+        self._cache_normalizacao = {}
+
+    def __getstate__(self):
+        # O cache de normalização é descartado na serialização (disco ou processos filhos)
+        estado = self.__dict__.copy()
+        estado['_cache_normalizacao'] = {}
+        return estado
+
+    def __contains__(self, palavra) -> bool:
+        return palavra in self.palavras
+
+    def __iter__(self):
+        return iter(self.palavras)
+
+    def __len__(self) -> int:
+        return len(self.palavras)
+
+    @staticmethod
+    def normalizar(palavra: str) -> str:
+        return unidecode.unidecode(palavra.lower().strip())
+
+    def normalizar_token(self, token: str) -> str:
+        """
+        Normaliza um token consultando antes o cache por instância.
+
+        Args:
+            token (str): Token original.
+
+        Returns:
+            str: Token normalizado.
+        """
+        normalizado = self._cache_normalizacao.get(token)
+        if normalizado is None:
+            if len(self._cache_normalizacao) >= self.tamanho_cache:
+                self._cache_normalizacao.clear()
+            normalizado = IndiceStopwords.normalizar(token)
+            self._cache_normalizacao[token] = normalizado
+        return normalizado
+
+    def contem(self, token: str) -> bool:
+        return self.normalizar_token(token) in self.palavras
+
+    def filtrar(self, texto: str) -> str:
+        """
+        Remove as stopwords de um texto separado por espaços.
+
+        Args:
+            texto (str): Texto de entrada.
+
+        Returns:
+            str: Texto sem as stopwords.
+        """
+        palavras = self.palavras
+        normalizar = self.normalizar_token
+        return ' '.join([palavra for palavra in texto.split() if normalizar(palavra) not in palavras])
+
+    @staticmethod
+    def calcular_impressao_digital(arquivos) -> str:
+        """
+        Calcula o hash das fontes do índice: versões dos pacotes e tamanho/data dos arquivos customizados.
+
+        Args:
+            arquivos (Iterable[str]): Caminhos dos arquivos de stopwords customizados.
+
+        Returns:
+            str: Hash SHA-256 em hexadecimal.
+        """
+        hash_fontes = hashlib.sha256()
+        hash_fontes.update(str(IndiceStopwords.VERSAO_FORMATO).encode())
+
+        for pacote in IndiceStopwords.PACOTES_FONTE:
+            try:
+                versao = metadata.version(pacote)
+            except metadata.PackageNotFoundError:
+                versao = 'ausente'
+            hash_fontes.update(f'{pacote}={versao}'.encode())
+
+        for caminho_arquivo in arquivos:
+            if os.path.exists(caminho_arquivo):
+                info = os.stat(caminho_arquivo)
+                hash_fontes.update(f'{caminho_arquivo}:{info.st_size}:{info.st_mtime_ns}'.encode())
+            else:
+                hash_fontes.update(f'{caminho_arquivo}:ausente'.encode())
+
+        return hash_fontes.hexdigest()
+
+    def salvar(self, caminho_cache: str) -> None:
+        diretorio = os.path.dirname(caminho_cache)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+        # Escrita atômica para não deixar o cache corrompido se dois processos salvarem ao mesmo tempo
+        caminho_temporario = f'{caminho_cache}.{os.getpid()}.tmp'
+        with open(caminho_temporario, 'wb') as arquivo:
+            pickle.dump(self, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(caminho_temporario, caminho_cache)
+
+    @staticmethod
+    def carregar(caminho_cache: str, impressao_digital: str):
+        """
+        Carrega o índice do disco se ele tiver sido construído a partir das mesmas fontes.
+
+        Args:
+            caminho_cache (str): Caminho do arquivo serializado.
+            impressao_digital (str): Hash esperado das fontes.
+
+        Returns:
+            IndiceStopwords | None: O índice carregado ou None se o cache não existir ou estiver desatualizado.
+        """
+        if not os.path.exists(caminho_cache):
+            return None
+
+        try:
+            with open(caminho_cache, 'rb') as arquivo:
+                indice = pickle.load(arquivo)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+
+        if not isinstance(indice, IndiceStopwords) or indice.impressao_digital != impressao_digital:
+            return None
+
+        return indice
+
+    @staticmethod
+    def carregar_ou_construir(caminho_cache: str, construtor, arquivos):
+        """
+        Retorna o índice serializado em disco ou o constrói e salva caso as fontes tenham mudado.
+
+        Args:
+            caminho_cache (str): Caminho do arquivo serializado.
+            construtor (Callable[[], Iterable[str]]): Função que gera as stopwords normalizadas.
+            arquivos (Iterable[str]): Arquivos de stopwords customizados usados pelo construtor.
+
+        Returns:
+            IndiceStopwords: Índice pronto para consulta.
+        """
+        impressao_digital = IndiceStopwords.calcular_impressao_digital(arquivos)
+
+        indice = IndiceStopwords.carregar(caminho_cache, impressao_digital)
+        if indice is None:
+            indice = IndiceStopwords(construtor(), impressao_digital)
+            try:
+                indice.salvar(caminho_cache)
+            except OSError as e:
+                print(f'Não foi possível salvar o índice de stopwords em {caminho_cache}. Erro: {e}')
+
+        return indice
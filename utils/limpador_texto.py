@@ -0,0 +1,110 @@
+import re
+import string
+
+import pandas as pd
+
+
+class _TabelaCaracteresFinais(dict):
+    """
+    Tabela para str.translate que classifica cada caractere na primeira vez em que ele aparece.
+
+    Mantém letras de a-z, à-ù e o espaço; troca por espaço os demais caracteres de palavra (\\w, incluindo
+    dígitos) e apaga o restante (símbolos e emojis), na mesma semântica das expressões regulares originais.
+    """
+
+    PADRAO_PERMITIDOS = re.compile(r'[a-zà-ù ]')
+    PADRAO_PALAVRA_OU_ESPACO = re.compile(r'[\w\s]')
+
+    def __missing__(self, codigo):
+        caractere = chr(codigo)
+        # [^\w\s] é removido antes de [^a-zà-ù ]: símbolos dentro do intervalo à-ù (÷) também são apagados
+        if not _TabelaCaracteresFinais.PADRAO_PALAVRA_OU_ESPACO.fullmatch(caractere):
+            valor = None
+        elif _TabelaCaracteresFinais.PADRAO_PERMITIDOS.fullmatch(caractere):
+            valor = codigo
+        else:
+            valor = ' '
+        self[codigo] = valor
+        return valor
+
+
+class LimpadorTexto:
+    """
+    Limpeza de texto com padrões pré-compilados, equivalente ao antigo TextTreatment.remove_caracteres.
+
+    As ~20 chamadas de re.sub originais foram reduzidas a quatro etapas:
+
+    1. Tags HTML (<.*?>) são removidas antes de qualquer outra coisa, como no original.
+    2. Pontuação ASCII e espaços em branco viram um único espaço. Trocar cada pontuação por espaço e depois
+       colapsar \\s+ é o mesmo que substituir cada sequência de pontuação/espaços por um espaço.
+    3. Uma tabela de str.translate mantém [a-zà-ù ], troca os demais caracteres de palavra por espaço
+       (o que cobre a remoção de dígitos) e apaga os caracteres que não são de palavra nem espaço.
+    4. Remoção de repetições (kk, jj, ksks, haha, aa), em sequência, porque uma remoção pode formar a
+       repetição seguinte (ex.: "jkkj" -> "jj" -> "").
+
+    Etapas do original que nunca encontravam correspondência foram descartadas: depois da troca da
+    pontuação não existem mais '[123]', '$', URLs, '#', '<a href', '&amp;', '<br />' nem os demais
+    caracteres especiais, e após a etapa 3 não sobram emojis para emoji.replace_emoji.
+    Os espaços múltiplos criados após o colapso de \\s+ são preservados, como no original.
+    """
+
+    PADRAO_TAGS = re.compile(r'<.*?>')
+    PADRAO_PONTUACAO_ESPACOS = re.compile(r'[%s\s]+' % re.escape(string.punctuation))
+    TABELA_CARACTERES = _TabelaCaracteresFinais()
+
+    # (padrão, trecho mínimo que precisa existir no texto para o padrão encontrar algo)
+    PADROES_REPETICOES = (
+        (re.compile(r'k{2,}', flags=re.IGNORECASE), 'kk'),
+        (re.compile(r'j{2,}', flags=re.IGNORECASE), 'jj'),
+        (re.compile(r'(ks){2,}', flags=re.IGNORECASE), 'ksks'),
+        (re.compile(r'(ha){2,}', flags=re.IGNORECASE), 'haha'),
+        (re.compile(r'a{2,}', flags=re.IGNORECASE), 'aa'),
+    )
+
+    @staticmethod
+    def limpar(texto: str) -> str:
+        """
+        Limpa um único texto.
+
+        Args:
+            texto (str): Texto original.
+
+        Returns:
+            str: Texto limpo.
+        """
+        texto = texto.lower().strip()
+
+        if '<' in texto:
+            texto = LimpadorTexto.PADRAO_TAGS.sub('', texto)
+
+        texto = LimpadorTexto.PADRAO_PONTUACAO_ESPACOS.sub(' ', texto)
+        texto = texto.translate(LimpadorTexto.TABELA_CARACTERES)
+
+        for padrao, trecho in LimpadorTexto.PADROES_REPETICOES:
+            if trecho in texto:
+                texto = padrao.sub('', texto)
+
+        return texto
+
+    @staticmethod
+    def limpar_serie(serie: pd.Series) -> pd.Series:
+        """
+        Limpa uma Series de textos inteira com os métodos vetorizados de pandas.
+
+        Valores nulos são preservados como nulos.
+
+        Args:
+            serie (pd.Series): Series de textos.
+
+        Returns:
+            pd.Series: Series com os textos limpos.
+        """
+        serie = serie.str.lower().str.strip()
+        serie = serie.str.replace(LimpadorTexto.PADRAO_TAGS, '', regex=True)
+        serie = serie.str.replace(LimpadorTexto.PADRAO_PONTUACAO_ESPACOS, ' ', regex=True)
+        serie = serie.str.translate(LimpadorTexto.TABELA_CARACTERES)
+
+        for padrao, _ in LimpadorTexto.PADROES_REPETICOES:
+            serie = serie.str.replace(padrao, '', regex=True)
+
+        return serie
@@ -0,0 +1,204 @@
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+# Colunas de período geradas nos notebooks (manipular_filtrar_posts/likes) e a frequência de cada uma
+COLUNAS_PERIODO = {'mes': 'M', 'semana': 'W'}
+
+# Colunas de data/hora dos CSVs exportados
+COLUNAS_DATA = ['postCreatedTime', 'likeCreatedTime', 'data']
+
+# Extensões reconhecidas para cada formato
+EXTENSOES = {'.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+
+# Esquema completo de um snapshot particionado; o prefixo '_' faz o pyarrow ignorá-lo como dado
+ARQUIVO_ESQUEMA = '_esquema.arrow'
+
+
+class Snapshot:
+    """
+    Snapshots colunares (Parquet ou Feather) das tabelas intermediárias da análise.
+
+    Substitui os CSVs exportados (df_cluster*.csv, df_likes_cluster*.csv, resultados_mk*.csv,
+    dados/filtro_nivel/...): os tipos são preservados (inclusive Period em 'mes'/'semana' e categorias),
+    a leitura pode projetar colunas e filtrar linhas (usando as estatísticas dos row groups e as
+    partições) e os arquivos são abertos com memory-map.
+
+    O Feather é gravado sem compressão por padrão, para que o memory-map leia os buffers sem cópia;
+    o Parquet usa zstd e ocupa bem menos disco.
+    """
+
+    @staticmethod
+    def formato(caminho: str, formato: str = None) -> str:
+        if formato:
+            return formato
+        extensao = os.path.splitext(caminho)[1].lower()
+        # Diretórios (snapshots particionados) sem extensão são Parquet
+        return EXTENSOES.get(extensao, 'parquet')
+
+    @staticmethod
+    def salvar(df: pd.DataFrame, caminho: str, formato: str = None, particionar_por: list = None,
+               compressao: str = None) -> str:
+        """
+        Grava o DataFrame como snapshot, substituindo um snapshot anterior no mesmo caminho.
+
+        Args:
+            df (pd.DataFrame): Tabela a ser gravada. O índice é descartado.
+            caminho (str): Arquivo (.parquet, .feather) ou diretório, quando particionado.
+            formato (str): 'parquet' ou 'feather'. Por padrão, deduzido da extensão.
+            particionar_por (list): Colunas de partição (diretórios coluna=valor), ex.: ['cluster'].
+            compressao (str): Codec de compressão. Padrão: 'zstd' no Parquet e sem compressão no Feather.
+
+        Returns:
+            str: Caminho gravado.
+        """
+        formato = Snapshot.formato(caminho, formato)
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+
+        if os.path.isdir(caminho):
+            shutil.rmtree(caminho)
+        diretorio = caminho if particionar_por else os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+        if particionar_por:
+            ds.write_dataset(
+                tabela, caminho, format='parquet' if formato == 'parquet' else 'ipc',
+                partitioning=particionar_por, partitioning_flavor='hive', existing_data_behavior='delete_matching',
+                file_options=Snapshot._opcoes_arquivo(formato, compressao)
+            )
+            Snapshot._salvar_esquema(tabela, caminho, particionar_por)
+        elif formato == 'parquet':
+            pq.write_table(tabela, caminho, compression=compressao or 'zstd')
+        else:
+            feather.write_feather(tabela, caminho, compression=compressao or 'uncompressed')
+
+        return caminho
+
+    @staticmethod
+    def _opcoes_arquivo(formato: str, compressao: str = None):
+        if formato == 'parquet':
+            return ds.ParquetFileFormat().make_write_options(compression=compressao or 'zstd')
+        codec = None if compressao in (None, 'uncompressed') else compressao
+        return ds.IpcFileFormat().make_write_options(compression=codec)
+
+    @staticmethod
+    def _salvar_esquema(tabela: pa.Table, caminho: str, particionar_por: list) -> None:
+        """
+        Grava o esquema completo (com os metadados do pandas) e as categorias das colunas de partição.
+
+        Os arquivos de um dataset particionado não têm as colunas de partição: sem este arquivo, a leitura
+        deduz o tipo delas a partir dos nomes dos diretórios e as coloca no fim da tabela.
+        """
+        colunas = {}
+        for coluna in particionar_por:
+            tipo = tabela.schema.field(coluna).type
+            valores = None
+            if pa.types.is_dictionary(tipo):
+                partes = tabela.select([coluna]).unify_dictionaries().column(0).chunks
+                valores = partes[0].dictionary if partes else pa.array([], type=tipo.value_type)
+                valores = pa.ListArray.from_arrays(pa.array([0, len(valores)], type=pa.int32()), valores)
+            colunas[coluna] = valores if valores is not None else pa.nulls(1, type=pa.list_(pa.null()))
+
+        esquema = pa.table(colunas).replace_schema_metadata({b'esquema': tabela.schema.serialize().to_pybytes()})
+        with pa.OSFile(os.path.join(caminho, ARQUIVO_ESQUEMA), 'wb') as destino:
+            with pa.ipc.new_file(destino, esquema.schema) as escritor:
+                escritor.write_table(esquema)
+
+    @staticmethod
+    def _carregar_esquema(caminho: str) -> tuple:
+        """
+        Lê o arquivo de _salvar_esquema.
+
+        Returns:
+            tuple[pyarrow.Schema, pyarrow.dataset.Partitioning]: Esquema completo e o particionamento tipado.
+        """
+        with pa.memory_map(os.path.join(caminho, ARQUIVO_ESQUEMA)) as fonte:
+            particoes = pa.ipc.open_file(fonte).read_all()
+        esquema = pa.ipc.read_schema(pa.py_buffer(particoes.schema.metadata[b'esquema']))
+
+        dicionarios = {
+            coluna: particoes.column(coluna)[0].values
+            for coluna in particoes.column_names if pa.types.is_dictionary(esquema.field(coluna).type)
+        }
+        campos = pa.schema([esquema.field(coluna) for coluna in particoes.column_names])
+        return esquema, ds.partitioning(campos, dictionaries=dicionarios or None, flavor='hive')
+
+    @staticmethod
+    def carregar(caminho: str, colunas: list = None, filtros=None, formato: str = None,
+                 mmap: bool = True) -> pd.DataFrame:
+        """
+        Lê um snapshot, opcionalmente apenas algumas colunas e linhas.
+
+        Args:
+            caminho (str): Arquivo ou diretório do snapshot.
+            colunas (list): Colunas a serem lidas. Por padrão, todas.
+            filtros (list | pyarrow.compute.Expression): Filtro das linhas, no formato do pandas/pyarrow
+                (ex.: [('suicida', '==', 3), ('idade', '>=', 20)]) ou como expressão do pyarrow.
+            formato (str): 'parquet' ou 'feather'. Por padrão, deduzido da extensão.
+            mmap (bool): Se True, abre os arquivos com memory-map.
+
+        Returns:
+            pd.DataFrame: Tabela com os tipos originais.
+        """
+        formato = Snapshot.formato(caminho, formato)
+        if isinstance(filtros, list):
+            filtros = pq.filters_to_expression(filtros)
+
+        # Snapshots particionados voltam com os tipos e a ordem de colunas gravados
+        esquema, particionamento = None, 'hive'
+        if os.path.isfile(os.path.join(caminho, ARQUIVO_ESQUEMA)):
+            esquema, particionamento = Snapshot._carregar_esquema(caminho)
+
+        dataset = ds.dataset(caminho, schema=esquema, format='parquet' if formato == 'parquet' else 'ipc',
+                             partitioning=particionamento, filesystem=fs.LocalFileSystem(use_mmap=mmap))
+        tabela = dataset.to_table(columns=colunas, filter=filtros)
+        return tabela.to_pandas()
+
+    @staticmethod
+    def tipar_csv(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Recupera os tipos que se perdem na exportação para CSV: datas e as colunas Period 'mes'/'semana'.
+
+        Args:
+            df (pd.DataFrame): Tabela lida de um CSV exportado pelos notebooks.
+
+        Returns:
+            pd.DataFrame: O próprio DataFrame, com as colunas convertidas.
+        """
+        for coluna in COLUNAS_DATA:
+            if coluna in df.columns:
+                df[coluna] = pd.to_datetime(df[coluna])
+
+        for coluna, frequencia in COLUNAS_PERIODO.items():
+            if coluna in df.columns and not isinstance(df[coluna].dtype, pd.PeriodDtype):
+                # 'semana' é exportada como '2017-11-06/2017-11-12'; o início identifica o período
+                inicio = df[coluna].astype('string').str.split('/').str[0]
+                df[coluna] = pd.PeriodIndex(pd.to_datetime(inicio), freq=frequencia)
+
+        return df
+
+    @staticmethod
+    def converter_csv(caminho_csv: str, caminho_saida: str, formato: str = None, particionar_por: list = None,
+                      **kwargs_read_csv) -> str:
+        """
+        Converte um CSV exportado pelos notebooks em snapshot, com os tipos recuperados por tipar_csv.
+
+        Args:
+            caminho_csv (str): CSV de origem.
+            caminho_saida (str): Arquivo ou diretório do snapshot.
+            formato (str): 'parquet' ou 'feather'.
+            particionar_por (list): Colunas de partição.
+            **kwargs_read_csv: Argumentos repassados ao pd.read_csv.
+
+        Returns:
+            str: Caminho gravado.
+        """
+        df = Snapshot.tipar_csv(pd.read_csv(caminho_csv, **kwargs_read_csv))
+        return Snapshot.salvar(df, caminho_saida, formato, particionar_por)
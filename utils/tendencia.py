@@ -0,0 +1,584 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import signal
+from scipy.stats import norm
+
+# Colunas do resultado, na ordem dos resultados_mk*.csv
+COLUNAS_RESULTADO = ['id_usuario', 'trend', 'h', 'p-valor', 'z', 'Tau', 'slope']
+
+# Campos do estado de cada usuário em EstadoTendencia
+COLUNAS_ESTADO = ['dias', 'contagens', 'n_dias', 'tendencia', 's', 'termo_empates', 'slope']
+
+
+def filtro_media_movel(periodo: int) -> np.ndarray:
+    """
+    Pesos da média móvel centrada usada pelo seasonal_decompose (model='additive', two_sided=True).
+
+    Args:
+        periodo (int): Período da sazonalidade (30 para posts, 7 para likes).
+
+    Returns:
+        np.ndarray: Pesos do filtro. Em períodos pares as pontas têm meio peso.
+    """
+    if periodo % 2 == 0:
+        return np.array([0.5] + [1] * (periodo - 1) + [0.5]) / periodo
+    return np.repeat(1.0 / periodo, periodo)
+
+
+class TendenciaMannKendall:
+    """
+    Teste de Mann-Kendall da tendência diária de eventos (posts ou likes) de cada usuário.
+
+    Reproduz teste_mk/teste_mk_likes (analise_tendencia.ipynb): eventos por dia (apenas os dias com
+    eventos, como o groupby('data').size()), tendência pela média móvel do seasonal_decompose e o
+    original_test do pymannkendall sobre a tendência. Os resultados são idênticos aos do notebook, mas:
+
+    - os dados são agrupados uma única vez, em vez de um filtro booleano por usuário;
+    - a estatística S e os empates da variância são contados por merge sort, vetorizado sobre um lote de
+      usuários, em vez do laço O(n²) por série do pymannkendall;
+    - a inclinação de Sen é calculada com todos os pares de uma vez;
+    - os lotes de usuários são processados em paralelo.
+    """
+
+    @staticmethod
+    def series_diarias(df: pd.DataFrame, coluna_usuario: str = 'id_usuario',
+                       coluna_data: str = 'data') -> tuple[np.ndarray, list]:
+        """
+        Conta os eventos por dia de cada usuário com um único groupby.
+
+        Args:
+            df (pd.DataFrame): Um evento por linha (df_cluster*_soma, df_likes_cluster*).
+            coluna_usuario (str): Coluna do usuário.
+            coluna_data (str): Coluna do dia do evento.
+
+        Returns:
+            tuple[np.ndarray, list]: Usuários, na ordem de df[coluna_usuario].unique(), e a série de
+                eventos por dia de cada um, em ordem cronológica.
+        """
+        usuarios, limites, _, valores = TendenciaMannKendall._contagens_diarias(df, coluna_usuario, coluna_data)
+        series = [valores[inicio:fim] for inicio, fim in zip(limites[:-1], limites[1:])]
+        return usuarios, series
+
+    @staticmethod
+    def _contagens_diarias(df: pd.DataFrame, coluna_usuario: str = 'id_usuario', coluna_data: str = 'data'
+                           ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # Usuários, limites de cada usuário nos arrays e (dia, eventos) ordenados por usuário e dia
+        codigos, usuarios = pd.factorize(df[coluna_usuario])
+        contagens = df.groupby([codigos, df[coluna_data]]).size()
+
+        codigos_contagens = contagens.index.get_level_values(0).to_numpy()
+        limites = np.searchsorted(codigos_contagens, np.arange(len(usuarios) + 1))
+        dias = contagens.index.get_level_values(1).to_numpy()
+        return np.asarray(usuarios), limites, dias, contagens.to_numpy(dtype=float)
+
+    @staticmethod
+    def tendencia(serie: np.ndarray, periodo: int) -> np.ndarray:
+        """
+        Tendência do seasonal_decompose já sem os NaN das pontas (equivale a resultado.trend.dropna()).
+
+        Args:
+            serie (np.ndarray): Eventos por dia.
+            periodo (int): Período da sazonalidade.
+
+        Returns:
+            np.ndarray: Média móvel centrada.
+        """
+        # Mesma convolução do convolution_filter do statsmodels, para que os valores (e os empates) sejam os mesmos
+        return signal.convolve(serie, filtro_media_movel(periodo), mode='valid')
+
+    @staticmethod
+    def _concatenar(series: list) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        tamanhos = np.array([len(x) for x in series], dtype=np.int64)
+        valores = np.concatenate(series) if series else np.empty(0)
+        grupos = np.repeat(np.arange(len(series)), tamanhos)
+        posicoes = np.arange(len(valores)) - np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+        return valores, grupos, posicoes, tamanhos
+
+    @staticmethod
+    def _postos(valores: np.ndarray, grupos: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Posto denso de (série, valor): valores iguais da mesma série recebem o mesmo posto
+        ordem = np.lexsort((valores, grupos))
+        novo = np.ones(len(valores), dtype=bool)
+        novo[1:] = (grupos[ordem][1:] != grupos[ordem][:-1]) | (valores[ordem][1:] != valores[ordem][:-1])
+        postos = np.empty(len(valores), dtype=np.int64)
+        postos[ordem] = np.cumsum(novo) - 1
+        return postos, novo
+
+    @staticmethod
+    def estatisticas_s(series: list) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Estatística S de Mann-Kendall (soma de sign(x[j] - x[i]) para i < j) e a soma dos termos de empate
+        t(t - 1)(2t + 5) da variância, para um lote de séries de uma vez.
+
+        S é contado como em um merge sort: no nível de largura w, cada par de blocos vizinhos (esquerdo e
+        direito) contribui com os pares (i no esquerdo, j no direito), contados por busca binária nos
+        valores ordenados do bloco esquerdo. Cada par i < j é contado em exatamente um nível, e todos os
+        usuários do lote são processados juntos em cada nível (log n níveis de O(n log n)).
+
+        Args:
+            series (list): Séries sem NaN.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: S e o termo de empates de cada série.
+        """
+        valores, grupos, posicoes, tamanhos = TendenciaMannKendall._concatenar(series)
+        s = np.zeros(len(series))
+        if len(valores) == 0:
+            return s, np.zeros(len(series), dtype=np.int64)
+
+        postos, novo = TendenciaMannKendall._postos(valores, grupos)
+        base = np.int64(postos.max() + 1)
+
+        largura = 1
+        while largura < tamanhos.max():
+            par = grupos * (tamanhos.max() // (2 * largura) + 1) + posicoes // (2 * largura)
+            esquerdo = (posicoes // largura) % 2 == 0
+            chaves_esquerdo = np.sort(par[esquerdo] * base + postos[esquerdo])
+
+            direito = ~esquerdo
+            inicio_par = par[direito] * base
+            chave = inicio_par + postos[direito]
+            menores = np.searchsorted(chaves_esquerdo, chave, 'left') - np.searchsorted(chaves_esquerdo, inicio_par)
+            maiores = (np.searchsorted(chaves_esquerdo, inicio_par + base)
+                       - np.searchsorted(chaves_esquerdo, chave, 'right'))
+            s += np.bincount(grupos[direito], weights=menores - maiores, minlength=len(series))
+            largura *= 2
+
+        # Tamanho de cada grupo de valores iguais, a partir das sequências de postos iguais
+        inicio_grupos = np.flatnonzero(novo)
+        empates = np.diff(np.append(inicio_grupos, len(valores)))
+        termo_empates = np.bincount(grupos[inicio_grupos], weights=empates * (empates - 1) * (2 * empates + 5),
+                                    minlength=len(series)).astype(np.int64)
+        return s, termo_empates
+
+    @staticmethod
+    def inclinacao_sen(x: np.ndarray) -> float:
+        """
+        Inclinação de Theil-Sen: mediana de (x[j] - x[i]) / (j - i) sobre todos os pares i < j.
+
+        Args:
+            x (np.ndarray): Série sem NaN.
+
+        Returns:
+            float: Inclinação.
+        """
+        i, j = np.triu_indices(len(x), k=1)
+        return np.nanmedian((x[j] - x[i]) / (j - i))
+
+    @staticmethod
+    def testar_series(series: list, alpha: float = 0.05) -> pd.DataFrame:
+        """
+        Teste de Mann-Kendall original de um lote de séries, com os mesmos valores do
+        pymannkendall.original_test.
+
+        Args:
+            series (list): Séries (tendências) sem NaN, com pelo menos um valor.
+            alpha (float): Nível de significância.
+
+        Returns:
+            pd.DataFrame: Uma linha por série, com trend, h, p-valor, z, Tau, slope, s e var_s.
+        """
+        n = np.array([len(x) for x in series], dtype=np.int64)
+        s, termo_empates = TendenciaMannKendall.estatisticas_s(series)
+        inclinacoes = [TendenciaMannKendall.inclinacao_sen(x) for x in series]
+        return TendenciaMannKendall.resultados(n, s, termo_empates, inclinacoes, alpha)
+
+    @staticmethod
+    def resultados(n: np.ndarray, s: np.ndarray, termo_empates: np.ndarray, inclinacoes, alpha: float = 0.05
+                   ) -> pd.DataFrame:
+        """
+        Completa o teste de Mann-Kendall (variância, z, p-valor, h, trend e Tau) a partir de S e dos empates.
+
+        Args:
+            n (np.ndarray): Tamanho de cada série.
+            s (np.ndarray): Estatística S de cada série.
+            termo_empates (np.ndarray): Soma de t(t - 1)(2t + 5) sobre os grupos de valores iguais.
+            inclinacoes: Inclinação de Sen de cada série.
+            alpha (float): Nível de significância.
+
+        Returns:
+            pd.DataFrame: Uma linha por série, com trend, h, p-valor, z, Tau, slope, s e var_s.
+        """
+        n = np.asarray(n, dtype=np.int64)
+        s = np.asarray(s, dtype=float)
+        # Termos inteiros exatos, divididos uma única vez, como no pymannkendall
+        var_s = (n * (n - 1) * (2 * n + 5) - np.asarray(termo_empates, dtype=np.int64)) / 18
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(s > 0, (s - 1) / np.sqrt(var_s), np.where(s < 0, (s + 1) / np.sqrt(var_s), 0.0))
+            tau = s / (.5 * n * (n - 1))
+
+        p = 2 * (1 - norm.cdf(np.abs(z)))
+        h = np.abs(z) > norm.ppf(1 - alpha / 2)
+        trend = np.where(h & (z < 0), 'decreasing', np.where(h & (z > 0), 'increasing', 'no trend'))
+
+        return pd.DataFrame({
+            'trend': trend.astype(object),
+            'h': h,
+            'p-valor': p,
+            'z': z,
+            'Tau': tau,
+            'slope': np.asarray(inclinacoes, dtype=float),
+            's': s,
+            'var_s': var_s,
+        })
+
+    @staticmethod
+    def testar(x: np.ndarray, alpha: float = 0.05) -> dict:
+        """
+        Teste de Mann-Kendall original de uma única série.
+
+        Args:
+            x (np.ndarray): Série (tendência) sem NaN.
+            alpha (float): Nível de significância.
+
+        Returns:
+            dict: trend, h, p-valor, z, Tau, slope, s e var_s.
+        """
+        return TendenciaMannKendall.testar_series([np.asarray(x, dtype=float)], alpha).iloc[0].to_dict()
+
+    @staticmethod
+    def testar_usuarios(df: pd.DataFrame, periodo: int, alpha: float = 0.05, n_processos: int = None,
+                        tamanho_lote: int = 64, verbose: bool = True) -> pd.DataFrame:
+        """
+        Executa o teste de Mann-Kendall da tendência de cada usuário (substitui teste_mk e teste_mk_likes).
+
+        Args:
+            df (pd.DataFrame): Um evento por linha, com as colunas 'id_usuario' e 'data'.
+            periodo (int): Período da sazonalidade (30 para posts, 7 para likes). Usuários com menos de
+                2 * periodo dias com eventos são ignorados, como no notebook.
+            alpha (float): Nível de significância.
+            n_processos (int): Processos do pool. None usa os.cpu_count(); 1 roda no processo atual.
+            tamanho_lote (int): Usuários enviados a cada tarefa do pool.
+            verbose (bool): Se True, informa os usuários ignorados e a contagem de tendências.
+
+        Returns:
+            pd.DataFrame: Colunas de COLUNAS_RESULTADO, na ordem dos usuários em df.
+        """
+        usuarios, series = TendenciaMannKendall.series_diarias(df)
+        return TendenciaMannKendall.testar_series_usuarios(usuarios, series, periodo, alpha, n_processos,
+                                                           tamanho_lote, verbose)
+
+    @staticmethod
+    def testar_series_usuarios(usuarios, series: list, periodo: int, alpha: float = 0.05, n_processos: int = None,
+                               tamanho_lote: int = 64, verbose: bool = True) -> pd.DataFrame:
+        """
+        Como testar_usuarios, mas a partir das séries de eventos por dia já calculadas (ex.:
+        CuboAtividade.series_diarias).
+
+        Args:
+            usuarios: id_usuario de cada série.
+            series (list): Eventos por dia de cada usuário, apenas nos dias com eventos, em ordem cronológica.
+            periodo, alpha, n_processos, tamanho_lote, verbose: Ver testar_usuarios.
+
+        Returns:
+            pd.DataFrame: Colunas de COLUNAS_RESULTADO, na ordem de usuarios.
+        """
+        minimo = 2 * periodo
+
+        selecionados = []
+        for usuario, serie in zip(usuarios, series):
+            if len(serie) >= minimo:
+                selecionados.append((usuario, serie))
+            elif verbose:
+                print(f"Usuário {usuario} não tem observações suficientes para decomposição. "
+                      f"Necessário: {minimo}, disponível: {len(serie)}")
+
+        lotes = [selecionados[inicio:inicio + tamanho_lote] for inicio in range(0, len(selecionados), tamanho_lote)]
+        n_processos = n_processos or os.cpu_count() or 1
+        if n_processos == 1 or len(lotes) <= 1:
+            resultados = [_testar_lote(lote, periodo, alpha) for lote in lotes]
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_processos, len(lotes))) as executor:
+                resultados = list(executor.map(_testar_lote, lotes, [periodo] * len(lotes), [alpha] * len(lotes)))
+
+        if not resultados:
+            if verbose:
+                print("Nenhum dado disponível para análise.")
+            return pd.DataFrame(columns=COLUNAS_RESULTADO)
+
+        df_resultados = pd.concat(resultados, ignore_index=True)
+        if verbose:
+            contagem_tendencias = df_resultados['trend'].value_counts()
+            print(contagem_tendencias)
+            print(contagem_tendencias / df_resultados.shape[0] * 100)
+        return df_resultados
+
+
+class EstadoTendencia:
+    """
+    Estado persistente do teste de Mann-Kendall por usuário, atualizado a cada novo dia de eventos.
+
+    Para cada usuário são guardados a tendência (média móvel) já calculada, a estatística S, o termo de
+    empates da variância, a inclinação de Sen e a janela final de dias necessária para recalcular as
+    médias móveis que um novo evento altera. Um novo dia (ou novos eventos nos últimos dias) remove de
+    S e dos empates apenas as médias móveis afetadas e inclui as novas, em O(janela * n), em vez de
+    decompor a série e refazer o teste. Usuários sem eventos novos não são tocados.
+
+    Os resultados são os mesmos de TendenciaMannKendall.testar_usuarios sobre o histórico completo.
+
+    Atributos:
+        periodo (int): Período da sazonalidade (30 para posts, 7 para likes).
+        alpha (float): Nível de significância.
+        usuarios (dict): id_usuario -> estado do usuário (dias, contagens, n_dias, tendencia, s,
+            termo_empates, slope).
+    """
+
+    def __init__(self, periodo: int, alpha: float = 0.05):
+        self.periodo = periodo
+        self.alpha = alpha
+        self.filtro = filtro_media_movel(periodo)
+        # Dias guardados: os que um evento novo pode alterar (os últimos len(filtro)) e os anteriores
+        # que entram nas mesmas médias móveis
+        self.janela = 2 * len(self.filtro) - 1
+        self.usuarios = {}
+
+    @staticmethod
+    def construir(df: pd.DataFrame, periodo: int, alpha: float = 0.05) -> 'EstadoTendencia':
+        """
+        Cria o estado a partir do histórico completo de eventos.
+
+        Args:
+            df (pd.DataFrame): Um evento por linha, com as colunas 'id_usuario' e 'data'.
+            periodo (int): Período da sazonalidade.
+            alpha (float): Nível de significância.
+
+        Returns:
+            EstadoTendencia: Estado de todos os usuários de df.
+        """
+        estado = EstadoTendencia(periodo, alpha)
+        estado._construir_usuarios(df)
+        return estado
+
+    def _construir_usuarios(self, df: pd.DataFrame) -> None:
+        usuarios, limites, dias, valores = TendenciaMannKendall._contagens_diarias(df)
+        tendencias = []
+        for inicio, fim in zip(limites[:-1], limites[1:]):
+            serie = valores[inicio:fim]
+            tendencias.append(TendenciaMannKendall.tendencia(serie, self.periodo) if len(serie) >= len(self.filtro)
+                              else np.empty(0))
+
+        s, termo_empates = TendenciaMannKendall.estatisticas_s(tendencias)
+        for indice, (usuario, inicio, fim) in enumerate(zip(usuarios, limites[:-1], limites[1:])):
+            inicio_janela = max(inicio, fim - self.janela)
+            self.usuarios[usuario] = {
+                'dias': dias[inicio_janela:fim],
+                'contagens': valores[inicio_janela:fim],
+                'n_dias': int(fim - inicio),
+                'tendencia': tendencias[indice],
+                's': float(s[indice]),
+                'termo_empates': int(termo_empates[indice]),
+                'slope': None,
+            }
+
+    @staticmethod
+    def _contribuicao(x: np.ndarray, inicio: int) -> tuple[float, int]:
+        """
+        Parcela de S e do termo de empates devida aos valores x[inicio:], incluídos em ordem depois de x[:inicio].
+        """
+        if inicio >= len(x):
+            return 0.0, 0
+        sufixo = x[inicio:, None]
+        indices = np.arange(len(x))[None, :]
+        posicoes = np.arange(inicio, len(x))[:, None]
+        s = np.sum(np.sign(sufixo - x[None, :]) * (indices < posicoes))
+
+        # Cada valor incluído aumenta o seu grupo de empates de c - 1 para c
+        c = np.sum((sufixo == x[None, :]) & (indices <= posicoes), axis=1).astype(np.int64)
+        termo = np.sum(c * (c - 1) * (2 * c + 5) - (c - 1) * (c - 2) * (2 * c + 3))
+        return float(s), int(termo)
+
+    def _atualizar_usuario(self, estado: dict, dias_novos: np.ndarray, contagens_novas: np.ndarray) -> dict | None:
+        """
+        Novo estado do usuário com os eventos incluídos, sem alterar o estado atual.
+
+        Returns:
+            dict | None: Estado atualizado, ou None se os eventos alteram dias fora da janela guardada.
+        """
+        dias_janela, contagens_janela = estado['dias'], estado['contagens']
+        deslocamento = estado['n_dias'] - len(dias_janela)
+
+        dias = np.union1d(dias_janela, dias_novos)
+        contagens = np.zeros(len(dias))
+        contagens[np.searchsorted(dias, dias_janela)] += contagens_janela
+        posicoes_novas = np.searchsorted(dias, dias_novos)
+        np.add.at(contagens, posicoes_novas, contagens_novas)
+
+        # Primeiro dia alterado e primeira média móvel que o contém
+        primeiro_dia = deslocamento + posicoes_novas.min()
+        primeira_media = max(0, primeiro_dia - len(self.filtro) + 1)
+        if deslocamento > primeira_media:
+            # Os eventos alteram médias que dependem de dias fora da janela guardada
+            return None
+
+        n_dias = deslocamento + len(dias)
+        antiga = estado['tendencia']
+        cauda = contagens[primeira_media - deslocamento:]
+        nova = np.concatenate([antiga[:primeira_media], TendenciaMannKendall.tendencia(cauda, self.periodo)
+                               if len(cauda) >= len(self.filtro) else np.empty(0)])
+
+        s_antigo, termo_antigo = EstadoTendencia._contribuicao(antiga, primeira_media)
+        s_novo, termo_novo = EstadoTendencia._contribuicao(nova, primeira_media)
+        return {
+            'dias': dias[-self.janela:],
+            'contagens': contagens[-self.janela:],
+            'n_dias': int(n_dias),
+            'tendencia': nova,
+            's': estado['s'] - s_antigo + s_novo,
+            'termo_empates': estado['termo_empates'] - termo_antigo + termo_novo,
+            'slope': None,
+        }
+
+    def atualizar(self, df_novos: pd.DataFrame, df_historico: pd.DataFrame = None) -> list:
+        """
+        Inclui eventos novos no estado, atualizando apenas os usuários que os têm.
+
+        Eventos em dias recentes (os últimos len(filtro) dias do usuário) ou em dias novos são incluídos de
+        forma incremental. Eventos mais antigos exigem a reconstrução do usuário a partir de df_historico.
+
+        Args:
+            df_novos (pd.DataFrame): Eventos novos, com as colunas 'id_usuario' e 'data'.
+            df_historico (pd.DataFrame): Histórico completo (já com os eventos novos), usado apenas para os
+                usuários que não podem ser atualizados de forma incremental.
+
+        Returns:
+            list: Usuários atualizados.
+
+        Raises:
+            ValueError: Se algum usuário precisar ser reconstruído e df_historico não for informado.
+        """
+        usuarios, limites, dias, valores = TendenciaMannKendall._contagens_diarias(df_novos)
+        novos, reconstruir, atualizados = [], [], {}
+        for usuario, inicio, fim in zip(usuarios, limites[:-1], limites[1:]):
+            estado = self.usuarios.get(usuario)
+            if estado is None:
+                novos.append(usuario)
+                continue
+            atualizado = self._atualizar_usuario(estado, dias[inicio:fim], valores[inicio:fim])
+            if atualizado is None:
+                reconstruir.append(usuario)
+            else:
+                atualizados[usuario] = atualizado
+
+        # Verificado antes de qualquer alteração: se falhar, o estado fica como estava e a chamada pode ser repetida
+        if reconstruir and df_historico is None:
+            raise ValueError(f'Eventos anteriores à janela guardada para {len(reconstruir)} usuário(s) '
+                             f'(ex.: {reconstruir[:10]}): informe df_historico para reconstruí-los.')
+
+        self.usuarios.update(atualizados)
+        # Usuários novos: sem df_historico, os eventos novos são todo o histórico deles
+        origem = df_novos if df_historico is None else df_historico
+        if novos:
+            self._construir_usuarios(origem[origem['id_usuario'].isin(novos)])
+        if reconstruir:
+            self._construir_usuarios(df_historico[df_historico['id_usuario'].isin(reconstruir)])
+
+        return list(usuarios)
+
+    def resultados(self) -> pd.DataFrame:
+        """
+        Resultado do teste de Mann-Kendall dos usuários com pelo menos 2 * periodo dias com eventos.
+
+        Returns:
+            pd.DataFrame: Colunas de COLUNAS_RESULTADO, no formato de resultados_mk*.csv.
+        """
+        minimo = 2 * self.periodo
+        selecionados = [(usuario, estado) for usuario, estado in self.usuarios.items() if estado['n_dias'] >= minimo]
+        for _, estado in selecionados:
+            # A inclinação de Sen é recalculada apenas para os usuários alterados
+            if estado['slope'] is None:
+                estado['slope'] = TendenciaMannKendall.inclinacao_sen(estado['tendencia'])
+
+        resultado = TendenciaMannKendall.resultados(
+            [len(estado['tendencia']) for _, estado in selecionados],
+            [estado['s'] for _, estado in selecionados],
+            [estado['termo_empates'] for _, estado in selecionados],
+            [estado['slope'] for _, estado in selecionados],
+            self.alpha,
+        )
+        resultado.insert(0, 'id_usuario', [usuario for usuario, _ in selecionados])
+        return resultado[COLUNAS_RESULTADO]
+
+    def listas_tendencia(self, df_agrupado: pd.DataFrame, diretorio: str = None) -> dict:
+        """
+        Separa os usuários por tendência, como df_crescente, df_decrescente e df_nao_tendencia do notebook.
+
+        Args:
+            df_agrupado (pd.DataFrame): Tabela por usuário (df_agrupado_soma).
+            diretorio (str): Se informado, grava df_crescente.csv, df_decrescente.csv e df_nao_tendencia.csv.
+
+        Returns:
+            dict: Nome da lista -> linhas de df_agrupado dos usuários com aquela tendência.
+        """
+        resultados = self.resultados()
+        listas = {}
+        for nome, trend in (('df_decrescente', 'decreasing'), ('df_crescente', 'increasing'),
+                            ('df_nao_tendencia', 'no trend')):
+            listas[nome] = df_agrupado[df_agrupado['id_usuario'].isin(
+                resultados[resultados['trend'] == trend]['id_usuario'])]
+            if diretorio is not None:
+                listas[nome].to_csv(os.path.join(diretorio, f'{nome}.csv'), index=False)
+        return listas
+
+    def salvar(self, caminho: str) -> str:
+        """
+        Grava o estado como snapshot Parquet (uma linha por usuário).
+
+        Args:
+            caminho (str): Arquivo .parquet.
+
+        Returns:
+            str: Caminho gravado.
+        """
+        # Importado aqui para que o cálculo da tendência não dependa do pyarrow
+        from utils.snapshot import Snapshot
+
+        df = pd.DataFrame([{'id_usuario': usuario, **estado} for usuario, estado in self.usuarios.items()],
+                          columns=['id_usuario', *COLUNAS_ESTADO])
+        df['periodo'] = self.periodo
+        df['alpha'] = self.alpha
+        return Snapshot.salvar(df, caminho)
+
+    @staticmethod
+    def carregar(caminho: str) -> 'EstadoTendencia':
+        """
+        Lê um estado gravado por salvar.
+
+        Args:
+            caminho (str): Arquivo .parquet.
+
+        Returns:
+            EstadoTendencia: Estado restaurado.
+        """
+        from utils.snapshot import Snapshot
+
+        df = Snapshot.carregar(caminho)
+        estado = EstadoTendencia(int(df['periodo'].iloc[0]), float(df['alpha'].iloc[0]))
+        for linha in df.itertuples(index=False):
+            estado.usuarios[linha.id_usuario] = {
+                'dias': np.asarray(linha.dias, dtype='datetime64[ns]'),
+                'contagens': np.asarray(linha.contagens, dtype=float),
+                'n_dias': int(linha.n_dias),
+                'tendencia': np.asarray(linha.tendencia, dtype=float),
+                's': float(linha.s),
+                'termo_empates': int(linha.termo_empates),
+                'slope': None if pd.isna(linha.slope) else float(linha.slope),
+            }
+        return estado
+
+
+def _testar_lote(lote: list, periodo: int, alpha: float) -> pd.DataFrame:
+    # Função de módulo para poder ser enviada aos processos do pool
+    usuarios, tendencias = [], []
+    for usuario, serie in lote:
+        tendencia = TendenciaMannKendall.tendencia(serie, periodo)
+        if len(tendencia) > 0:
+            usuarios.append(usuario)
+            tendencias.append(tendencia)
+
+    resultado = TendenciaMannKendall.testar_series(tendencias, alpha)
+    resultado.insert(0, 'id_usuario', usuarios)
+    return resultado[COLUNAS_RESULTADO]
@@ -3,42 +3,202 @@ from nltk.corpus import wordnet
 from nltk.stem.wordnet import WordNetLemmatizer
 from nltk.tokenize import word_tokenize
 import re
-import string
 import unidecode
-from wordcloud import STOPWORDS
-import spacy
-from spacy.cli import download as spacy_download
-from spacy.util import is_package
-from spacy.lang.pt.stop_words import STOP_WORDS
-import stanza
 import os
-import emoji
+import json
+import hashlib
+from itertools import islice
+import multiprocessing
+from importlib import metadata
+
+# spaCy, Stanza (PyTorch) e wordcloud são importados sob demanda: importá-los aqui custaria
+# segundos e centenas de MB a cada processo, mesmo para quem só usa remove_caracteres
+
+from utils.cache_lematizacao import CacheLematizacao
+from utils.indice_stopwords import IndiceStopwords
+from utils.limpador_texto import LimpadorTexto
+
+
+_tratamento_worker = None
+
+
+def _recursos_nltk_lematizacao(versao_nltk: str) -> dict:
+    """
+    Recursos que word_tokenize, pos_tag e o WordNetLemmatizer carregam na versão informada do NLTK.
+
+    Desde o 3.8.2 o word_tokenize lê as tabelas 'punkt_tab' (e não o pickle 'punkt'), e desde o 3.9 o
+    pos_tag lê 'averaged_perceptron_tagger_eng'.
+    """
+    versao = tuple(int(parte) for parte in re.findall(r'\d+', versao_nltk)[:3])
+    recursos = {}
+    if versao >= (3, 8, 2):
+        recursos['punkt_tab'] = 'tokenizers/punkt_tab/english/'
+    else:
+        recursos['punkt'] = 'tokenizers/punkt'
+    recursos['wordnet'] = 'corpora/wordnet'
+    recursos['omw-1.4'] = 'corpora/omw-1.4'
+    if versao >= (3, 9):
+        recursos['averaged_perceptron_tagger_eng'] = 'taggers/averaged_perceptron_tagger_eng/'
+    else:
+        recursos['averaged_perceptron_tagger'] = 'taggers/averaged_perceptron_tagger'
+    return recursos
+
+
+def _inicializar_worker(caminho_cache_lematizacao, op_lemmatizer, offline):
+    # Cada processo filho carrega os modelos uma única vez
+    global _tratamento_worker
+    _tratamento_worker = TextTreatment(caminho_cache_lematizacao, op_lemmatizer=op_lemmatizer, offline=offline,
+                                       precarregar=True)
+
+
+def _processar_lote_worker(argumentos) -> list:
+    lote, op_lemmatizer, batch_size = argumentos
+    resultado = _tratamento_worker.preprocessamento_lote(lote, op_lemmatizer, batch_size)
+    # O Pool encerra os processos sem finalizar os objetos, então o cache é gravado a cada lote
+    if _tratamento_worker.cache_lematizacao is not None:
+        _tratamento_worker.cache_lematizacao.gravar()
+    return resultado
 
 
 class TextTreatment:
-    def __init__(self):
+    # Componentes do spaCy que não participam da lematização
+    COMPONENTES_SPACY_DESNECESSARIOS = ('parser', 'ner')
+
+    BASE_PATH_STOPWORDS = 'dados/datasets/'
+    ARQUIVOS_STOPWORDS = ['stopwords-pt.txt', 'girias.txt', 'nomes.txt']
+    CAMINHO_CACHE_STOPWORDS = 'dados/cache/indice_stopwords.pkl'
+    CAMINHO_CACHE_LEMATIZACAO = 'dados/cache/lematizacao.sqlite'
+    DIRETORIO_STANZA = os.path.expanduser('~/stanza_resources')
+
+    # Recursos do NLTK e o caminho de cada um dentro de nltk.data
+    RECURSOS_NLTK_STOPWORDS = {'stopwords': 'corpora/stopwords'}
+    RECURSOS_NLTK_LEMATIZACAO = _recursos_nltk_lematizacao(nltk.__version__)
+
+    def __init__(self, caminho_cache_lematizacao: str | None = CAMINHO_CACHE_LEMATIZACAO, op_lemmatizer=None,
+                 offline: bool = False, precarregar: bool = False):
         """Constructor
+
+        Os modelos e as stopwords são carregados sob demanda, no primeiro uso, e somente o backend de
+        lematização efetivamente usado é carregado.
+
+        Args:
+            caminho_cache_lematizacao (str | None): Arquivo do cache persistente de lematização. None desativa o cache.
+            op_lemmatizer (int | None): Backend de lematização carregado quando precarregar=True
+                (None: spaCy, 1: NLTK, 2: Stanza).
+            offline (bool): Se True, nunca acessa a rede; recursos ausentes geram erro em vez de download.
+            precarregar (bool): Se True, carrega já na construção as stopwords e o backend de op_lemmatizer.
+        """
+        self.offline = offline
+        self.op_lemmatizer = op_lemmatizer
+
+        self._nlp_spacy = None
+        self._nlp_stanza = None
+        self._nlp_wl = None
+        self._lista_stopwords = None
+
+        # Cache de textos já lematizados, compartilhado entre execuções
+        self.caminho_cache_lematizacao = caminho_cache_lematizacao
+        self.cache_lematizacao = CacheLematizacao(caminho_cache_lematizacao) if caminho_cache_lematizacao else None
+        self._versoes_lematizador = {}
+
+        if precarregar:
+            _ = self.lista_stopwords
+            self.carregar_lematizador(op_lemmatizer)
+
+    @staticmethod
+    def _recurso_indisponivel(recurso: str):
+        print(f"Erro: recurso '{recurso}' não encontrado e o modo offline está ativo.")
+        return RuntimeError(f"Recurso '{recurso}' indisponível no modo offline")
+
+    @staticmethod
+    def garantir_recursos_nltk(recursos: dict, offline: bool = False) -> None:
         """
-        nltk.download('stopwords', quiet=True)
-        nltk.download('punkt', quiet=True)
-        nltk.download('wordnet', quiet=True)
-        nltk.download('omw-1.4', quiet=True)
-        nltk.download('averaged_perceptron_tagger', quiet=True)
-        if not os.path.exists(os.path.expanduser('~/stanza_resources/pt')):
-            stanza.download('pt', verbose=False)
-        if not is_package("pt_core_news_sm"):
-            spacy_download("pt_core_news_sm")
-
-        # Carregar modelos uma vez durante a inicialização
-        self.nlp_spacy = spacy.load("pt_core_news_sm")
-        self.nlp_stanza = stanza.Pipeline('pt', processors='tokenize,mwt,pos,lemma', use_gpu=False, verbose=False)
-        self.nlp_wl = WordNetLemmatizer()
-
-        # Carregar stopwords uma vez
-        self.lista_stopwords = self.get_stopwords()
+        Baixa os recursos do NLTK que ainda não existem localmente.
+
+        Args:
+            recursos (dict): Mapeamento nome do recurso -> caminho dentro de nltk.data.
+            offline (bool): Se True, gera erro em vez de baixar recursos ausentes.
+        """
+        for recurso, caminho in recursos.items():
+            try:
+                nltk.data.find(caminho)
+            except LookupError:
+                if offline:
+                    raise TextTreatment._recurso_indisponivel(recurso)
+                nltk.download(recurso, quiet=True)
+
+    @property
+    def nlp_spacy(self):
+        if self._nlp_spacy is None:
+            import spacy
+            from spacy.util import is_package
+
+            if not is_package("pt_core_news_sm"):
+                if self.offline:
+                    raise TextTreatment._recurso_indisponivel('pt_core_news_sm')
+                from spacy.cli import download as spacy_download
+                spacy_download("pt_core_news_sm")
+
+            self._nlp_spacy = spacy.load("pt_core_news_sm")
+        return self._nlp_spacy
+
+    @property
+    def nlp_stanza(self):
+        if self._nlp_stanza is None:
+            import stanza
+
+            if not os.path.exists(os.path.join(TextTreatment.DIRETORIO_STANZA, 'pt')):
+                if self.offline:
+                    raise TextTreatment._recurso_indisponivel('stanza pt')
+                stanza.download('pt', verbose=False)
+
+            opcoes = {'download_method': None} if self.offline else {}
+            self._nlp_stanza = stanza.Pipeline('pt', processors='tokenize,mwt,pos,lemma', use_gpu=False,
+                                               verbose=False, **opcoes)
+        return self._nlp_stanza
+
+    @property
+    def nlp_wl(self):
+        if self._nlp_wl is None:
+            TextTreatment.garantir_recursos_nltk(TextTreatment.RECURSOS_NLTK_LEMATIZACAO, self.offline)
+            self._nlp_wl = WordNetLemmatizer()
+        return self._nlp_wl
+
+    @property
+    def lista_stopwords(self) -> IndiceStopwords:
+        # Índice de stopwords serializado em disco entre execuções
+        if self._lista_stopwords is None:
+            self._lista_stopwords = TextTreatment.get_indice_stopwords(self.offline)
+        return self._lista_stopwords
+
+    def carregar_lematizador(self, op_lemmatizer=None) -> None:
+        if op_lemmatizer is None:
+            _ = self.nlp_spacy
+        elif op_lemmatizer == 1:
+            _ = self.nlp_wl
+        elif op_lemmatizer == 2:
+            _ = self.nlp_stanza
+        else:
+            print("Erro: Opção inválida para lematização.")
+            raise ValueError("Opção de lematização inválida")
+
+    @staticmethod
+    def get_indice_stopwords(offline: bool = False) -> IndiceStopwords:
+        arquivos = [os.path.join(TextTreatment.BASE_PATH_STOPWORDS, nome_arquivo)
+                    for nome_arquivo in TextTreatment.ARQUIVOS_STOPWORDS]
+        return IndiceStopwords.carregar_ou_construir(TextTreatment.CAMINHO_CACHE_STOPWORDS,
+                                                    lambda: TextTreatment.construir_stopwords(offline), arquivos)
+
+    @staticmethod
+    def get_stopwords(offline: bool = False) -> list:
+        return sorted(TextTreatment.get_indice_stopwords(offline))
 
     @staticmethod
-    def get_stopwords() -> list:
+    def construir_stopwords(offline: bool = False) -> list:
+        from wordcloud import STOPWORDS
+        from spacy.lang.pt.stop_words import STOP_WORDS
+
+        TextTreatment.garantir_recursos_nltk(TextTreatment.RECURSOS_NLTK_STOPWORDS, offline)
         stopwords_total = []
 
         # Stopwords em português
@@ -59,10 +219,8 @@ class TextTreatment:
         stopwords_total.extend(stopwords_spacy)
 
         # Adicionar stopwords de arquivos customizados
-        base_path = 'dados/datasets/'
-        arquivos_stopwords = ['stopwords-pt.txt', 'girias.txt', 'nomes.txt']
-        for nome_arquivo in arquivos_stopwords:
-            caminho_arquivo = os.path.join(base_path, nome_arquivo)
+        for nome_arquivo in TextTreatment.ARQUIVOS_STOPWORDS:
+            caminho_arquivo = os.path.join(TextTreatment.BASE_PATH_STOPWORDS, nome_arquivo)
             if os.path.exists(caminho_arquivo):
                 with open(caminho_arquivo, 'r', encoding='utf-8') as arquivo:
                     palavras_customizadas = [unidecode.unidecode(palavra.lower().strip()) for palavra in arquivo if
@@ -82,67 +240,21 @@ class TextTreatment:
 
     @staticmethod
     def remocao_stopword(texto, lista_stopwords) -> str:
+        if isinstance(lista_stopwords, IndiceStopwords):
+            return lista_stopwords.filtrar(texto)
+
         return ' '.join([palavra for palavra in texto.split() if
                          unidecode.unidecode(palavra.lower().strip()) not in lista_stopwords])
 
     @staticmethod
     def remove_caracteres(texto) -> str:
-        # Converter para minúsculas e remover espaços em branco no início e fim
-        texto = texto.lower().strip()
-
-        # Remover tags HTML
-        texto = re.sub(r'<.*?>', '', texto)
-
-        # Remover pontuação
-        texto = re.sub(r'[%s]' % re.escape(string.punctuation), ' ', texto)
-
-        # Remover múltiplos espaços em branco
-        texto = re.sub(r'\s+', ' ', texto)
-
-        # Remover referências numéricas em colchetes [123]
-        texto = re.sub(r'\[[0-9]*]', ' ', texto)
-
-        # Remover caracteres que não são letras ou espaços
-        texto = re.sub(r'[^\w\s]', '', texto)
-
-        # Remover números
-        texto = re.sub(r'\d', ' ', texto)
-
-        # Remover símbolo de dólar
-        texto = re.sub(r"\$", "", texto)
-
-        # Remover URLs
-        texto = re.sub(r"https?://\S+", '', texto)
-
-        # Remover hashtags
-        texto = re.sub(r"#", "", texto)
-
-        # Remover trechos com "<a href"
-        texto = re.sub(r'<a href.*?>', ' ', texto)
+        # Limpeza com padrões pré-compilados; ver LimpadorTexto para a equivalência com as etapas originais
+        return LimpadorTexto.limpar(texto)
 
-        # Remover entidades HTML como &amp;
-        texto = re.sub(r'&amp;', '', texto)
-
-        # Remover caracteres especiais adicionais
-        texto = re.sub(r'[_"\-;%()|+&=*.,!?:#$@\[\]/]', ' ', texto)
-
-        # Remover quebras de linha no formato HTML
-        texto = re.sub(r'<br />', ' ', texto)
-
-        # Remover caracteres que não são letras (em português)
-        texto = re.sub(r'[^a-zà-ù ]', ' ', texto)
-
-        # Remover repetições de 'k' ou 'j' (ex.: "kkkk", "jjjj")
-        texto = re.sub(r'k{2,}', '', texto, flags=re.IGNORECASE)
-        texto = re.sub(r'j{2,}', '', texto, flags=re.IGNORECASE)
-        texto = re.sub(r'(ks){2,}', '', texto, flags=re.IGNORECASE)
-        texto = re.sub(r'(ha){2,}', '', texto, flags=re.IGNORECASE)
-        texto = re.sub(r'a{2,}', '', texto, flags=re.IGNORECASE)
-
-        # Remover emojis
-        texto = emoji.replace_emoji(texto, replace='')
-
-        return texto
+    @staticmethod
+    def remove_caracteres_serie(serie):
+        # Versão vetorizada de remove_caracteres para uma Series de textos
+        return LimpadorTexto.limpar_serie(serie)
 
     @staticmethod
     def obter_pos_tag(token) -> str:
@@ -164,10 +276,12 @@ class TextTreatment:
             return " ".join([token.lemma_ for token in doc])
 
         elif op_lemmatizer == 1:
+            # Acessar o lematizador primeiro garante os recursos do NLTK usados pelo tokenizador e pelo POS tagger
+            lematizador = self.nlp_wl
             token = word_tokenize(texto)
             word_pos_tags = nltk.pos_tag(token)
             return " ".join(
-                [self.nlp_wl.lemmatize(tag[0], TextTreatment.obter_pos_tag(tag[1])) for tag in word_pos_tags])
+                [lematizador.lemmatize(tag[0], TextTreatment.obter_pos_tag(tag[1])) for tag in word_pos_tags])
 
         elif op_lemmatizer == 2:
             # Usar Stanza para lematização
@@ -178,9 +292,149 @@ class TextTreatment:
             print("Erro: Opção inválida para lematização.")
             raise ValueError("Opção de lematização inválida")
 
-    def preprocessamento_texto(self, texto, op_lemmatizer=None) -> str:
+    def limpeza_texto(self, texto) -> str:
         texto = TextTreatment.remove_caracteres(texto)
         texto = unidecode.unidecode(texto)
         texto = TextTreatment.remocao_stopword(texto, self.lista_stopwords)
-        texto = self.lematizacao(texto, op_lemmatizer)
-        return texto
\ No newline at end of file
+        return texto
+
+    def versao_lematizador(self, op_lemmatizer=None) -> str:
+        # Versão do modelo usada na chave do cache: trocar de modelo invalida as entradas antigas
+        if op_lemmatizer not in self._versoes_lematizador:
+            if op_lemmatizer is None:
+                versao = f'spacy-{metadata.version("spacy")}/pt_core_news_sm-{metadata.version("pt_core_news_sm")}'
+            elif op_lemmatizer == 1:
+                versao = f'nltk-{nltk.__version__}'
+            else:
+                versao = f'stanza-{metadata.version("stanza")}/pt-{self._versao_modelos_stanza()}'
+            self._versoes_lematizador[op_lemmatizer] = versao
+        return self._versoes_lematizador[op_lemmatizer]
+
+    def _versao_modelos_stanza(self) -> str:
+        # O resources.json traz o md5 de cada modelo do português: baixar outra versão dos modelos muda o hash
+        caminho = os.path.join(TextTreatment.DIRETORIO_STANZA, 'resources.json')
+        if not os.path.exists(caminho):
+            _ = self.nlp_stanza
+        with open(caminho, encoding='utf-8') as arquivo:
+            recursos = json.load(arquivo)
+        conteudo = json.dumps(recursos.get('pt', {}), sort_keys=True)
+        return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()[:12]
+
+    def preprocessamento_texto(self, texto, op_lemmatizer=None) -> str:
+        texto = self.limpeza_texto(texto)
+
+        if self.cache_lematizacao is None:
+            return self.lematizacao(texto, op_lemmatizer)
+
+        chave = CacheLematizacao.chave(texto, op_lemmatizer, self.versao_lematizador(op_lemmatizer))
+        lematizado = self.cache_lematizacao.obter(chave)
+        if lematizado is None:
+            lematizado = self.lematizacao(texto, op_lemmatizer)
+            self.cache_lematizacao.guardar(chave, lematizado)
+        return lematizado
+
+    def preprocessamento_lote(self, textos, op_lemmatizer=None, batch_size: int = 1000) -> list:
+        """
+        Pré-processa uma lista de textos no processo atual, agrupando a lematização em lotes.
+
+        Args:
+            textos (list[str]): Textos a serem processados.
+            op_lemmatizer (int | None): Opção de lematização (None: spaCy, 1: NLTK, 2: Stanza).
+            batch_size (int): Tamanho do lote enviado ao spaCy.
+
+        Returns:
+            list[str]: Textos processados, na mesma ordem da entrada.
+        """
+        textos_limpos = [self.limpeza_texto(texto) for texto in textos]
+
+        if self.cache_lematizacao is None:
+            return self._lematizacao_lote(textos_limpos, op_lemmatizer, batch_size)
+
+        # Textos repetidos e já vistos em execuções anteriores são lematizados uma única vez
+        versao = self.versao_lematizador(op_lemmatizer)
+        chaves = [CacheLematizacao.chave(texto, op_lemmatizer, versao) for texto in textos_limpos]
+        lematizados = self.cache_lematizacao.obter_varios(chaves)
+
+        pendentes = {}
+        for chave, texto in zip(chaves, textos_limpos):
+            if chave not in lematizados and chave not in pendentes:
+                pendentes[chave] = texto
+
+        if pendentes:
+            novos = dict(zip(pendentes.keys(),
+                             self._lematizacao_lote(list(pendentes.values()), op_lemmatizer, batch_size)))
+            self.cache_lematizacao.guardar_varios(novos)
+            lematizados.update(novos)
+
+        return [lematizados[chave] for chave in chaves]
+
+    def _lematizacao_lote(self, textos_limpos, op_lemmatizer=None, batch_size: int = 1000) -> list:
+        if op_lemmatizer is None:
+            desabilitar = [nome for nome in TextTreatment.COMPONENTES_SPACY_DESNECESSARIOS
+                           if nome in self.nlp_spacy.pipe_names]
+            docs = self.nlp_spacy.pipe(textos_limpos, batch_size=batch_size, disable=desabilitar)
+            return [" ".join([token.lemma_ for token in doc]) for doc in docs]
+
+        elif op_lemmatizer == 1:
+            return [self.lematizacao(texto, op_lemmatizer) for texto in textos_limpos]
+
+        elif op_lemmatizer == 2:
+            import stanza
+
+            docs = self.nlp_stanza.bulk_process([stanza.Document([], text=texto) for texto in textos_limpos])
+            return [" ".join([word.lemma for sent in doc.sentences for word in sent.words]) for doc in docs]
+
+        else:
+            print("Erro: Opção inválida para lematização.")
+            raise ValueError("Opção de lematização inválida")
+
+    @staticmethod
+    def _dividir_em_lotes(textos, batch_size: int):
+        iterador = iter(textos)
+        while True:
+            lote = list(islice(iterador, batch_size))
+            if not lote:
+                return
+            yield lote
+
+    def preprocess_corpus(self, textos, op_lemmatizer=None, n_process: int = 1, batch_size: int = 1000) -> list:
+        """
+        Pré-processa um corpus inteiro em lotes, opcionalmente distribuído entre vários processos.
+
+        O resultado é equivalente a chamar preprocessamento_texto em cada texto, mas o spaCy recebe os
+        textos via nlp.pipe (sem parser/NER) e, com n_process > 1, cada processo filho carrega os modelos
+        uma única vez e processa lotes inteiros.
+
+        Args:
+            textos (Iterable[str]): Textos a serem processados (valores nulos devem ser tratados antes).
+            op_lemmatizer (int | None): Opção de lematização (None: spaCy, 1: NLTK, 2: Stanza).
+            n_process (int): Número de processos. Com 1, tudo roda no processo atual.
+            batch_size (int): Quantidade de textos por lote.
+
+        Returns:
+            list[str]: Textos processados, na mesma ordem da entrada.
+        """
+        if op_lemmatizer not in (None, 1, 2):
+            print("Erro: Opção inválida para lematização.")
+            raise ValueError("Opção de lematização inválida")
+
+        lotes = TextTreatment._dividir_em_lotes(textos, batch_size)
+        resultados = []
+
+        if n_process <= 1:
+            for lote in lotes:
+                resultados.extend(self.preprocessamento_lote(lote, op_lemmatizer, batch_size))
+            if self.cache_lematizacao is not None:
+                self.cache_lematizacao.gravar()
+            return resultados
+
+        # 'spawn' evita herdar o estado do PyTorch/spaCy do processo pai
+        contexto = multiprocessing.get_context('spawn')
+        with contexto.Pool(processes=n_process, initializer=_inicializar_worker,
+                           initargs=(self.caminho_cache_lematizacao, op_lemmatizer, self.offline)) as pool:
+            argumentos = ((lote, op_lemmatizer, batch_size) for lote in lotes)
+            # imap preserva a ordem de entrada dos lotes
+            for resultado_lote in pool.imap(_processar_lote_worker, argumentos):
+                resultados.extend(resultado_lote)
+
+        return resultados
@@ -1,8 +1,12 @@
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
+from sklearn.preprocessing import normalize
 import matplotlib.pyplot as plt
 
+from utils.frequencia_documentos import FrequenciaDocumentos, limites_frequencia
+
 
 class TextVectorization:
     def __init__(self, df, stop_words):
@@ -10,10 +14,11 @@ class TextVectorization:
         Inicializa a classe TextVectorization.
 
         Args:
-            df (pd.DataFrame): DataFrame contendo as mensagens e os usuários.
+            df (pd.DataFrame | None): DataFrame contendo as mensagens e os usuários. Pode ser None nos modos
+                streaming, que leem os dados em chunks.
             stop_words (list): Lista de stopwords a serem utilizadas na vetorização.
         """
-        self.df = df.reset_index(drop=True)
+        self.df = df.reset_index(drop=True) if df is not None else None
         self.stop_words = stop_words
 
     def tfidf_vectorization(self, output_path, max_df_custom: int, min_df_custom: float | int,
@@ -40,28 +45,11 @@ class TextVectorization:
         corpus_tfidf = self.df['postMessageLimpo'].tolist()
         tfidf_matrix = vectorizer.fit_transform(corpus_tfidf)
 
-        # Obter as palavras
+        # Obter as palavras e a média TF-IDF de cada usuário em uma única multiplicação esparsa
         palavras_tfidf = vectorizer.get_feature_names_out()
-        resultados_tfidf = []
-
-        # Iterar sobre cada usuário
-        for usuario in self.df['id_usuario'].unique():
-            indices_usuario = self.df[self.df['id_usuario'] == usuario].index
-            if len(indices_usuario) > 0:
-                user_tfidf = tfidf_matrix[indices_usuario]
-                user_tfidf_mean = np.asarray(user_tfidf.mean(axis=0)).flatten()
-
-                top_10_indices = user_tfidf_mean.argsort()[-10:][::-1]
-
-                for index in top_10_indices:
-                    resultados_tfidf.append({
-                        'id_usuario': usuario,
-                        'palavra': palavras_tfidf[index],
-                        'score': user_tfidf_mean[index]
-                    })
-
-        # Converter a lista de resultados em DataFrame e salvar
-        resultados_df_tfidf = pd.DataFrame(resultados_tfidf)
+        resultados_df_tfidf = TextVectorization.top_k_por_usuario(tfidf_matrix, self.df['id_usuario'], palavras_tfidf,
+                                                                  'score', media=True)
+
         resultados_df_tfidf.to_csv(output_path, index=False)
         print(resultados_df_tfidf)
         return resultados_df_tfidf
@@ -88,29 +76,312 @@ class TextVectorization:
         bow_matrix = vectorizer.fit_transform(corpus_bow)
 
         palavras_bow = vectorizer.get_feature_names_out()
-        resultados_bow = []
-
-        for usuario in self.df['id_usuario'].unique():
-            indices_usuario = self.df[self.df['id_usuario'] == usuario].index
-            if len(indices_usuario) > 0:
-                user_bow = bow_matrix[indices_usuario]
-                user_bow_sum = np.asarray(user_bow.sum(axis=0)).flatten()
-
-                top_10_indices_bow = user_bow_sum.argsort()[-10:][::-1]
+        resultados_df_bow = TextVectorization.top_k_por_usuario(bow_matrix, self.df['id_usuario'], palavras_bow,
+                                                                'contagem')
 
-                for index in top_10_indices_bow:
-                    resultados_bow.append({
-                        'id_usuario': usuario,
-                        'palavra': palavras_bow[index],
-                        'contagem': user_bow_sum[index]
-                    })
-
-        # Converter a lista de resultados em DataFrame e salvar
-        resultados_df_bow = pd.DataFrame(resultados_bow)
         resultados_df_bow.to_csv(output_path, index=False)
         print(resultados_df_bow)
         return resultados_df_bow
 
+    def bag_of_words_streaming(self, fonte_chunks, output_path, max_df_custom: float | int, min_df_custom: int,
+                               ngram_range_custom: tuple, frequencias: FrequenciaDocumentos = None):
+        """
+        Bag of Words em duas passadas sobre chunks, com memória limitada pelo tamanho do chunk e do vocabulário
+        podado.
+
+        Produz o mesmo top-10 por usuário que bag_of_words_vectorization, sem carregar o corpus inteiro.
+
+        Args:
+            fonte_chunks (Callable[[], Iterable[pd.DataFrame]]): Função que retorna um novo iterador de chunks com
+                'id_usuario' e 'postMessageLimpo' (ex.: lambda: pd.read_csv(caminho, chunksize=50_000)).
+            output_path (str): Caminho para salvar o CSV dos resultados.
+            max_df_custom (float|int): Valor máximo de frequência de documento personalizado.
+            min_df_custom (int): Valor mínimo de frequência de documento personalizado.
+            ngram_range_custom (tuple): Intervalo de n-gramas a serem considerados.
+            frequencias (FrequenciaDocumentos): Frequências de documento já contadas sobre todos os chunks de
+                fonte_chunks (ex.: um estado salvo, atualizado com os posts novos). Dispensa a primeira passada.
+        """
+        return self._vetorizacao_streaming(fonte_chunks, output_path, max_df_custom, min_df_custom,
+                                           ngram_range_custom, tfidf=False, frequencias=frequencias)
+
+    def tfidf_streaming(self, fonte_chunks, output_path, max_df_custom: float | int, min_df_custom: float | int,
+                        ngram_range_custom: tuple, frequencias: FrequenciaDocumentos = None):
+        """
+        TF-IDF em duas passadas sobre chunks, equivalente a tfidf_vectorization (sublinear_tf, norma L2).
+
+        Args:
+            fonte_chunks (Callable[[], Iterable[pd.DataFrame]]): Função que retorna um novo iterador de chunks com
+                'id_usuario' e 'postMessageLimpo'.
+            output_path (str): Caminho para salvar o CSV dos resultados.
+            max_df_custom (float|int): Valor máximo de frequência de documento personalizado.
+            min_df_custom (float|int): Valor mínimo de frequência de documento personalizado.
+            ngram_range_custom (tuple): Intervalo de n-gramas a serem considerados.
+            frequencias (FrequenciaDocumentos): Frequências de documento já contadas, como em bag_of_words_streaming.
+        """
+        return self._vetorizacao_streaming(fonte_chunks, output_path, max_df_custom, min_df_custom,
+                                           ngram_range_custom, tfidf=True, frequencias=frequencias)
+
+    @staticmethod
+    def _textos_chunk(chunk: pd.DataFrame) -> list:
+        return chunk['postMessageLimpo'].fillna('').tolist()
+
+    def contar_frequencia_documentos(self, fonte_chunks, ngram_range_custom: tuple, caminho_estado: str = None,
+                                     max_termos_memoria: int = 1_000_000) -> FrequenciaDocumentos:
+        """
+        Primeira passada: conta em quantos documentos aparece cada termo, com memória limitada.
+
+        Args:
+            fonte_chunks (Callable[[], Iterable[pd.DataFrame]]): Função que retorna um iterador de chunks.
+            ngram_range_custom (tuple): Intervalo de n-gramas a serem considerados.
+            caminho_estado (str): Arquivo do estado persistente. Se já existir, os documentos dos chunks são
+                somados a ele (ex.: apenas os posts novos). None usa um estado temporário.
+            max_termos_memoria (int): Termos distintos mantidos em memória antes de gravar em disco.
+
+        Returns:
+            FrequenciaDocumentos: Estado com as frequências de documento.
+        """
+        frequencias = FrequenciaDocumentos(caminho_estado, self.stop_words, ngram_range_custom, max_termos_memoria)
+        for chunk in fonte_chunks():
+            frequencias.adicionar(TextVectorization._textos_chunk(chunk))
+        frequencias.gravar()
+        return frequencias
+
+    @staticmethod
+    def vocabulario_podado(frequencia_documentos: dict, total_documentos: int, max_df_custom: float | int,
+                           min_df_custom: float | int) -> tuple:
+        """
+        Aplica max_df/min_df como o scikit-learn e retorna o vocabulário ordenado.
+
+        Returns:
+            tuple: (array de palavras ordenadas, array com a frequência de documento de cada uma)
+        """
+        if not frequencia_documentos:
+            raise ValueError('empty vocabulary; perhaps the documents only contain stop words')
+
+        minimo, maximo = limites_frequencia(total_documentos, max_df_custom, min_df_custom)
+        palavras = np.array(sorted(termo for termo, frequencia in frequencia_documentos.items()
+                                   if minimo <= frequencia <= maximo), dtype=object)
+        if len(palavras) == 0:
+            raise ValueError('After pruning, no terms remain. Try a lower min_df or a higher max_df.')
+
+        frequencias = np.array([frequencia_documentos[termo] for termo in palavras], dtype=np.int64)
+        return palavras, frequencias
+
+    def _vetorizacao_streaming(self, fonte_chunks, output_path, max_df_custom, min_df_custom, ngram_range_custom,
+                               tfidf: bool, frequencias: FrequenciaDocumentos = None) -> pd.DataFrame:
+        if frequencias is None:
+            estado = self.contar_frequencia_documentos(fonte_chunks, ngram_range_custom)
+            try:
+                palavras, frequencias_palavras = estado.vocabulario_podado(max_df_custom, min_df_custom)
+                total_documentos = estado.total_documentos
+            finally:
+                estado.fechar()
+        else:
+            frequencias.verificar_configuracao(self.stop_words, ngram_range_custom)
+            palavras, frequencias_palavras = frequencias.vocabulario_podado(max_df_custom, min_df_custom)
+            total_documentos = frequencias.total_documentos
+
+        vectorizer = CountVectorizer(
+            stop_words=self.stop_words,
+            ngram_range=ngram_range_custom,
+            vocabulary={palavra: indice for indice, palavra in enumerate(palavras)},
+            dtype=np.float64 if tfidf else np.int64
+        )
+
+        # Segunda passada: somas por usuário, acumuladas chunk a chunk
+        indice_usuarios = {}
+        documentos_por_usuario = []
+        partes = []
+        for chunk in fonte_chunks():
+            matriz = vectorizer.transform(TextVectorization._textos_chunk(chunk))
+            if tfidf:
+                matriz = TextVectorization.transformar_tfidf(matriz, frequencias_palavras, total_documentos)
+
+            indicadora, unicos, contagem_documentos = TextVectorization.matriz_indicadora_usuarios(
+                chunk['id_usuario'], matriz.dtype)
+            linhas_globais = np.empty(len(unicos), dtype=np.int64)
+            for posicao, usuario in enumerate(unicos):
+                if usuario not in indice_usuarios:
+                    indice_usuarios[usuario] = len(indice_usuarios)
+                    documentos_por_usuario.append(0)
+                linhas_globais[posicao] = indice_usuarios[usuario]
+                documentos_por_usuario[linhas_globais[posicao]] += contagem_documentos[posicao]
+
+            parcial = (indicadora @ matriz).tocoo()
+            partes.append((linhas_globais[parcial.row], parcial.col, parcial.data))
+
+            # Compacta as partes periodicamente para manter a memória proporcional ao resultado
+            if len(partes) >= 16:
+                partes = [TextVectorization._compactar_partes(partes, len(indice_usuarios), len(palavras))]
+
+        matriz_usuarios = sp.csr_matrix(
+            TextVectorization._compactar_partes(partes, len(indice_usuarios), len(palavras), como_coo=False)
+        )
+        usuarios_unicos = pd.Index(list(indice_usuarios)).to_numpy()
+
+        coluna = 'score' if tfidf else 'contagem'
+        resultados_df = TextVectorization.top_k_matriz_usuarios(matriz_usuarios, usuarios_unicos,
+                                                                np.asarray(documentos_por_usuario), palavras,
+                                                                coluna, media=tfidf)
+        resultados_df.to_csv(output_path, index=False)
+        print(resultados_df)
+        return resultados_df
+
+    @staticmethod
+    def transformar_tfidf(matriz_contagens, frequencias: np.ndarray, total_documentos: int):
+        """
+        Converte contagens em TF-IDF com os mesmos parâmetros de tfidf_vectorization
+        (smooth_idf=True, sublinear_tf=True, norma L2).
+
+        Args:
+            matriz_contagens (scipy.sparse matrix): Matriz documentos x palavras com contagens.
+            frequencias (np.ndarray): Frequência de documento de cada palavra.
+            total_documentos (int): Total de documentos usado no IDF.
+
+        Returns:
+            scipy.sparse.csr_matrix: Matriz TF-IDF.
+        """
+        matriz = sp.csr_matrix(matriz_contagens, dtype=np.float64, copy=True)
+        matriz.data = np.log(matriz.data) + 1
+        idf = np.log((1 + total_documentos) / (1 + np.asarray(frequencias))) + 1
+        return normalize(matriz @ sp.diags(idf), norm='l2')
+
+    @staticmethod
+    def _compactar_partes(partes, quantidade_usuarios: int, quantidade_palavras: int, como_coo: bool = True):
+        if partes:
+            linhas, colunas, valores = (np.concatenate(componente) for componente in zip(*partes))
+        else:
+            linhas = colunas = np.array([], dtype=np.int64)
+            valores = np.array([], dtype=np.float64)
+
+        # Ao converter para CSR as entradas repetidas (usuário, palavra) são somadas
+        matriz = sp.csr_matrix((valores, (linhas, colunas)), shape=(quantidade_usuarios, quantidade_palavras))
+        if not como_coo:
+            return matriz
+        matriz = matriz.tocoo()
+        return matriz.row, matriz.col, matriz.data
+
+    @staticmethod
+    def matriz_indicadora_usuarios(usuarios, dtype=np.float64) -> tuple:
+        """
+        Constrói a matriz esparsa (usuários x documentos) que indica a qual usuário pertence cada documento.
+
+        Args:
+            usuarios (pd.Series | np.ndarray): Usuário de cada documento, na ordem das linhas da matriz.
+            dtype (np.dtype): Tipo dos valores da matriz.
+
+        Returns:
+            tuple: (matriz indicadora CSR, usuários únicos na ordem de primeira aparição, documentos por usuário)
+        """
+        codigos, unicos = pd.factorize(np.asarray(usuarios))
+        quantidade_documentos = len(codigos)
+        indicadora = sp.csr_matrix(
+            (np.ones(quantidade_documentos, dtype=dtype), (codigos, np.arange(quantidade_documentos))),
+            shape=(len(unicos), quantidade_documentos)
+        )
+        return indicadora, unicos, np.bincount(codigos, minlength=len(unicos))
+
+    @staticmethod
+    def _top_k_bloco(bloco: np.ndarray, k: int) -> tuple:
+        """
+        Seleciona as k maiores colunas de cada linha de um bloco denso com argpartition.
+
+        Empates são resolvidos como em um argsort estável seguido de [-k:][::-1]: entre valores iguais,
+        o de maior índice vem primeiro.
+
+        Returns:
+            tuple: (índices, valores), ambos com formato (linhas, k) e ordenados do maior para o menor.
+        """
+        limiar = np.partition(bloco, -k, axis=1)[:, -k][:, None]
+        maiores = bloco > limiar
+        faltantes = k - maiores.sum(axis=1, keepdims=True)
+
+        # Entre os empatados no limiar, ficam os de maior índice
+        empatados = bloco == limiar
+        empatados_a_direita = np.cumsum(empatados[:, ::-1], axis=1)[:, ::-1]
+        selecionados = maiores | (empatados & (empatados_a_direita <= faltantes))
+
+        linhas, colunas = np.nonzero(selecionados)
+        indices = colunas.reshape(bloco.shape[0], k)
+        valores = bloco[linhas, colunas].reshape(bloco.shape[0], k)
+
+        ordem = np.lexsort((-indices, -valores), axis=1)
+        return np.take_along_axis(indices, ordem, axis=1), np.take_along_axis(valores, ordem, axis=1)
+
+    @staticmethod
+    def top_k_por_usuario(matriz, usuarios, palavras, coluna: str, k: int = 10, media: bool = False,
+                          memoria_bloco: int = 64 * 1024 ** 2) -> pd.DataFrame:
+        """
+        Calcula as k palavras de maior soma (ou média) por usuário.
+
+        As somas de todos os usuários saem de uma única multiplicação esparsa pela matriz indicadora de
+        usuários; o top-k é calculado em blocos densos de linhas, limitados a memoria_bloco bytes.
+
+        Args:
+            matriz (scipy.sparse matrix): Matriz documentos x palavras.
+            usuarios (pd.Series | np.ndarray): Usuário de cada documento, na ordem das linhas da matriz.
+            palavras (np.ndarray): Palavra de cada coluna da matriz.
+            coluna (str): Nome da coluna de valores no resultado ('score', 'contagem', ...).
+            k (int): Quantidade de palavras por usuário.
+            media (bool): Se True, usa a média por documento em vez da soma.
+            memoria_bloco (int): Memória máxima, em bytes, de cada bloco denso.
+
+        Returns:
+            pd.DataFrame: Colunas 'id_usuario', 'palavra' e coluna, com k linhas por usuário.
+        """
+        matriz = sp.csr_matrix(matriz)
+        indicadora, unicos, documentos_por_usuario = TextVectorization.matriz_indicadora_usuarios(usuarios,
+                                                                                                  matriz.dtype)
+        matriz_usuarios = indicadora @ matriz
+        return TextVectorization.top_k_matriz_usuarios(matriz_usuarios, unicos, documentos_por_usuario, palavras,
+                                                       coluna, k, media, memoria_bloco)
+
+    @staticmethod
+    def top_k_matriz_usuarios(matriz_usuarios, usuarios_unicos, documentos_por_usuario, palavras, coluna: str,
+                              k: int = 10, media: bool = False, memoria_bloco: int = 64 * 1024 ** 2) -> pd.DataFrame:
+        """
+        Calcula as k palavras de maior valor por linha de uma matriz já agregada por usuário.
+
+        Args:
+            matriz_usuarios (scipy.sparse matrix): Matriz usuários x palavras com as somas de cada usuário.
+            usuarios_unicos (np.ndarray): Usuário de cada linha.
+            documentos_por_usuario (np.ndarray): Quantidade de documentos de cada usuário.
+            palavras (np.ndarray): Palavra de cada coluna da matriz.
+            coluna (str): Nome da coluna de valores no resultado.
+            k (int): Quantidade de palavras por usuário.
+            media (bool): Se True, divide as somas pela quantidade de documentos do usuário.
+            memoria_bloco (int): Memória máxima, em bytes, de cada bloco denso.
+
+        Returns:
+            pd.DataFrame: Colunas 'id_usuario', 'palavra' e coluna, com k linhas por usuário.
+        """
+        matriz_usuarios = sp.csr_matrix(matriz_usuarios)
+        palavras = np.asarray(palavras)
+
+        k = min(k, matriz_usuarios.shape[1])
+        if k == 0 or len(usuarios_unicos) == 0:
+            return pd.DataFrame({'id_usuario': [], 'palavra': [], coluna: []})
+
+        tamanho_bloco = max(1, memoria_bloco // (matriz_usuarios.shape[1] * matriz_usuarios.dtype.itemsize))
+        indices_blocos = []
+        valores_blocos = []
+        for inicio in range(0, matriz_usuarios.shape[0], tamanho_bloco):
+            bloco = matriz_usuarios[inicio:inicio + tamanho_bloco].toarray()
+            if media:
+                bloco = bloco / documentos_por_usuario[inicio:inicio + tamanho_bloco, None]
+            indices, valores = TextVectorization._top_k_bloco(bloco, k)
+            indices_blocos.append(indices)
+            valores_blocos.append(valores)
+
+        indices = np.concatenate(indices_blocos).ravel()
+        valores = np.concatenate(valores_blocos).ravel()
+
+        return pd.DataFrame({
+            'id_usuario': np.repeat(usuarios_unicos, k),
+            'palavra': palavras[indices],
+            coluna: valores
+        })
+
     @staticmethod
     def plot_top_words(df_resultados: pd.DataFrame, column: str, title: str = None):
         """